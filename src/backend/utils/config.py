@@ -43,9 +43,11 @@ class Config:
 
     class CSV:
         __default = {
-            "directory": "csvs"
+            "directory": "csvs",
+            "workers": 1
         }
         DIRECTORY: Path = cwd / config.get("csv", __default)["directory"]
+        WORKERS: int = config.get("csv", __default)["workers"]
 
         class MAX:
             __default = {
@@ -57,6 +59,18 @@ class Config:
             FILES: int = config.get("csv", __default)["max"]["files"]
             SIZE: int = config.get("csv", __default)["max"]["size"]
 
+        class CACHE:
+            __default = {
+                "cache": {
+                    "enabled": False,
+                    "directory": "~/.cache/petllang/csv_cache",
+                    "size": 1073741824
+                }
+            }
+            ENABLED: bool = config.get("csv", __default)["cache"]["enabled"]
+            DIRECTORY: Path = cwd / Path(config.get("csv", __default)["cache"]["directory"]).expanduser()
+            SIZE: int = config.get("csv", __default)["cache"]["size"]
+
     class CLEANUP:
         __default = {
             "interval_seconds": 900
@@ -1,39 +1,41 @@
-from typing import Any, Optional
-
 from petllang.phases.interpreter.definitions.value import *
 from petllang.phases.interpreter.environment import InterpreterEnvironment
 from petllang.phases.lexer.definitions.token_petl import Token
 from petllang.phases.parser.defintions.expression import UnknownExpression, Application
 
 
+# Builtins override call, which receives the evaluated arguments in parameter order, or evaluate, which reads them from
+# an environment binding each parameter name. Interpreters call builtins through call whenever it is overridden.
 class Builtin(ABC):
+    # Builtins always returning a value of their declared return type, the type checker resolves their applications
+    returns_declared_type: bool = False
+
     def __init__(self, name: str, parameters: List[Tuple[str, PetlType]], return_type: PetlType):
         self.name: str = name
         self.parameters: List[Tuple[str, PetlType]] = parameters
         self.func_type = FuncType([parameter[1] for parameter in parameters], return_type)
+        self.positional: bool = type(self).call is not Builtin.call
+
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        environment: InterpreterEnvironment = InterpreterEnvironment()
+        for parameter, argument in zip(self.parameters, arguments):
+            environment.add(parameter[0], argument)
+        return self.evaluate(application, environment, interpreter, error)
 
-    @abstractmethod
     def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        pass
+        arguments: List[PetlValue] = [environment.get(parameter[0], application.token, error) for parameter in self.parameters]
+        return self.call(arguments, application, interpreter, error)
 
     def to_value(self) -> FuncValue:
         return FuncValue(self.func_type, self, self.parameters, UnknownExpression(), InterpreterEnvironment())
 
 
-def extract_iterable_values(name: str, iterable_value: PetlValue, token: Token, error) -> Optional[List[Any]]:
-    if isinstance(iterable_value, StringValue) and isinstance(iterable_value.petl_type, StringType):
-        return [CharValue(char_value) for char_value in iterable_value.value]
-    elif isinstance(iterable_value, ListValue) and isinstance(iterable_value.petl_type, ListType):
-        return iterable_value.values
-    elif isinstance(iterable_value, TupleValue) and isinstance(iterable_value.petl_type, TupleType):
-        return iterable_value.values
-    elif isinstance(iterable_value, DictValue) and isinstance(iterable_value.petl_type, DictType):
-        return iterable_value.values
-    elif isinstance(iterable_value, TableValue) and isinstance(iterable_value.petl_type, TableType):
-        return iterable_value.rows
-    else:
-        error(f"\'{name}\' requires iterable type, not {iterable_value.petl_type.to_string()}", token)
-        return None
+def require_iterable(name: str, iterable_value: PetlValue, token: Token, error) -> bool:
+    # Iterable values are then read through iterate, length and is_empty instead of being copied into a list
+    if iterable_value.is_iterable():
+        return True
+    error(f"\'{name}\' requires iterable type, not {iterable_value.petl_type.to_string()}", token)
+    return False
 
 
 def extract_element_type(iterable_value: PetlValue) -> PetlType:
@@ -53,10 +55,10 @@ def extract_element_type(iterable_value: PetlValue) -> PetlType:
 
 def from_string_value(value: str) -> PetlValue:
     if not value:
-        return NoneValue()
+        return none_value()
     elif value.isnumeric():
-        return IntValue(int(value))
+        return int_value(int(value))
     elif value == "true" or value == "false":
-        return BoolValue(True if value == "true" else False)
+        return bool_value(True if value == "true" else False)
     else:
         return StringValue(value)
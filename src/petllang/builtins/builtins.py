@@ -68,6 +68,7 @@ _builtins: Dict[str, Builtin] = {
     Keyword.CREATETABLE.value: CreateTable(),
     Keyword.COLUMN.value: Column(),
     Keyword.READCSV.value: ReadCsv(),
+    Keyword.SCANCSV.value: ScanCsv(),
     Keyword.WRITECSV.value: WriteCsv(),
     Keyword.JOIN.value: Join(),
     Keyword.WITH.value: With(),
@@ -0,0 +1,171 @@
+import functools
+import hashlib
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.utils.config import Config
+from petllang.phases.interpreter.definitions.value import *
+
+CSV_CACHE_MAGIC: bytes = b"PETLTBL2"
+CSV_CACHE_SUFFIX: str = ".petltable"
+CSV_CACHE_ALIGNMENT: int = 64
+CSV_CACHE_VALUE_CLASSES: Dict[str, type] = {
+    "int": IntValue,
+    "bool": BoolValue,
+    "char": CharValue,
+    "string": StringValue
+}
+
+# Set by run_cli to bypass the cache
+csv_cache_enabled: bool = Config.CSV.CACHE.ENABLED
+csv_cache_directory: Path = Config.CSV.CACHE.DIRECTORY
+csv_cache_size: int = Config.CSV.CACHE.SIZE
+
+
+def get_cache_path(path: Path, schema_value: SchemaValue, header: bool) -> Optional[Path]:
+    # The image is only reused while the CSV keeps its size and modification time and is read with the same schema
+    if not csv_cache_enabled:
+        return None
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    schema_key: List[Tuple[str, str]] = [(column_name.value, column_type.to_string())
+                                         for column_name, column_type in schema_value.values]
+    cache_key: str = json.dumps([str(Path(path).resolve()), stat_result.st_size, stat_result.st_mtime_ns, schema_key, header])
+    return csv_cache_directory / (hashlib.sha256(cache_key.encode()).hexdigest() + CSV_CACHE_SUFFIX)
+
+
+def get_value_class_name(value_class: type) -> Optional[str]:
+    for value_class_name, cached_value_class in CSV_CACHE_VALUE_CLASSES.items():
+        if value_class is cached_value_class:
+            return value_class_name
+    return None
+
+
+def text_to_arrays(data: np.ndarray) -> Optional[List[np.ndarray]]:
+    # Text is stored as one UTF-8 blob and the offset of every value in it, so values of any length round trip
+    try:
+        encoded_values: List[bytes] = [value.encode() for value in data.tolist()]
+    except (AttributeError, UnicodeEncodeError):
+        return None
+    offsets: np.ndarray = np.zeros(len(encoded_values) + 1, dtype=np.int64)
+    np.cumsum([len(encoded_value) for encoded_value in encoded_values], out=offsets[1:])
+    return [offsets, np.frombuffer(b"".join(encoded_values), dtype=np.uint8)]
+
+
+def arrays_to_text(offsets: np.ndarray, blob: np.ndarray) -> np.ndarray:
+    text: bytes = blob.tobytes()
+    bounds: List[int] = offsets.tolist()
+    return np.fromiter((text[start:end].decode() for start, end in zip(bounds, bounds[1:])), dtype=object,
+                       count=len(bounds) - 1)
+
+
+def column_to_arrays(column: TableColumn) -> Optional[List[np.ndarray]]:
+    # Columns that would not survive the round trip, like arbitrary precision ints, are not cached
+    value_class_name: Optional[str] = get_value_class_name(column.value_class)
+    if value_class_name is None or column.data.dtype == object and value_class_name in ("int", "bool"):
+        return None
+    data_arrays: Optional[List[np.ndarray]] = text_to_arrays(column.data) if value_class_name in ("char", "string") \
+        else [column.data]
+    if data_arrays is None:
+        return None
+    return data_arrays if column.nulls is None else data_arrays + [column.nulls]
+
+
+def store_cached_table(table_value: TableValue, cache_path: Path):
+    if not table_value.is_columnar():
+        return
+
+    column_arrays: List[List[np.ndarray]] = []
+    for column in table_value.columns:
+        arrays: Optional[List[np.ndarray]] = column_to_arrays(column)
+        if arrays is None:
+            return
+        column_arrays.append(arrays)
+
+    # Layout: magic, header length, JSON header, then every array aligned so it can be mapped in place
+    offset: int = 0
+    columns_metadata: List[Dict[str, Any]] = []
+    for column, arrays in zip(table_value.columns, column_arrays):
+        arrays_metadata: List[Dict[str, Any]] = []
+        for array in arrays:
+            arrays_metadata.append({"dtype": array.dtype.str, "length": len(array), "offset": offset})
+            offset += -(-array.nbytes // CSV_CACHE_ALIGNMENT) * CSV_CACHE_ALIGNMENT
+        columns_metadata.append({"class": get_value_class_name(column.value_class), "arrays": arrays_metadata})
+    metadata: bytes = json.dumps({"row_count": table_value.row_count(), "columns": columns_metadata}).encode()
+    data_start: int = -(-(len(CSV_CACHE_MAGIC) + 8 + len(metadata)) // CSV_CACHE_ALIGNMENT) * CSV_CACHE_ALIGNMENT
+
+    temporary_path: Path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        csv_cache_directory.mkdir(parents=True, exist_ok=True)
+        with open(temporary_path, "wb") as cache_file:
+            cache_file.write(CSV_CACHE_MAGIC + len(metadata).to_bytes(8, "little") + metadata)
+            for arrays, column_metadata in zip(column_arrays, columns_metadata):
+                for array, array_metadata in zip(arrays, column_metadata["arrays"]):
+                    cache_file.seek(data_start + array_metadata["offset"])
+                    cache_file.write(np.ascontiguousarray(array).tobytes())
+            cache_file.truncate(data_start + offset)
+        os.replace(temporary_path, cache_path)
+        evict_cached_tables()
+    except OSError:
+        temporary_path.unlink(missing_ok=True)
+
+
+def load_cached_table(cache_path: Path, schema_value: SchemaValue) -> Optional[TableValue]:
+    if not cache_path.exists():
+        return None
+    try:
+        with open(cache_path, "rb") as cache_file:
+            # The mapping stays alive as long as the arrays viewing it
+            cache_map: mmap.mmap = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if cache_map[:len(CSV_CACHE_MAGIC)] != CSV_CACHE_MAGIC:
+            raise ValueError(f"Invalid table cache file")
+        metadata_length: int = int.from_bytes(cache_map[len(CSV_CACHE_MAGIC):len(CSV_CACHE_MAGIC) + 8], "little")
+        metadata_start: int = len(CSV_CACHE_MAGIC) + 8
+        metadata: Dict[str, Any] = json.loads(cache_map[metadata_start:metadata_start + metadata_length])
+        data_start: int = -(-(metadata_start + metadata_length) // CSV_CACHE_ALIGNMENT) * CSV_CACHE_ALIGNMENT
+
+        columns: List[TableColumn] = []
+        for column_metadata in metadata["columns"]:
+            arrays: List[np.ndarray] = [np.frombuffer(cache_map, dtype=np.dtype(array_metadata["dtype"]),
+                                                      count=array_metadata["length"], offset=data_start + array_metadata["offset"])
+                                        for array_metadata in column_metadata["arrays"]]
+            value_class: type = CSV_CACHE_VALUE_CLASSES[column_metadata["class"]]
+            if value_class in (CharValue, StringValue):
+                # Text is decoded into Python strings when the column is first read, until then it stays mapped
+                offsets, blob = arrays[0], arrays[1]
+                columns.append(TableColumn.from_loader(value_class, len(offsets) - 1, functools.partial(arrays_to_text, offsets, blob),
+                                                       arrays[2] if len(arrays) > 2 else None))
+            else:
+                columns.append(TableColumn(value_class, arrays[0], arrays[1] if len(arrays) > 1 else None))
+        if len(columns) != len(schema_value.values):
+            raise ValueError(f"Table cache file does not match schema")
+        os.utime(cache_path)
+    except (OSError, ValueError, KeyError, TypeError, IndexError):
+        cache_path.unlink(missing_ok=True)
+        return None
+    return TableValue(TableType(schema_value.petl_type), schema_value, columns=columns, row_count=metadata["row_count"])
+
+
+def evict_cached_tables():
+    # Least recently used images are removed first, a cache hit refreshes the image's modification time
+    cache_entries: List[Tuple[float, int, Path]] = []
+    for cache_path in csv_cache_directory.glob(f"*{CSV_CACHE_SUFFIX}"):
+        try:
+            stat_result = os.stat(cache_path)
+        except OSError:
+            continue
+        cache_entries.append((stat_result.st_mtime, stat_result.st_size, cache_path))
+    cache_entries.sort(key=lambda cache_entry: cache_entry[0])
+    total_size: int = sum(cache_entry[1] for cache_entry in cache_entries)
+    for _, size, cache_path in cache_entries:
+        if total_size <= csv_cache_size:
+            break
+        cache_path.unlink(missing_ok=True)
+        total_size -= size
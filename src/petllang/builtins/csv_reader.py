@@ -0,0 +1,316 @@
+import codecs
+import csv
+import io
+import locale
+import math
+import multiprocessing
+import os
+import re
+from itertools import chain, islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from backend.utils.config import Config
+from petllang.builtins.builtin_definitions import from_string_value
+from petllang.phases.interpreter.definitions.value import *
+from petllang.phases.interpreter.type_resolution import types_conform
+
+CSV_BOOL_VALUES: Dict[str, bool] = {"true": True, "false": False}
+# Python's int() also accepts whitespace, underscores and non-ASCII digits
+CSV_INT_PATTERN: re.Pattern = re.compile(r"-?[0-9]+")
+# Number of CSV rows parsed and converted at a time
+CSV_CHUNK_SIZE: int = 65536
+# Smaller files are always read by a single process, starting a process pool costs more than it saves
+CSV_PARALLEL_MIN_SIZE: int = 16 * 1024 * 1024
+CSV_SCAN_BLOCK_SIZE: int = 64 * 1024 * 1024
+
+# Number of processes used to read large CSV files, set by run_cli
+csv_workers: int = Config.CSV.WORKERS
+
+
+def parse_int_cell(cell: str) -> int:
+    if CSV_INT_PATTERN.fullmatch(cell):
+        return int(cell)
+    raise ValueError(f"Invalid int value: {cell}")
+
+
+def parse_bool_cell(cell: str) -> bool:
+    if cell in CSV_BOOL_VALUES:
+        return CSV_BOOL_VALUES[cell]
+    raise ValueError(f"Invalid bool value: {cell}")
+
+
+def parse_char_cell(cell: str) -> str:
+    if len(cell) == 1:
+        return cell
+    raise ValueError(f"Invalid char value: {cell}")
+
+
+def is_nullable_type(column_type: PetlType) -> bool:
+    return isinstance(column_type, UnionType) and any(isinstance(ut, NoneType) for ut in column_type.union_types)
+
+
+# Converts the cells of one CSV column according to its schema type, an empty cell is a none value
+class CsvColumnConverter:
+    def __init__(self, column_name: str, column_type: PetlType, token, error):
+        self.column_name = column_name
+        self.column_type = column_type
+        self.token = token
+        self.error = error
+        self.value_class: Optional[type] = column_value_class(column_type)
+        self.value_factory: Optional[Callable[[Any], PetlValue]] = VALUE_FACTORIES.get(self.value_class)
+        self.nullable: bool = is_nullable_type(column_type)
+        self.invalid_count: int = 0
+        self.first_invalid: Optional[Tuple[int, str]] = None
+
+        # Placeholder fed to the converter for empty cells, they are masked as none afterwards
+        self.convert: Callable[[str], Any] = str
+        self.null_cell: str = ""
+        if self.value_class is IntValue:
+            self.convert, self.null_cell = parse_int_cell, "0"
+        elif self.value_class is BoolValue:
+            self.convert, self.null_cell = parse_bool_cell, "false"
+        elif self.value_class is CharValue:
+            self.convert, self.null_cell = parse_char_cell, " "
+        elif self.value_class is None:
+            self.convert = self.convert_generic
+
+    def convert_generic(self, cell: str) -> PetlValue:
+        value: PetlValue = from_string_value(cell)
+        if not types_conform(self.token, value.petl_type, self.column_type, self.error, no_error=True):
+            raise ValueError(f"Invalid {self.column_type.to_string()} value: {cell}")
+        return value
+
+    def add_invalid(self, row_number: int, cell: str):
+        self.invalid_count += 1
+        if self.first_invalid is None:
+            self.first_invalid = (row_number, cell)
+
+    def convert_cells(self, cells: List[str], first_row_number: int) -> TableColumn:
+        if self.value_class is None:
+            return TableColumn.from_values(self.column_type, self.convert_values(cells, first_row_number))
+
+        nulls: Optional[np.ndarray] = None
+        if "" in cells:
+            nulls = np.fromiter((not cell for cell in cells), dtype=bool, count=len(cells))
+            if not self.nullable:
+                for index in np.flatnonzero(nulls).tolist():
+                    self.add_invalid(first_row_number + index, "")
+            cells = [cell if cell else self.null_cell for cell in cells]
+        return TableColumn.from_raw(self.value_class, self.convert_values(cells, first_row_number), nulls)
+
+    def convert_values(self, cells: List[str], first_row_number: int) -> List[Any]:
+        try:
+            return list(map(self.convert, cells))
+        except ValueError:
+            values: List[Any] = []
+            for index, cell in enumerate(cells):
+                try:
+                    values.append(self.convert(cell))
+                except ValueError:
+                    self.add_invalid(first_row_number + index, cell)
+                    values.append(self.convert(self.null_cell) if self.value_class else none_value())
+            return values
+
+    def convert_cell(self, cell: str, row_number: int) -> PetlValue:
+        if not cell:
+            if not self.nullable:
+                self.add_invalid(row_number, cell)
+            return none_value()
+        try:
+            value = self.convert(cell)
+        except ValueError:
+            self.add_invalid(row_number, cell)
+            return none_value()
+        return self.value_factory(value) if self.value_factory else value
+
+    def merge_invalid(self, invalid_count: int, first_invalid: Optional[Tuple[int, str]]):
+        self.invalid_count += invalid_count
+        if self.first_invalid is None:
+            self.first_invalid = first_invalid
+
+    def to_error_string(self) -> str:
+        row_number, cell = self.first_invalid
+        return f"column \'{self.column_name}\' expects {self.column_type.to_string()}, " \
+               f"found {self.invalid_count} invalid value(s) (first on row {row_number}: \'{cell}\')"
+
+
+def create_column_converters(schema_value: SchemaValue, token, error) -> List[CsvColumnConverter]:
+    return [CsvColumnConverter(column_name.value, column_type, token, error) for column_name, column_type in schema_value.values]
+
+
+def csv_rows_to_table_value(schema_value: SchemaValue, converters: List[CsvColumnConverter],
+                            csv_rows: List[List[str]], first_row_number: int) -> TableValue:
+    table_type: TableType = TableType(schema_value.petl_type)
+    column_count: int = len(converters)
+    if column_count > 0 and all(len(row) == column_count for row in csv_rows):
+        columns: List[TableColumn] = [converter.convert_cells([row[index] for row in csv_rows], first_row_number)
+                                      for index, converter in enumerate(converters)]
+        return TableValue(table_type, schema_value, columns=columns, row_count=len(csv_rows))
+
+    # Rows that do not match the schema width keep the row-backed representation
+    row_type: TupleType = TupleType(schema_value.petl_type.column_types)
+    rows: List[PetlValue] = []
+    for row_index, row in enumerate(csv_rows):
+        row_values: List[PetlValue] = [converter.convert_cell(cell, first_row_number + row_index)
+                                       for converter, cell in zip(converters, row)]
+        row_values.extend(from_string_value(cell) for cell in row[column_count:])
+        rows.append(TupleValue(row_type, row_values))
+    return create_table_value(table_type, schema_value, rows)
+
+
+def get_schema_mismatch_error(converters: List[CsvColumnConverter]) -> Optional[str]:
+    invalid_converters: List[CsvColumnConverter] = [converter for converter in converters if converter.invalid_count > 0]
+    if not invalid_converters:
+        return None
+    return "CSV values do not match schema: " + ", ".join(converter.to_error_string() for converter in invalid_converters)
+
+
+def header_matches_schema_names(header_row: List[str], schema_value: SchemaValue) -> bool:
+    return all(map(lambda h, sv: h == sv[0].value, header_row, schema_value.values))
+
+
+def read_csv_chunks(csv_rows: Iterator[List[str]], chunk_size: int = CSV_CHUNK_SIZE) -> Iterator[List[List[str]]]:
+    while True:
+        chunk: List[List[str]] = list(islice(csv_rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def convert_csv_chunks(schema_value: SchemaValue, converters: List[CsvColumnConverter], csv_rows: Iterator[List[str]],
+                       first_row_number: int, chunk_size: int = CSV_CHUNK_SIZE) -> Iterator[TableValue]:
+    row_number: int = first_row_number
+    for chunk in read_csv_chunks(csv_rows, chunk_size):
+        yield csv_rows_to_table_value(schema_value, converters, chunk, row_number)
+        row_number += len(chunk)
+
+
+def concat_table_values(schema_value: SchemaValue, table_values: List[TableValue]) -> TableValue:
+    if len(table_values) == 1:
+        return table_values[0]
+    table_type: TableType = TableType(schema_value.petl_type)
+    if all(table_value.is_columnar() for table_value in table_values) and schema_value.values:
+        columns: List[TableColumn] = [TableColumn.concat_all([table_value.columns[index] for table_value in table_values])
+                                      for index in range(len(schema_value.values))]
+        return TableValue(table_type, schema_value, columns=columns,
+                          row_count=sum(table_value.row_count() for table_value in table_values))
+    return create_table_value(table_type, schema_value, [row for table_value in table_values for row in table_value.iter_rows()])
+
+
+def read_csv_table_value(schema_value: SchemaValue, converters: List[CsvColumnConverter], path: Path, header: bool,
+                         token, error) -> Optional[TableValue]:
+    with open(path, mode='r') as csv_file:
+        csv_rows: Iterator[List[str]] = csv.reader(csv_file)
+        first_row: Optional[List[str]] = next(csv_rows, None)
+        if not isinstance(schema_value.petl_type, SchemaType) or first_row is None:
+            return None
+        if header and not header_matches_schema_names(first_row, schema_value):
+            error(f"Provided schema does not match CSV header: {first_row}", token)
+            return None
+
+        table_values: Optional[List[TableValue]] = None
+        if csv_workers > 1 and os.path.getsize(path) >= CSV_PARALLEL_MIN_SIZE:
+            table_values = read_csv_parallel(schema_value, converters, path, header, csv_workers)
+        if table_values is None:
+            if header:
+                table_values = list(convert_csv_chunks(schema_value, converters, csv_rows, 2))
+            else:
+                table_values = list(convert_csv_chunks(schema_value, converters, chain([first_row], csv_rows), 1))
+    if not table_values:
+        return csv_rows_to_table_value(schema_value, converters, [], 1)
+    return concat_table_values(schema_value, table_values)
+
+
+# Parallel reading #
+def scan_csv_lines(path: Path) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    # Byte offset of every line of the file as read in text mode and of every quote. Returns None if a lone carriage
+    # return makes the text mode line breaks differ from the newline bytes
+    line_starts: List[np.ndarray] = [np.zeros(1, dtype=np.int64)]
+    quotes: List[np.ndarray] = []
+    block_start: int = 0
+    pending_carriage_return: bool = False
+    with open(path, mode='rb') as csv_file:
+        while True:
+            block: np.ndarray = np.frombuffer(csv_file.read(CSV_SCAN_BLOCK_SIZE), dtype=np.uint8)
+            if len(block) == 0:
+                break
+            if pending_carriage_return and block[0] != 10:
+                return None
+            carriage_returns: np.ndarray = np.flatnonzero(block[:-1] == 13)
+            if not (block[carriage_returns + 1] == 10).all():
+                return None
+            pending_carriage_return = bool(block[-1] == 13)
+            quotes.append(np.flatnonzero(block == 34).astype(np.int64) + block_start)
+            line_starts.append(np.flatnonzero(block == 10).astype(np.int64) + block_start + 1)
+            block_start += len(block)
+    starts: np.ndarray = np.concatenate(line_starts)
+    return starts[starts < block_start], np.concatenate(quotes) if quotes else np.zeros(0, dtype=np.int64)
+
+
+def get_record_starts(path: Path, line_starts: np.ndarray, quotes: np.ndarray) -> Optional[np.ndarray]:
+    # A line starts a record unless a quoted field spans it, which is the case when an odd number of quotes comes
+    # before it. That only holds if every quote opens a field, closes one or is half of an escaped quote, like it does
+    # for the CSV reader, otherwise None is returned
+    if len(quotes) == 0:
+        return line_starts
+    if len(quotes) % 2 != 0:
+        return None
+    csv_bytes: np.ndarray = np.memmap(path, dtype=np.uint8, mode='r')
+    previous_bytes: np.ndarray = np.where(quotes > 0, csv_bytes[np.maximum(quotes - 1, 0)], 10)
+    next_bytes: np.ndarray = np.where(quotes + 1 < len(csv_bytes), csv_bytes[np.minimum(quotes + 1, len(csv_bytes) - 1)], 10)
+    del csv_bytes
+    escaped: np.ndarray = np.diff(quotes) == 1
+    opening_valid: np.ndarray = np.isin(previous_bytes[0::2], (10, 44)) | np.concatenate([[False], escaped])[0::2]
+    closing_valid: np.ndarray = np.isin(next_bytes[1::2], (10, 13, 44)) | np.concatenate([escaped, [False]])[1::2]
+    if not (opening_valid.all() and closing_valid.all()):
+        return None
+    return line_starts[np.searchsorted(quotes, line_starts) % 2 == 0]
+
+
+def read_csv_part(path: Path, schema_value: SchemaValue, start: int, end: int,
+                  first_row_number: int) -> Tuple[List[TableValue], List[Tuple[int, Optional[Tuple[int, str]]]]]:
+    with open(path, mode='rb') as csv_file:
+        csv_file.seek(start)
+        part: bytes = csv_file.read(end - start)
+    # Decoded with the same defaults as open(path, mode='r'), so the cells match a serial read
+    converters: List[CsvColumnConverter] = create_column_converters(schema_value, None, None)
+    csv_rows: Iterator[List[str]] = csv.reader(io.TextIOWrapper(io.BytesIO(part)))
+    table_values: List[TableValue] = list(convert_csv_chunks(schema_value, converters, csv_rows, first_row_number))
+    return table_values, [(converter.invalid_count, converter.first_invalid) for converter in converters]
+
+
+def read_csv_parallel(schema_value: SchemaValue, converters: List[CsvColumnConverter], path: Path, header: bool,
+                      workers: int) -> Optional[List[TableValue]]:
+    # Returns None if the file cannot be split safely, it is then read serially
+    if codecs.lookup(locale.getpreferredencoding(False)).name not in ("utf-8", "ascii"):
+        return None
+    scanned_lines: Optional[Tuple[np.ndarray, np.ndarray]] = scan_csv_lines(path)
+    if scanned_lines is None:
+        return None
+    record_starts: Optional[np.ndarray] = get_record_starts(path, *scanned_lines)
+    if record_starts is None:
+        return None
+    if header:
+        record_starts = record_starts[1:]
+    part_rows: int = max(CSV_CHUNK_SIZE, math.ceil(len(record_starts) / workers))
+    part_starts: List[int] = record_starts[::part_rows].tolist()
+    if len(part_starts) < 2:
+        return None
+
+    part_ends: List[int] = part_starts[1:] + [os.path.getsize(path)]
+    first_row_number: int = 2 if header else 1
+    part_arguments = [(path, schema_value, part_start, part_end, first_row_number + index * part_rows)
+                      for index, (part_start, part_end) in enumerate(zip(part_starts, part_ends))]
+    with multiprocessing.Pool(min(workers, len(part_arguments))) as pool:
+        part_results = pool.starmap(read_csv_part, part_arguments)
+
+    table_values: List[TableValue] = []
+    for part_table_values, part_invalid in part_results:
+        table_values.extend(part_table_values)
+        for converter, (invalid_count, first_invalid) in zip(converters, part_invalid):
+            converter.merge_invalid(invalid_count, first_invalid)
+    return table_values
+# end parallel reading #
@@ -1,6 +1,6 @@
-from copy import deepcopy
+from copy import copy
 
-from petllang.builtins.builtin_definitions import extract_iterable_values, Builtin
+from petllang.builtins.builtin_definitions import require_iterable, extract_element_type, Builtin
 from petllang.phases.interpreter.definitions.value import *
 from petllang.phases.interpreter.environment import copy_environment, InterpreterEnvironment
 from petllang.phases.interpreter.type_resolution import types_conform
@@ -12,28 +12,28 @@ from petllang.phases.parser.defintions.expression import Application
 def evaluate_element(values: List[PetlValue], function_value: FuncValue, element_type: PetlType, environment, interpreter) -> PetlValue:
     body_environment: InterpreterEnvironment = copy_environment(environment)
     for i, value in enumerate(values):
-        argument_identifier: str = function_value.parameters[i][0]
-        if isinstance(value, tuple):
-            tuple_type: TupleType = TupleType([value[0].petl_type, value[1].petl_type])
-            tuple_value: TupleValue = TupleValue(tuple_type, [value[0], value[1]])
-            body_environment.add(argument_identifier, tuple_value)
-        else:
-            body_environment.add(argument_identifier, value)
+        body_environment.add(function_value.parameters[i][0], value)
     return interpreter.evaluate(function_value.body, body_environment, element_type)
 
 
-def evaluate_higher_order_function(name, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-    iterable_value: PetlValue = environment.get("iterable", application.token, error)
-    function_value: PetlValue = environment.get("function_value", application.token, error)
+def fuses_with(function_value: FuncValue, iterable_value: PetlValue) -> bool:
+    # Fused stages are those the optimizer found cannot fail when called with values of their parameter type. Builtins
+    # bind arguments unchecked, so the type of the elements is compared with it before the stage is fused.
+    return not function_value.builtin and len(function_value.parameters) == 1 and \
+        function_value.parameters[0][1] == extract_element_type(iterable_value)
+
+
+def evaluate_higher_order_function(name, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+    iterable_value: PetlValue = arguments[0]
+    function_value: PetlValue = arguments[1]
     if isinstance(function_value.petl_type, FuncType) and isinstance(function_value, FuncValue):
         function_value: FuncValue = function_value
-        iterable_values = extract_iterable_values(name, iterable_value, application.token, error)
-        if iterable_values:
+        if require_iterable(name, iterable_value, application.token, error) and not iterable_value.is_empty():
             element_type: PetlType = UnknownType()
-            element_values: List[PetlValue] = []
+            stage: Callable[[Iterator[PetlValue]], Iterator[PetlValue]] = iter
             if name == "map":
                 element_type = function_value.petl_type.return_type
-                element_values = list(map(lambda v: evaluate_element([v], function_value, element_type, function_value.environment, interpreter), iterable_values))
+                stage = lambda values: map(lambda v: evaluate_element([v], function_value, element_type, function_value.environment, interpreter), values)
             elif name == "filter":
                 element_type = function_value.petl_type.parameter_types[0]
 
@@ -44,9 +44,11 @@ def evaluate_higher_order_function(name, application: Application, environment:
                     else:
                         return False
 
-                element_values = list(filter(lambda v: evaluate_bool_element(v), iterable_values))
-            return ListValue(ListType(element_type), element_values)
-    return NoneValue()
+                stage = lambda values: filter(lambda v: evaluate_bool_element(v), values)
+            if application.fused and fuses_with(function_value, iterable_value):
+                return StreamValue(ListType(element_type), [iterable_value], stage, keeps_length=name == "map")
+            return ListValue(ListType(element_type), list(stage(iterable_value.iterate())))
+    return none_value()
 
 
 class Map(Builtin):
@@ -57,8 +59,8 @@ class Map(Builtin):
         ]
         Builtin.__init__(self, Keyword.MAP.value, parameters, ListType(AnyType()))
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        return evaluate_higher_order_function("map", application, environment, interpreter, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        return evaluate_higher_order_function("map", arguments, application, interpreter, error)
 
 
 class Filter(Builtin):
@@ -69,8 +71,8 @@ class Filter(Builtin):
         ]
         Builtin.__init__(self, Keyword.FILTER.value, parameters, ListType(AnyType()))
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        return evaluate_higher_order_function("filter", application, environment, interpreter, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        return evaluate_higher_order_function("filter", arguments, application, interpreter, error)
 
 
 def fold_types_conform(init: PetlType, p1: PetlType, p2: PetlType, rt: PetlType, token: Token, error) -> bool:
@@ -86,10 +88,10 @@ def fold_types_conform(init: PetlType, p1: PetlType, p2: PetlType, rt: PetlType,
             types_conform(token, p2, rt, error) is not None)
 
 
-def evaluate_fold(application: Application, environment: InterpreterEnvironment, interpreter, error, reverse: bool) -> PetlValue:
-    iterable_value: PetlValue = environment.get("iterable", application.token, error)
-    initial_value: PetlValue = environment.get("initial_value", application.token, error)
-    function_value: PetlValue = environment.get("fold_function", application.token, error)
+def evaluate_fold(arguments: List[PetlValue], application: Application, interpreter, error, reverse: bool) -> PetlValue:
+    iterable_value: PetlValue = arguments[0]
+    initial_value: PetlValue = arguments[1]
+    function_value: PetlValue = arguments[2]
     if isinstance(function_value.petl_type, FuncType) and isinstance(iterable_value, ListValue):
         function_type: FuncType = function_value.petl_type
         param1_type: PetlType = function_type.parameter_types[0]
@@ -100,15 +102,14 @@ def evaluate_fold(application: Application, environment: InterpreterEnvironment,
 
             if isinstance(function_value, FuncValue):
                 fold_function_value: FuncValue = function_value
-                values: List[PetlValue] = deepcopy(iterable_value.values)
-                if reverse:
-                    values.reverse()
-                values.insert(0, initial_value)
+                values: Iterator[PetlValue] = reversed(iterable_value.elements()) if reverse else iterable_value.iterate()
 
-                fold_value: PetlValue = functools.reduce(lambda v1, v2: evaluate_element([v1, v2], fold_function_value, element_type, environment, interpreter), values)
+                fold_value: PetlValue = functools.reduce(lambda v1, v2: evaluate_element([v1, v2], fold_function_value, element_type, fold_function_value.environment, interpreter), values, initial_value)
+                # The folded value can be the initial value or an element, which other values still share
+                fold_value = copy(fold_value)
                 fold_value.petl_type = element_type
                 return fold_value
-    return NoneValue()
+    return none_value()
 
 
 class Foldl(Builtin):
@@ -120,8 +121,8 @@ class Foldl(Builtin):
         ]
         Builtin.__init__(self, Keyword.FOLDL.value, parameters, AnyType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        return evaluate_fold(application, environment, interpreter, error, reverse=False)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        return evaluate_fold(arguments, application, interpreter, error, reverse=False)
 
 
 class Foldr(Builtin):
@@ -133,5 +134,5 @@ class Foldr(Builtin):
         ]
         Builtin.__init__(self, Keyword.FOLDR.value, parameters, AnyType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        return evaluate_fold(application, environment, interpreter, error, reverse=True)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        return evaluate_fold(arguments, application, interpreter, error, reverse=True)
@@ -1,20 +1,21 @@
 from petllang.builtins.builtin_definitions import Builtin
 from petllang.phases.interpreter.definitions.value import *
-from petllang.phases.interpreter.environment import InterpreterEnvironment
 from petllang.phases.lexer.definitions.keyword_petl import Keyword
 from petllang.phases.parser.defintions.expression import Application
 
 
 class ToInt(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [("s", StringType())]
         Builtin.__init__(self, Keyword.TOINT.value, parameters, IntType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        value: PetlValue = environment.get("s", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        value: PetlValue = arguments[0]
         if isinstance(value, StringValue):
-            return IntValue(int(value.value))
-        return NoneValue()
+            return int_value(int(value.value))
+        return none_value()
 
 
 class Sum(Builtin):
@@ -24,8 +25,8 @@ class Sum(Builtin):
         ]
         Builtin.__init__(self, Keyword.SUM.value, parameters, IntType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
         if isinstance(list_value, ListValue):
             int_values: List[PetlValue] = list_value.values
             if int_values:
@@ -33,8 +34,8 @@ class Sum(Builtin):
                 for value in int_values:
                     if isinstance(value, IntValue):
                         sum_value += value.value
-                return IntValue(sum_value)
-        return NoneValue()
+                return int_value(sum_value)
+        return none_value()
 
 
 class Product(Builtin):
@@ -44,8 +45,8 @@ class Product(Builtin):
         ]
         Builtin.__init__(self, Keyword.PRODUCT.value, parameters, IntType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
         if isinstance(list_value, ListValue):
             int_values: List[PetlValue] = list_value.values
             if int_values:
@@ -53,8 +54,8 @@ class Product(Builtin):
                 for value in int_values:
                     if isinstance(value, IntValue):
                         product_value *= value.value
-                return IntValue(product_value)
-        return NoneValue()
+                return int_value(product_value)
+        return none_value()
 
 
 class Max(Builtin):
@@ -64,8 +65,8 @@ class Max(Builtin):
         ]
         Builtin.__init__(self, Keyword.MAX.value, parameters, IntType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
         if isinstance(list_value, ListValue):
             int_values: List[PetlValue] = list_value.values
             if int_values and isinstance(int_values[0], IntValue):
@@ -74,7 +75,7 @@ class Max(Builtin):
                     if isinstance(value, IntValue):
                         max_value = value if value.value > max_value.value else max_value
                 return max_value
-        return NoneValue()
+        return none_value()
 
 
 class Min(Builtin):
@@ -84,8 +85,8 @@ class Min(Builtin):
         ]
         Builtin.__init__(self, Keyword.MIN.value, parameters, IntType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
         if isinstance(list_value, ListValue):
             int_values: List[PetlValue] = list_value.values
             if int_values and isinstance(int_values[0], IntValue):
@@ -94,7 +95,7 @@ class Min(Builtin):
                     if isinstance(value, IntValue):
                         min_value = value if value.value < min_value.value else min_value
                 return min_value
-        return NoneValue()
+        return none_value()
 
 
 class Sort(Builtin):
@@ -104,12 +105,12 @@ class Sort(Builtin):
         ]
         Builtin.__init__(self, Keyword.SORT.value, parameters, IntType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
         if isinstance(list_value, ListValue):
             int_values: List[PetlValue] = list_value.values
             if int_values:
                 sorted_values: List[PetlValue] = sorted(int_values, key=lambda v: v.value)
                 return ListValue(ListType(IntType()), sorted_values)
             return list_value
-        return NoneValue()
+        return none_value()
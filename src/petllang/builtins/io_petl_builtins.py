@@ -1,33 +1,38 @@
 from petllang.builtins.builtin_definitions import Builtin
 from petllang.phases.interpreter.definitions.value import *
-from petllang.phases.interpreter.environment import InterpreterEnvironment
 from petllang.phases.lexer.definitions.keyword_petl import Keyword
 from petllang.phases.parser.defintions.expression import Application
 
 
 class ReadLn(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         Builtin.__init__(self, Keyword.READLN.value, [], StringType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
         return StringValue(input())
 
 
 class Print(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         Builtin.__init__(self, Keyword.PRINT.value, [("value", AnyType())], NoneType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        value: PetlValue = environment.get("value", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        value: PetlValue = arguments[0]
         print(value.to_string().encode().decode('unicode_escape'), end="")
-        return NoneValue()
+        return none_value()
 
 
 class PrintLn(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         Builtin.__init__(self, Keyword.PRINTLN.value, [("value", AnyType())], NoneType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        value: PetlValue = environment.get("value", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        value: PetlValue = arguments[0]
         print(value.to_string().encode().decode('unicode_escape'))
-        return NoneValue()
\ No newline at end of file
+        return none_value()
\ No newline at end of file
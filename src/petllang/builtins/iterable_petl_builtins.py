@@ -1,6 +1,5 @@
-from petllang.builtins.builtin_definitions import Builtin, extract_iterable_values, extract_element_type
+from petllang.builtins.builtin_definitions import Builtin, require_iterable, extract_element_type
 from petllang.phases.interpreter.definitions.value import *
-from petllang.phases.interpreter.environment import InterpreterEnvironment
 from petllang.phases.lexer.definitions.keyword_petl import Keyword
 from petllang.phases.parser.defintions.expression import Application
 
@@ -13,38 +12,49 @@ class Zip(Builtin):
         ]
         Builtin.__init__(self, Keyword.ZIP.value, parameters, ListType(TupleType([AnyType(), AnyType()])))
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        iterable1_value: PetlValue = environment.get("iterable1", application.token, error)
-        iterable2_value: PetlValue = environment.get("iterable2", application.token, error)
-        iterable1_values = extract_iterable_values(self.name, iterable1_value, application.token, error)
-        iterable2_values = extract_iterable_values(self.name, iterable2_value, application.token, error)
-        if iterable1_values and iterable2_values:
-            if len(iterable1_values) == len(iterable2_values):
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        iterable1_value: PetlValue = arguments[0]
+        iterable2_value: PetlValue = arguments[1]
+        if require_iterable(self.name, iterable1_value, application.token, error) and require_iterable(self.name, iterable2_value, application.token, error) and \
+                not iterable1_value.is_empty() and not iterable2_value.is_empty():
+            if iterable1_value.length() == iterable2_value.length():
                 iterable1_element_type: PetlType = extract_element_type(iterable1_value)
                 iterable2_element_type: PetlType = extract_element_type(iterable2_value)
                 zipped_element_type: TupleType = TupleType([iterable1_element_type, iterable2_element_type])
-                zipped_values: List[TupleValue] = list(map(lambda v1, v2: TupleValue(zipped_element_type, [v1, v2]), iterable1_values, iterable2_values))
+                stage: Callable[[Iterator[PetlValue], Iterator[PetlValue]], Iterator[PetlValue]] = \
+                    lambda values1, values2: map(lambda v1, v2: TupleValue(zipped_element_type, [v1, v2]), values1, values2)
+                if application.fused:
+                    return StreamValue(ListType(zipped_element_type), [iterable1_value, iterable2_value], stage, keeps_length=True)
+                zipped_values: List[TupleValue] = list(stage(iterable1_value.iterate(), iterable2_value.iterate()))
                 return ListValue(ListType(zipped_element_type), zipped_values)
             else:
                 error(f"Zip requires iterables of equal length", application.token)
-        return NoneValue()
+        return none_value()
 
 
 class Len(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [("iterable", IterableType())]
         Builtin.__init__(self, Keyword.LEN.value, parameters, IntType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        iterable_value: PetlValue = environment.get("iterable", application.token, error)
-        return IntValue(len(extract_iterable_values(self.name, iterable_value, application.token, error)))
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        iterable_value: PetlValue = arguments[0]
+        if require_iterable(self.name, iterable_value, application.token, error):
+            return int_value(iterable_value.length())
+        return none_value()
 
 
 class IsEmpty(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [("iterable", IterableType())]
-        Builtin.__init__(self, Keyword.LEN.value, parameters, IntType())
+        Builtin.__init__(self, Keyword.ISEMPTY.value, parameters, BoolType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        iterable_value: PetlValue = environment.get("iterable", application.token, error)
-        return BoolValue(len(extract_iterable_values(self.name, iterable_value, application.token, error)) == 0)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        iterable_value: PetlValue = arguments[0]
+        if require_iterable(self.name, iterable_value, application.token, error):
+            return bool_value(iterable_value.is_empty())
+        return none_value()
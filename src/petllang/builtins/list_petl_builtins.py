@@ -1,8 +1,7 @@
-from copy import deepcopy
+from itertools import chain
 
 from petllang.builtins.builtin_definitions import Builtin, extract_element_type
 from petllang.phases.interpreter.definitions.value import *
-from petllang.phases.interpreter.environment import InterpreterEnvironment
 from petllang.phases.interpreter.type_resolution import types_conform
 from petllang.phases.lexer.definitions.keyword_petl import Keyword
 from petllang.phases.parser.defintions.expression import Application
@@ -17,16 +16,13 @@ class Insert(Builtin):
         ]
         Builtin.__init__(self, Keyword.INSERT.value, parameters, ListType(AnyType()))
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
-        value: PetlValue = environment.get("value", application.token, error)
-        index_value: PetlValue = environment.get("index", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
+        value: PetlValue = arguments[1]
+        index_value: PetlValue = arguments[2]
         if isinstance(list_value, ListValue) and isinstance(index_value, IntValue):
-            list_values: List[PetlValue] = deepcopy(list_value.values)
-            index_value: IntValue = index_value
-            list_values.insert(index_value.value, value)
-            return ListValue(list_value.petl_type, list_values)
-        return NoneValue()
+            return ListValue(list_value.petl_type, list_value.vector.insert(index_value.value, value))
+        return none_value()
 
 
 class Remove(Builtin):
@@ -37,14 +33,12 @@ class Remove(Builtin):
         ]
         Builtin.__init__(self, Keyword.REMOVE.value, parameters, ListType(AnyType()))
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
-        index_value: PetlValue = environment.get("index", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
+        index_value: PetlValue = arguments[1]
         if isinstance(list_value, ListValue) and isinstance(index_value, IntValue):
-            list_values: List[PetlValue] = deepcopy(list_value.values)
-            list_values.pop(index_value.value)
-            return ListValue(list_value.petl_type, list_values)
-        return NoneValue()
+            return ListValue(list_value.petl_type, list_value.vector.remove(index_value.value))
+        return none_value()
 
 
 class Replace(Builtin):
@@ -56,15 +50,13 @@ class Replace(Builtin):
         ]
         Builtin.__init__(self, Keyword.REPLACE.value, parameters, ListType(AnyType()))
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
-        index_value: PetlValue = environment.get("index", application.token, error)
-        new_value: PetlValue = environment.get("new_value", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
+        index_value: PetlValue = arguments[1]
+        new_value: PetlValue = arguments[2]
         if isinstance(list_value, ListValue) and isinstance(index_value, IntValue):
-            list_values: List[PetlValue] = deepcopy(list_value.values)
-            list_values[index_value.value] = new_value
-            return ListValue(list_value.petl_type, list_values)
-        return NoneValue()
+            return ListValue(list_value.petl_type, list_value.vector.replace(index_value.value, new_value))
+        return none_value()
     pass
 
 
@@ -75,11 +67,11 @@ class Front(Builtin):
         ]
         Builtin.__init__(self, Keyword.FRONT.value, parameters, AnyType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
-        if isinstance(list_value, ListValue) and list_value.values:
-            return list_value.values[0]
-        return NoneValue()
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
+        if isinstance(list_value, ListValue) and list_value.length():
+            return list_value.elements()[0]
+        return none_value()
 
 
 class Back(Builtin):
@@ -89,11 +81,11 @@ class Back(Builtin):
         ]
         Builtin.__init__(self, Keyword.BACK.value, parameters, AnyType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
-        if isinstance(list_value, ListValue) and list_value.values:
-            return list_value.values[-1]
-        return NoneValue()
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
+        if isinstance(list_value, ListValue) and list_value.length():
+            return list_value.elements()[-1]
+        return none_value()
 
 
 class Head(Builtin):
@@ -103,11 +95,11 @@ class Head(Builtin):
         ]
         Builtin.__init__(self, Keyword.HEAD.value, parameters, AnyType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
-        if isinstance(list_value, ListValue) and list_value.values:
-            return ListValue(list_value.petl_type, deepcopy(list_value.values)[1:])
-        return NoneValue()
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
+        if isinstance(list_value, ListValue) and list_value.length():
+            return ListValue(list_value.petl_type, list_value.vector.slice(1, list_value.length()))
+        return none_value()
 
 
 class Tail(Builtin):
@@ -117,11 +109,11 @@ class Tail(Builtin):
         ]
         Builtin.__init__(self, Keyword.TAIL.value, parameters, AnyType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
-        if isinstance(list_value, ListValue) and list_value.values:
-            return ListValue(list_value.petl_type, deepcopy(list_value.values)[:-1])
-        return NoneValue()
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
+        if isinstance(list_value, ListValue) and list_value.length():
+            return ListValue(list_value.petl_type, list_value.vector.slice(0, -1))
+        return none_value()
 
 
 class Slice(Builtin):
@@ -133,10 +125,10 @@ class Slice(Builtin):
         ]
         Builtin.__init__(self, Keyword.SLICE.value, parameters, ListType(AnyType()))
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
-        start_value: PetlValue = environment.get("string_value", application.token, error)
-        end_value: PetlValue = environment.get("string_value", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
+        start_value: PetlValue = arguments[1]
+        end_value: PetlValue = arguments[2]
         element_type: PetlType = extract_element_type(list_value)
 
         if isinstance(list_value, ListValue) and isinstance(start_value, IntValue) and isinstance(end_value, IntValue):
@@ -146,15 +138,17 @@ class Slice(Builtin):
 
             if start < 0 or end < 0 or \
                     start >= len(list_values) or end >= len(list_values) or \
-                    start_value > end_value:
+                    start > end:
                 error(f"Invalid slice range value(s)", application.token)
-                return NoneValue()
+                return none_value()
 
             return ListValue(element_type, list_values[start:end])
-        return NoneValue()
+        return none_value()
 
 
 class Contains(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [
             ("list", ListType(AnyType())),
@@ -162,17 +156,17 @@ class Contains(Builtin):
         ]
         Builtin.__init__(self, Keyword.CONTAINS.value, parameters, BoolType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
-        value: PetlValue = environment.get("value", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
+        value: PetlValue = arguments[1]
         if isinstance(list_value, ListValue):
-            list_values: List[PetlValue] = list_value.values
-            contains: bool = any(map(lambda v: values_equal(v, value), list_values))
-            return BoolValue(contains)
-        return BoolValue(False)
+            return bool_value(list_value.find(value) >= 0)
+        return bool_value(False)
 
 
 class Find(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [
             ("list", ListType(AnyType())),
@@ -180,14 +174,12 @@ class Find(Builtin):
         ]
         Builtin.__init__(self, Keyword.FIND.value, parameters, IntType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
-        value: PetlValue = environment.get("value", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
+        value: PetlValue = arguments[1]
         if isinstance(list_value, ListValue):
-            for i, v in enumerate(list_value.values):
-                if values_equal(v, value):
-                    return IntValue(i)
-        return IntValue(-1)
+            return int_value(list_value.find(value))
+        return int_value(-1)
 
 
 class Fill(Builtin):
@@ -198,16 +190,16 @@ class Fill(Builtin):
         ]
         Builtin.__init__(self, Keyword.FILL.value, parameters, ListType(AnyType()))
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        count_value: PetlValue = environment.get("count", application.token, error)
-        value: PetlValue = environment.get("value", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        count_value: PetlValue = arguments[0]
+        value: PetlValue = arguments[1]
         if isinstance(count_value, IntValue):
             if count_value.value <= 0:
                 error(f"Fill requires positive non-zero integer value for \'count\'", application.token)
             else:
                 list_values: List[PetlValue] = [value] * count_value.value
                 return ListValue(ListType(value.petl_type), list_values)
-        return NoneValue()
+        return none_value()
 
 
 class Reverse(Builtin):
@@ -217,13 +209,11 @@ class Reverse(Builtin):
         ]
         Builtin.__init__(self, Keyword.REVERSE.value, parameters, ListType(AnyType()))
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
         if isinstance(list_value, ListValue):
-            list_values: List[PetlValue] = deepcopy(list_value.values)
-            list_values.reverse()
-            return ListValue(list_value.petl_type, list_values)
-        return NoneValue()
+            return ListValue(list_value.petl_type, list_value.values[::-1])
+        return none_value()
 
 
 class Set(Builtin):
@@ -234,25 +224,16 @@ class Set(Builtin):
         ]
         Builtin.__init__(self, Keyword.SET.value, parameters, ListType(AnyType()))
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list1_value: PetlValue = environment.get("list1", application.token, error)
-        list2_value: PetlValue = environment.get("list2", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list1_value: PetlValue = arguments[0]
+        list2_value: PetlValue = arguments[1]
         if types_conform(application.token, list1_value.petl_type, list2_value.petl_type, error):
             if isinstance(list1_value, ListValue) and isinstance(list2_value, ListValue):
-                all_values: List[PetlValue] = deepcopy(list1_value.values)
-                all_values.extend(list2_value.values)
-                set_values: List[PetlValue] = []
-
-                def add_unique_value(value: PetlValue):
-                    for v in set_values:
-                        if values_equal(value, v):
-                            return
-                    set_values.append(value)
-
-                for v in all_values:
-                    add_unique_value(v)
-                return ListValue(list1_value.petl_type, set_values)
-        return NoneValue()
+                set_values: Dict[Hashable, PetlValue] = {}
+                for v in chain(list1_value.elements(), list2_value.elements()):
+                    set_values.setdefault(v.hash_key(), v)
+                return ListValue(list1_value.petl_type, list(set_values.values()))
+        return none_value()
 
 
 class Intersect(Builtin):
@@ -263,24 +244,16 @@ class Intersect(Builtin):
         ]
         Builtin.__init__(self, Keyword.INTERSECT.value, parameters, ListType(AnyType()))
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list1_value: PetlValue = environment.get("list1", application.token, error)
-        list2_value: PetlValue = environment.get("list2", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list1_value: PetlValue = arguments[0]
+        list2_value: PetlValue = arguments[1]
         if types_conform(application.token, list1_value.petl_type, list2_value.petl_type, error):
             if isinstance(list1_value, ListValue) and isinstance(list2_value, ListValue):
-                list1_values: List[PetlValue] = deepcopy(list1_value.values)
-                list2_values: List[PetlValue] = deepcopy(list2_value.values)
-                intersect_values: List[PetlValue] = []
-
-                def add_unique_value(value: PetlValue):
-                    for v in intersect_values:
-                        if values_equal(value, v):
-                            return
-                    intersect_values.append(value)
-
-                for v1 in list1_values:
-                    for v2 in list2_values:
-                        if values_equal(v1, v2):
-                            add_unique_value(v1)
-                return ListValue(list1_value.petl_type, intersect_values)
-        return NoneValue()
+                list2_index: Dict[Hashable, int] = list2_value.membership_index()
+                intersect_values: Dict[Hashable, PetlValue] = {}
+                for v in list1_value.elements():
+                    key: Hashable = v.hash_key()
+                    if key in list2_index:
+                        intersect_values.setdefault(key, v)
+                return ListValue(list1_value.petl_type, list(intersect_values.values()))
+        return none_value()
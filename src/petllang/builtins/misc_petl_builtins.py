@@ -2,21 +2,24 @@ import random
 
 from petllang.builtins.builtin_definitions import Builtin
 from petllang.phases.interpreter.definitions.value import *
-from petllang.phases.interpreter.environment import InterpreterEnvironment
 from petllang.phases.lexer.definitions.keyword_petl import Keyword
 from petllang.phases.parser.defintions.expression import Application
 
 
 class Type(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [("value", AnyType())]
         Builtin.__init__(self, Keyword.TYPE.value, parameters, StringType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        return StringValue(environment.get("value", application.token, error).petl_type.to_string())
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        return StringValue(arguments[0].petl_type.to_string())
 
 
 class Rand(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [
             ("lower", IntType()),
@@ -24,9 +27,9 @@ class Rand(Builtin):
         ]
         Builtin.__init__(self, Keyword.RAND.value, parameters, IntType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        lower_value: PetlValue = environment.get("lower", application.token, error)
-        upper_value: PetlValue = environment.get("upper", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        lower_value: PetlValue = arguments[0]
+        upper_value: PetlValue = arguments[1]
         if isinstance(lower_value, IntValue) and isinstance(upper_value, IntValue):
-            return IntValue(random.randint(lower_value.value, upper_value.value))
-        return NoneValue()
+            return int_value(random.randint(lower_value.value, upper_value.value))
+        return none_value()
@@ -1,11 +1,12 @@
 from petllang.builtins.builtin_definitions import Builtin
 from petllang.phases.interpreter.definitions.value import *
-from petllang.phases.interpreter.environment import InterpreterEnvironment
 from petllang.phases.lexer.definitions.keyword_petl import Keyword
 from petllang.phases.parser.defintions.expression import Application
 
 
 class Substr(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [
             ("string_value", StringType()),
@@ -14,10 +15,10 @@ class Substr(Builtin):
         ]
         Builtin.__init__(self, Keyword.SUBSTR.value, parameters, StringType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        string_value: PetlValue = environment.get("string_value", application.token, error)
-        start_value: PetlValue = environment.get("start", application.token, error)
-        end_value: PetlValue = environment.get("end", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        string_value: PetlValue = arguments[0]
+        start_value: PetlValue = arguments[1]
+        end_value: PetlValue = arguments[2]
 
         if isinstance(string_value, StringValue) and isinstance(start_value, IntValue) and isinstance(end_value, IntValue):
             string: str = string_value.value
@@ -28,22 +29,26 @@ class Substr(Builtin):
                     start >= len(string) or end >= len(string) or \
                     start > end:
                 error(f"Invalid substr range value(s)", application.token)
-                return NoneValue()
+                return none_value()
 
             return StringValue(string[start:end])
-        return NoneValue()
+        return none_value()
 
 
 class ToStr(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [("v", AnyType())]
         Builtin.__init__(self, Keyword.TOSTR.value, parameters, StringType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        return StringValue(environment.get("v", application.token, error).to_string())
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        return StringValue(arguments[0].to_string())
 
 
 class JoinStr(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [
             ("v", ListType(AnyType())),
@@ -51,40 +56,46 @@ class JoinStr(Builtin):
         ]
         Builtin.__init__(self, Keyword.JOINSTR.value, parameters, StringType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("v", application.token, error)
-        join_value: PetlValue = environment.get("joiner", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
+        join_value: PetlValue = arguments[1]
         if isinstance(list_value, ListValue) and isinstance(join_value, StringValue):
-            return StringValue(join_value.value.join([value.to_string() for value in list_value.values]))
+            return StringValue(join_value.value.join(map(lambda value: value.to_string(), list_value.iterate())))
 
 
 class ToUpper(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [("s", StringType())]
         Builtin.__init__(self, Keyword.TOUPPER.value, parameters, StringType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        s_value: PetlValue = environment.get("s", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        s_value: PetlValue = arguments[0]
         if isinstance(s_value, StringValue):
             string: str = s_value.value
             return StringValue(string.upper())
-        return NoneValue()
+        return none_value()
 
 
 class ToLower(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [("s", StringType())]
         Builtin.__init__(self, Keyword.TOLOWER.value, parameters, StringType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        s_value: PetlValue = environment.get("s", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        s_value: PetlValue = arguments[0]
         if isinstance(s_value, StringValue):
             string: str = s_value.value
             return StringValue(string.lower())
-        return NoneValue()
+        return none_value()
 
 
 class StartsWith(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [
             ("s1", StringType()),
@@ -92,15 +103,17 @@ class StartsWith(Builtin):
         ]
         Builtin.__init__(self, Keyword.STARTSWITH.value, parameters, BoolType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        s1_value: PetlValue = environment.get("s1", application.token, error)
-        s2_value: PetlValue = environment.get("s2", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        s1_value: PetlValue = arguments[0]
+        s2_value: PetlValue = arguments[1]
         if isinstance(s1_value, StringValue) and isinstance(s2_value, StringValue):
-            return BoolValue(s1_value.value.startswith(s2_value.value))
-        return BoolValue(False)
+            return bool_value(s1_value.value.startswith(s2_value.value))
+        return bool_value(False)
 
 
 class EndsWith(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [
             ("s1", StringType()),
@@ -108,9 +121,9 @@ class EndsWith(Builtin):
         ]
         Builtin.__init__(self, Keyword.ENDSWITH.value, parameters, BoolType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        s1_value: PetlValue = environment.get("s1", application.token, error)
-        s2_value: PetlValue = environment.get("s2", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        s1_value: PetlValue = arguments[0]
+        s2_value: PetlValue = arguments[1]
         if isinstance(s1_value, StringValue) and isinstance(s2_value, StringValue):
-            return BoolValue(s1_value.value.endswith(s2_value.value))
-        return BoolValue(False)
+            return bool_value(s1_value.value.endswith(s2_value.value))
+        return bool_value(False)
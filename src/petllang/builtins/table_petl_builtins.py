@@ -5,17 +5,30 @@ from pathlib import Path
 from typing import Dict, Optional
 
 from backend.utils.config import Config
-from petllang.builtins.builtin_definitions import Builtin, from_string_value
+from petllang.builtins.builtin_definitions import Builtin
+from petllang.builtins.csv_cache import get_cache_path, load_cached_table, store_cached_table
+from petllang.builtins.csv_reader import CsvColumnConverter, create_column_converters, get_schema_mismatch_error, \
+    header_matches_schema_names, read_csv_table_value
 from petllang.phases.interpreter.definitions.value import *
-from petllang.phases.interpreter.environment import InterpreterEnvironment
 from petllang.phases.interpreter.type_resolution import types_conform
 from petllang.phases.lexer.definitions.keyword_petl import Keyword
 from petllang.phases.parser.defintions.expression import Application
-from petllang.query.executor import execute_query
+from petllang.query.executor import compile_query, CompiledQuery, add_variable_to_query_environment, join_row_indices, \
+    check_query, get_variable_types
+from petllang.query.plan import PlanNode, FilterNode, ProjectNode, JoinNode, AppendNode, CsvScanNode, table_plan, \
+    lazy_table_value, copy_schema
 
 session_key: Optional[str] = None
 
 
+def get_csv_path(path_value: StringValue) -> Path:
+    path = Path(path_value.value + ".csv")
+    if session_key:
+        #TODO sanitize path_value to prevent directory traversal attacks
+        path = Path(f"{Config.CSV.DIRECTORY}/{session_key}/{path.name}")
+    return path
+
+
 # Join and Select helper functions #
 def get_selected_indices(table_columns: List[Tuple[StringValue, PetlType]],
                          selected_columns: List[str],
@@ -28,16 +41,6 @@ def get_selected_indices(table_columns: List[Tuple[StringValue, PetlType]],
     return valid_columns
 
 
-def add_variable_to_query_environment(table_columns: List[Tuple[StringValue, PetlType]],
-                                      row: PetlValue,
-                                      table_name: Optional[str] = None) -> List[Tuple[str, PetlValue]]:
-    variables = []
-    if isinstance(row, TupleValue):
-        for (column_name, column_type), columns_value in zip(table_columns, row.values):
-            variables.append((f"{table_name}.{column_name.value}" if table_name else column_name.value, columns_value))
-    return variables
-
-
 def get_selected_values(indices: Dict[int, Tuple[str, PetlType]],
                         row: List[PetlValue]) -> List[PetlValue]:
     selected_values: List[PetlValue] = []
@@ -56,6 +59,8 @@ def get_columns(table_column_indices: Dict[int, Tuple[str, PetlType]]) -> List[T
         lambda k: (StringValue(table_column_indices[k][0].replace("left.", "").replace("right.", "")),
                    table_column_indices[k][1]),
         table_column_indices))
+
+
 # end helper functions #
 
 
@@ -67,9 +72,9 @@ class CreateTable(Builtin):
         ]
         Builtin.__init__(self, Keyword.CREATETABLE.value, parameters, TableType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        schema_value: PetlValue = environment.get("schema", application.token, error)
-        rows_value: PetlValue = environment.get("rows", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        schema_value: PetlValue = arguments[0]
+        rows_value: PetlValue = arguments[1]
         if isinstance(schema_value, SchemaValue) and isinstance(rows_value, ListValue):
             schema_values: List[Tuple[PetlValue, PetlType]] = schema_value.values
             rows: List[PetlValue] = rows_value.values
@@ -79,10 +84,10 @@ class CreateTable(Builtin):
                     zipped_tuple_schema_values = list(map(lambda tv, sv: (tv, sv), tuple_value.values, schema_values))
                     for value, column in zipped_tuple_schema_values:
                         if not types_conform(application.token, value.petl_type, column[1], error):
-                            return NoneValue()
+                            return none_value()
             if isinstance(schema_value.petl_type, SchemaType):
-                return TableValue(TableType(SchemaType(schema_value.petl_type.column_types)), schema_value, rows)
-        return NoneValue()
+                return create_table_value(TableType(SchemaType(schema_value.petl_type.column_types)), schema_value, rows)
+        return none_value()
 
 
 class Column(Builtin):
@@ -93,22 +98,21 @@ class Column(Builtin):
         ]
         Builtin.__init__(self, Keyword.COLUMN.value, parameters, TableType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        list_value: PetlValue = environment.get("list", application.token, error)
-        name_value: PetlValue = environment.get("name", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        list_value: PetlValue = arguments[0]
+        name_value: PetlValue = arguments[1]
         if isinstance(list_value, ListValue) and isinstance(name_value, StringValue):
             if len(list_value.values) == 0:
                 error("Cannot create table from empty list", application.token)
-                return NoneValue()
+                return none_value()
             element_type = list_value.values[0].petl_type
             if isinstance(list_value.petl_type, ListType):
                 list_value.petl_type.element_type = element_type
 
             st = SchemaType([element_type])
             schema = SchemaValue(st, [(name_value, element_type)])
-            rows = list(map(lambda v: TupleValue(TupleType([element_type]), [v]), list_value.values))
-            return TableValue(TableType(st), schema, rows)
-        return NoneValue()
+            return TableValue(TableType(st), schema, columns=[TableColumn.from_values(element_type, list_value.values)])
+        return none_value()
 
 
 class ReadCsv(Builtin):
@@ -120,10 +124,10 @@ class ReadCsv(Builtin):
         ]
         Builtin.__init__(self, Keyword.READCSV.value, parameters, TableType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        schema_value: PetlValue = environment.get("schema", application.token, error)
-        path_value: PetlValue = environment.get("path", application.token, error)
-        header_value: PetlValue = environment.get("header", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        schema_value: PetlValue = arguments[0]
+        path_value: PetlValue = arguments[1]
+        header_value: PetlValue = arguments[2]
 
         if isinstance(path_value, StringValue) and isinstance(header_value, BoolValue) and isinstance(schema_value,
                                                                                                       SchemaValue):
@@ -131,43 +135,71 @@ class ReadCsv(Builtin):
             header_value: BoolValue = header_value
             schema_value: SchemaValue = schema_value
 
-            def header_matches_schema_names(header_row: List[str], schema_value: SchemaValue) -> bool:
-                return all(map(lambda h, sv: h == sv[0].value, header_row, schema_value.values))
+            path = get_csv_path(path_value)
+            cache_path: Optional[Path] = get_cache_path(path, schema_value, header_value.value)
+            table_value: Optional[TableValue] = load_cached_table(cache_path, schema_value) if cache_path else None
+            if table_value is not None:
+                return table_value
 
-            def row_matches_schema(row: List[PetlValue], schema_value: SchemaValue) -> bool:
-                return all(
-                    map(lambda value, column: types_conform(application.token, value.petl_type, column[1], error), row,
-                        schema_value.values))
+            converters: List[CsvColumnConverter] = create_column_converters(schema_value, application.token, error)
+            try:
+                table_value = read_csv_table_value(schema_value, converters, path, header_value.value, application.token, error)
+            except FileNotFoundError as _:
+                failed_path = Path(f"{path_value.value}.csv") if not session_key else path
+                error(f"CSV file not found: {failed_path}", application.token)
+            except Exception as read_csv_exception:
+                error(f"Failed to read CSV: {path_value.value}: {read_csv_exception}", application.token)
 
-            path = Path(path_value.value + ".csv")
-            if session_key:
-                #TODO sanitize path_value to prevent directory traversal attacks
-                path = Path(f"{Config.CSV.DIRECTORY}/{session_key}/{path.name}")
+            schema_mismatch_error: Optional[str] = get_schema_mismatch_error(converters)
+            if schema_mismatch_error:
+                error(schema_mismatch_error, application.token)
+                return none_value()
+            if table_value is not None:
+                if cache_path:
+                    store_cached_table(table_value, cache_path)
+                return table_value
+        return none_value()
+
+
+class ScanCsv(Builtin):
+    def __init__(self):
+        parameters = [
+            ("schema", SchemaType()),
+            ("path", StringType()),
+            ("header", BoolType())
+        ]
+        Builtin.__init__(self, Keyword.SCANCSV.value, parameters, TableType())
+
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        schema_value: PetlValue = arguments[0]
+        path_value: PetlValue = arguments[1]
+        header_value: PetlValue = arguments[2]
+
+        if isinstance(path_value, StringValue) and isinstance(header_value, BoolValue) and isinstance(schema_value,
+                                                                                                      SchemaValue):
+            path_value: StringValue = path_value
+            header_value: BoolValue = header_value
+            schema_value: SchemaValue = schema_value
+
+            # Only the header is read here, the rows are read in chunks each time the table is consumed
+            path = get_csv_path(path_value)
+            header_row: Optional[List[str]] = None
             try:
                 with open(path, mode='r') as csv_file:
-                    csv_file_rows: List[List[str]] = list(csv.reader(csv_file))
-                    if isinstance(schema_value.petl_type, SchemaType):
-                        row_type: TupleType = TupleType(schema_value.petl_type.column_types)
-                        rows: List[PetlValue] = []
-                        if csv_file_rows:
-                            if header_value.value:
-                                header_row: List[str] = csv_file_rows[0]
-                                if not header_matches_schema_names(header_row, schema_value):
-                                    error(f"Provided schema does not match CSV header: {header_row}", application.token)
-                                    return NoneValue()
-
-                            for row in csv_file_rows[1 if header_value.value else 0:]:
-                                petl_value_row: List[PetlValue] = list(map(lambda v: from_string_value(v), row))
-                                if row_matches_schema(petl_value_row, schema_value):
-                                    rows.append(TupleValue(row_type, petl_value_row))
-
-                            return TableValue(TableType(schema_value.petl_type), schema_value, rows)
+                    header_row = next(csv.reader(csv_file), None)
             except FileNotFoundError as _:
                 failed_path = Path(f"{path_value.value}.csv") if not session_key else path
                 error(f"CSV file not found: {failed_path}", application.token)
             except Exception as read_csv_exception:
                 error(f"Failed to read CSV: {path_value.value}: {read_csv_exception}", application.token)
-        return NoneValue()
+
+            if header_row is None or not isinstance(schema_value.petl_type, SchemaType):
+                return none_value()
+            if header_value.value and not header_matches_schema_names(header_row, schema_value):
+                error(f"Provided schema does not match CSV header: {header_row}", application.token)
+                return none_value()
+            return lazy_table_value(CsvScanNode(copy_schema(schema_value), path, header_value.value, application.token, error))
+        return none_value()
 
 
 class WriteCsv(Builtin):
@@ -179,19 +211,15 @@ class WriteCsv(Builtin):
         ]
         Builtin.__init__(self, Keyword.WRITECSV.value, parameters, BoolType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        table_value: PetlValue = environment.get("table", application.token, error)
-        path_value: PetlValue = environment.get("path", application.token, error)
-        header_value: PetlValue = environment.get("header", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        table_value: PetlValue = arguments[0]
+        path_value: PetlValue = arguments[1]
+        header_value: PetlValue = arguments[2]
 
         if isinstance(path_value, StringValue) and isinstance(table_value, TableValue) and isinstance(header_value, BoolValue):
             header = []
             if header_value.value:
                 header = [v[0].value for v in table_value.schema.values]
-            rows = []
-            for row in table_value.rows:
-                if isinstance(row, TupleValue):
-                    rows.append(list(map(lambda v: v.value, row.values)))
 
             path = Path(f"{path_value.value}.csv")
             if session_key:
@@ -205,14 +233,17 @@ class WriteCsv(Builtin):
                     csv_writer = csv.writer(csv_file)
                     if header:
                         csv_writer.writerow(header)
-                    csv_writer.writerows(rows)
+                    # Rows are written one chunk at a time, so a streaming table is never held in memory
+                    for chunk in table_value.iter_chunks():
+                        csv_writer.writerows(list(map(lambda v: v.value, row.values))
+                                             for row in chunk.iter_rows() if isinstance(row, TupleValue))
                 if os.path.exists(path):
-                    return BoolValue(True)
+                    return bool_value(True)
                 else:
                     error(f"Failed to write CSV: {path}, unknown reason", application.token)
-            except Exception as write_csv_exception:
+            except (OSError, csv.Error) as write_csv_exception:
                 error(f"Failed to write CSV: {path_value.value}: {write_csv_exception}", application.token)
-        return NoneValue()
+        return none_value()
 
 
 class Join(Builtin):
@@ -225,11 +256,11 @@ class Join(Builtin):
         ]
         Builtin.__init__(self, Keyword.JOIN.value, parameters, TableType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        left_table_value: PetlValue = environment.get("left_table", application.token, error)
-        right_table_value: PetlValue = environment.get("right_table", application.token, error)
-        columns_value: PetlValue = environment.get("columns", application.token, error)
-        where_value: PetlValue = environment.get("where", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        left_table_value: PetlValue = arguments[0]
+        right_table_value: PetlValue = arguments[1]
+        columns_value: PetlValue = arguments[2]
+        where_value: PetlValue = arguments[3]
 
         if isinstance(left_table_value, TableValue) and isinstance(right_table_value, TableValue) \
                 and isinstance(columns_value, ListValue) and isinstance(where_value, StringValue):
@@ -238,17 +269,11 @@ class Join(Builtin):
             right_table_column_indices = get_selected_indices(right_table_value.schema.values, selected_columns, "right")
             columns_types = get_column_types(left_table_column_indices) + get_column_types(right_table_column_indices)
 
-            joined_rows: List[TupleValue] = []
-            for left_row in left_table_value.rows:
-                left_variables = add_variable_to_query_environment(left_table_value.schema.values, left_row, "left")
-                for right_row in right_table_value.rows:
-                    all_variables = left_variables + add_variable_to_query_environment(right_table_value.schema.values, right_row, "right")
-                    if execute_query(where_value.value, all_variables, application.token, error):
-                        if isinstance(left_row, TupleValue) and isinstance(right_row, TupleValue):
-                            joined_row_values = [*get_selected_values(left_table_column_indices, left_row.values),
-                                                 *get_selected_values(right_table_column_indices, right_row.values)]
-                            joined_rows.append(TupleValue(TupleType(columns_types), joined_row_values))
-
+            where_query: CompiledQuery = compile_query(where_value.value)
+            variable_types = {**get_variable_types(left_table_value.schema.values, "left"),
+                              **get_variable_types(right_table_value.schema.values, "right")}
+            if not check_query(where_query, variable_types, application.token, error):
+                return none_value()
             st = SchemaType(columns_types)
             combined_columns = get_columns(left_table_column_indices) + get_columns(right_table_column_indices)
 
@@ -256,14 +281,32 @@ class Join(Builtin):
             for column_name in combined_columns_names:
                 if combined_columns_names.count(column_name) > 1:
                     error(f"Join column \'{column_name}\' must be unique across both tables", application.token)
-                    return NoneValue()
+                    return none_value()
 
             schema = SchemaValue(st, combined_columns)
             tbt = TableType(st)
+
+            left_plan: Optional[PlanNode] = table_plan(left_table_value)
+            right_plan: Optional[PlanNode] = table_plan(right_table_value)
+            if left_plan is not None and right_plan is not None:
+                return lazy_table_value(JoinNode(left_plan, right_plan, where_query, list(left_table_column_indices),
+                                                 list(right_table_column_indices), schema, application.token, error))
+
+            joined_rows: List[TupleValue] = []
+            left_rows = left_table_value.rows
+            right_rows = right_table_value.rows
+            for left_index, right_index in join_row_indices(left_table_value, right_table_value, where_query, application.token, error):
+                left_row = left_rows[left_index]
+                right_row = right_rows[right_index]
+                if isinstance(left_row, TupleValue) and isinstance(right_row, TupleValue):
+                    joined_row_values = [*get_selected_values(left_table_column_indices, left_row.values),
+                                         *get_selected_values(right_table_column_indices, right_row.values)]
+                    joined_rows.append(TupleValue(TupleType(columns_types), joined_row_values))
+
             joined_table = TableValue(tbt, schema, joined_rows)
             return joined_table
 
-        return NoneValue()
+        return none_value()
 
 
 class With(Builtin):
@@ -275,36 +318,42 @@ class With(Builtin):
         ]
         Builtin.__init__(self, Keyword.WITH.value, parameters, TableType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        table_value: PetlValue = environment.get("table", application.token, error)
-        name_value: PetlValue = environment.get("name", application.token, error)
-        values_value: PetlValue = environment.get("values", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        table_value: PetlValue = arguments[0]
+        name_value: PetlValue = arguments[1]
+        values_value: PetlValue = arguments[2]
         if isinstance(table_value, TableValue) and isinstance(name_value, StringValue) and isinstance(values_value,
                                                                                                       ListValue):
             new_column_value_count = len(values_value.values)
             if new_column_value_count == 0:
                 error(f"New column \'{name_value.value}\' must contain values to be added to table", application.token)
-                return NoneValue()
+                return none_value()
 
-            row_count = len(table_value.rows)
+            row_count = table_value.row_count()
             if new_column_value_count != row_count:
                 error(
                     f"New column \'{name_value.value}\' must contain same number of rows ({row_count}) to be added to table",
                     application.token)
-                return NoneValue()
+                return none_value()
 
+            # Tables are shared between environments, so the new column is added to a copy
             new_column_type = values_value.values[0].petl_type
-            if isinstance(table_value.petl_type, TableType):
-                table_value.petl_type.schema_type.column_types.append(new_column_type)
-                table_value.schema.values.append((name_value, new_column_type))
+            with_schema: SchemaValue = copy_schema(table_value.schema)
+            with_schema.values.append((name_value, new_column_type))
+            with_schema.petl_type.column_types.append(new_column_type)
+            with_type: TableType = TableType(with_schema.petl_type)
 
+            if table_value.is_columnar():
+                with_columns: List[TableColumn] = table_value.columns + [TableColumn.from_values(new_column_type, values_value.values)]
+                return TableValue(with_type, with_schema, columns=with_columns, row_count=row_count)
+
+            row_type: TupleType = TupleType(with_schema.petl_type.column_types)
+            with_rows: List[PetlValue] = []
             for value, row in zip(values_value.values, table_value.rows):
-                if isinstance(row.petl_type, TupleType):
-                    row.petl_type.tuple_types.append(new_column_type)
                 if isinstance(row, TupleValue):
-                    row.values.append(value)
-            return table_value
-        return NoneValue()
+                    with_rows.append(TupleValue(row_type, row.values + [value]))
+            return TableValue(with_type, with_schema, with_rows)
+        return none_value()
 
 
 class Append(Builtin):
@@ -315,23 +364,27 @@ class Append(Builtin):
         ]
         Builtin.__init__(self, Keyword.APPEND.value, parameters, TableType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        table_value: PetlValue = environment.get("table", application.token, error)
-        rows_value: PetlValue = environment.get("rows", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        table_value: PetlValue = arguments[0]
+        rows_value: PetlValue = arguments[1]
         if isinstance(table_value, TableValue) and isinstance(rows_value, ListValue):
+            appended_rows: List[PetlValue] = []
             for row in rows_value.values:
                 if isinstance(row, TupleValue):
                     if len(row.values) != len(table_value.schema.values):
                         error(f"Appended row must have same number of columns as table", application.token)
-                        return NoneValue()
+                        return none_value()
                     for value, column in zip(row.values, table_value.schema.values):
                         if not types_conform(application.token, value.petl_type, column[1], error):
-                            return NoneValue()
+                            return none_value()
                     if isinstance(row.petl_type, TupleType) and isinstance(table_value.petl_type, TableType):
                         row.petl_type.tuple_types = table_value.petl_type.schema_type.column_types
-                    table_value.rows.append(row)
-            return table_value
-        return NoneValue()
+                    appended_rows.append(row)
+            appended_columns = rows_to_columns(table_value.column_types(), appended_rows) if table_value.is_lazy() else None
+            if appended_columns is not None:
+                return lazy_table_value(AppendNode(table_plan(table_value), appended_columns, len(appended_rows)))
+            return table_value.with_rows(appended_rows)
+        return none_value()
 
 
 class Select(Builtin):
@@ -343,28 +396,36 @@ class Select(Builtin):
         ]
         Builtin.__init__(self, Keyword.SELECT.value, parameters, TableType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        table_value: PetlValue = environment.get("table", application.token, error)
-        columns_value: PetlValue = environment.get("columns", application.token, error)
-        where_value: PetlValue = environment.get("where", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        table_value: PetlValue = arguments[0]
+        columns_value: PetlValue = arguments[1]
+        where_value: PetlValue = arguments[2]
 
         if isinstance(table_value, TableValue) and isinstance(columns_value, ListValue) and isinstance(where_value, StringValue):
             selected_columns = list(map(lambda c: c.value, columns_value.values))
             table_column_indices = get_selected_indices(table_value.schema.values, selected_columns)
             columns_types = get_column_types(table_column_indices)
 
+            where_query: CompiledQuery = compile_query(where_value.value)
+            if not check_query(where_query, get_variable_types(table_value.schema.values), application.token, error):
+                return none_value()
+            st = SchemaType(columns_types)
+            schema = SchemaValue(st, get_columns(table_column_indices))
+            tbt = TableType(st)
+
+            source_plan: Optional[PlanNode] = table_plan(table_value)
+            if source_plan is not None:
+                filter_plan = FilterNode(source_plan, where_query, where_query.root, application.token, error)
+                return lazy_table_value(ProjectNode(filter_plan, list(table_column_indices), schema))
+
             joined_rows: List[TupleValue] = []
             for row in table_value.rows:
                 variables = add_variable_to_query_environment(table_value.schema.values, row)
-                if execute_query(where_value.value, variables, application.token, error):
+                if where_query.execute(variables, application.token, error):
                     if isinstance(row, TupleValue):
                         joined_row_values = get_selected_values(table_column_indices, row.values)
                         joined_rows.append(TupleValue(TupleType(columns_types), joined_row_values))
 
-            st = SchemaType(columns_types)
-            schema = SchemaValue(st, get_columns(table_column_indices))
-
-            tbt = TableType(st)
             joined_table = TableValue(tbt, schema, joined_rows)
             return joined_table
 
@@ -377,9 +438,9 @@ class Drop(Builtin):
         ]
         Builtin.__init__(self, Keyword.DROP.value, parameters, TableType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        table_value: PetlValue = environment.get("table", application.token, error)
-        column_value: PetlValue = environment.get("column", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        table_value: PetlValue = arguments[0]
+        column_value: PetlValue = arguments[1]
         if isinstance(table_value, TableValue) and isinstance(column_value, StringValue):
             column_value: StringValue = column_value
             column_index = -1
@@ -388,7 +449,11 @@ class Drop(Builtin):
                     column_index = index
             if column_index == -1:
                 error(f"Column \'{column_value.value}\' does not exist in this table", application.token)
-                return NoneValue()
+                return none_value()
+
+            source_plan: Optional[PlanNode] = table_plan(table_value)
+            if source_plan is not None:
+                return lazy_table_value(ProjectNode(source_plan, [i for i in range(len(table_value.schema.values)) if i != column_index]))
 
             dropped_table_schema: SchemaValue = deepcopy(table_value.schema)
             dropped_table_schema.values.pop(column_index)
@@ -396,18 +461,18 @@ class Drop(Builtin):
                 dropped_table_schema.petl_type.column_types.pop(column_index)
 
             if isinstance(table_value.petl_type, TableType):
-                table_type: TableType = table_value.petl_type
+                table_type: TableType = TableType(SchemaType(list(table_value.petl_type.schema_type.column_types)))
                 table_type.schema_type.column_types.pop(column_index)
 
                 table_rows: List[PetlValue] = []
                 row_type: TupleType = TupleType(table_type.schema_type.column_types)
                 for row in table_value.rows:
                     if isinstance(row, TupleValue):
-                        dropped_row: TupleValue = TupleValue(row_type, row.values)
+                        dropped_row: TupleValue = TupleValue(row_type, list(row.values))
                         dropped_row.values.pop(column_index)
                         table_rows.append(dropped_row)
                 return TableValue(table_type, dropped_table_schema, table_rows)
-        return NoneValue()
+        return none_value()
 
 
 class GetColumns(Builtin):
@@ -418,15 +483,15 @@ class GetColumns(Builtin):
         ]
         Builtin.__init__(self, Keyword.GETCOLUMNS.value, parameters, TableType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        table_value: PetlValue = environment.get("table", application.token, error)
-        names_value: PetlValue = environment.get("names", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        table_value: PetlValue = arguments[0]
+        names_value: PetlValue = arguments[1]
         if isinstance(table_value, TableValue) and isinstance(names_value, ListValue):
             column_names = list(map(lambda t: t[0].value, table_value.schema.values))
             for name in names_value.values:
                 if isinstance(name, StringValue) and name.value not in column_names:
                     error(f"Column \'{name.value}\' does not exist in this table", application.token)
-                    return NoneValue()
+                    return none_value()
 
             columns = []
             column_indices = []
@@ -437,13 +502,17 @@ class GetColumns(Builtin):
                         column_indices.append(index)
             st = SchemaType(list(map(lambda c: c[1], columns)))
             schema = SchemaValue(st, columns)
+            source_plan: Optional[PlanNode] = table_plan(table_value)
+            if source_plan is not None:
+                return lazy_table_value(ProjectNode(source_plan, column_indices, schema))
+
             rows = []
             for row in table_value.rows:
                 if isinstance(row, TupleValue):
                     rows.append(TupleValue(TupleType(st.column_types),
                                            [v for index, v in enumerate(row.values) if index in column_indices]))
             return TableValue(TableType(st), schema, rows)
-        return NoneValue()
+        return none_value()
 
 
 class GetColumn(Builtin):
@@ -454,9 +523,9 @@ class GetColumn(Builtin):
         ]
         Builtin.__init__(self, Keyword.GETCOLUMN.value, parameters, ListType(TupleType()))
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        table_value: PetlValue = environment.get("table", application.token, error)
-        string_value: PetlValue = environment.get("name", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        table_value: PetlValue = arguments[0]
+        string_value: PetlValue = arguments[1]
         if isinstance(table_value, TableValue) and isinstance(string_value, StringValue):
             column_type: PetlType = UnknownType()
             column_index = -1
@@ -466,7 +535,10 @@ class GetColumn(Builtin):
                     column_index = index
             if isinstance(column_type, UnknownType):
                 error(f"Column \'{string_value.value}\' does not exist in this table", application.token)
-                return NoneValue()
+                return none_value()
+
+            if table_value.is_columnar():
+                return ListValue(ListType(column_type), table_value.columns[column_index].to_values())
 
             column_values = []
             for row in table_value.rows:
@@ -474,7 +546,7 @@ class GetColumn(Builtin):
                     column_values.append(row.values[column_index])
 
             return ListValue(ListType(column_type), column_values)
-        return NoneValue()
+        return none_value()
 
 
 class Collect(Builtin):
@@ -484,22 +556,24 @@ class Collect(Builtin):
         ]
         Builtin.__init__(self, Keyword.COLLECT.value, parameters, ListType(TupleType()))
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        table_value: PetlValue = environment.get("table", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        table_value: PetlValue = arguments[0]
         if isinstance(table_value, TableValue) and isinstance(table_value.schema.petl_type, SchemaType):
             return ListValue(ListType(TupleType(table_value.schema.petl_type.column_types)), table_value.rows)
-        return NoneValue()
+        return none_value()
 
 
 class Count(Builtin):
+    returns_declared_type = True
+
     def __init__(self):
         parameters = [
             ("table", TableType())
         ]
         Builtin.__init__(self, Keyword.COUNT.value, parameters, IntType())
 
-    def evaluate(self, application: Application, environment: InterpreterEnvironment, interpreter, error) -> PetlValue:
-        table_value: PetlValue = environment.get("table", application.token, error)
+    def call(self, arguments: List[PetlValue], application: Application, interpreter, error) -> PetlValue:
+        table_value: PetlValue = arguments[0]
         if isinstance(table_value, TableValue):
-            return IntValue(len(table_value.rows))
-        return NoneValue()
+            return int_value(sum(chunk.row_count() for chunk in table_value.iter_chunks()))
+        return none_value()
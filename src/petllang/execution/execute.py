@@ -1,18 +1,41 @@
 import io
 from contextlib import redirect_stdout
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 
-from petllang.phases.interpreter.definitions.value import PetlValue, NoneValue
+from petllang.phases.interpreter.definitions.value import PetlValue, NoneValue, none_value
+from petllang.phases.interpreter.closure_interpreter import ClosureInterpreter
 from petllang.phases.interpreter.environment import InterpreterEnvironment
-from petllang.phases.interpreter.interpreter import TreeWalkInterpreter, load_builtins
+from petllang.phases.interpreter.interpreter import TreeWalkInterpreter, InterpreterException, load_builtins, MAXIMUM_DEPTH
+from petllang.phases.interpreter.vm_interpreter import VirtualMachine
 from petllang.phases.lexer.definitions.token_petl import Token
 from petllang.phases.lexer.lexer import Lexer
+from petllang.phases.optimizer.optimizer import Optimizer
 from petllang.phases.parser.defintions.expression import Expression, UnknownExpression
 from petllang.phases.parser.parser import Parser
+from petllang.phases.type_checker.type_checker import TypeChecker
 from petllang.utils.log import Log
 from backend.utils.server_utils import escape_ansi
 
+INTERPRETER_ENGINES: Dict[str, type] = {
+    "tree": TreeWalkInterpreter,
+    "closure": ClosureInterpreter,
+    "vm": VirtualMachine
+}
+
+
+# Lazy tables nested in a script result can still fail while running their plans when rendered
+def render_value(value: Optional[PetlValue], logger: Log) -> str:
+    if value is None or isinstance(value, NoneValue):
+        return ""
+    try:
+        return value.to_string()
+    except InterpreterException as _:
+        return ""
+    except Exception as e:
+        logger.error(f"Unhandled exception while interpreting: {e}")
+        return ""
+
 
 async def execute_petl_script_direct(petl_input: str) -> str:
     debug = False
@@ -21,10 +44,9 @@ async def execute_petl_script_direct(petl_input: str) -> str:
     stdout_buffer = io.StringIO()
     with redirect_stdout(stdout_buffer):
         program_return_value: PetlValue = execute_petl_script(petl_input, debug, logger)
+        result_str: str = render_value(program_return_value, logger)
 
-    result = escape_ansi(stdout_buffer.getvalue())
-    if not isinstance(program_return_value, NoneValue):
-        result += program_return_value.to_string()
+    result = escape_ansi(stdout_buffer.getvalue()) + result_str
 
     logger.debug(f"Interpreter Output:\n{result}\n")
     return result
@@ -33,7 +55,11 @@ async def execute_petl_script_direct(petl_input: str) -> str:
 def execute_petl_script(petl_raw_str: str,
                         debug: bool,
                         logger: Log,
-                        environment: Optional[InterpreterEnvironment] = None) -> Optional[PetlValue]:
+                        environment: Optional[InterpreterEnvironment] = None,
+                        engine: str = "tree",
+                        type_check: bool = True,
+                        maximum_depth: int = MAXIMUM_DEPTH,
+                        optimize: bool = True) -> Optional[PetlValue]:
     start: datetime = datetime.now()
 
     lexer: Lexer = Lexer(debug)
@@ -46,15 +72,24 @@ def execute_petl_script(petl_raw_str: str,
         root: Expression = parser.parse(tokens)
 
         if root and not parser.logger.errors_occurred() and not isinstance(root, UnknownExpression):
-            interpreter: TreeWalkInterpreter = TreeWalkInterpreter(debug)
-
             if not environment:
                 environment = InterpreterEnvironment()
             environment = load_builtins(parser.builtins, environment)
 
+            if type_check:
+                type_checker: TypeChecker = TypeChecker(debug)
+                if not type_checker.check(root, environment):
+                    return none_value()
+
+            if optimize:
+                optimizer: Optimizer = Optimizer(debug)
+                root = optimizer.optimize(root)
+
+            interpreter: TreeWalkInterpreter = INTERPRETER_ENGINES[engine](debug, trusted=type_check, maximum_depth=maximum_depth)
             result_value = interpreter.interpret(root, environment)
 
-            logger.debug(f"DEBUG: {result_value.to_string()}")
+            if logger.get_debug_enabled():
+                logger.debug(f"DEBUG: {render_value(result_value, logger)}")
             end: datetime = datetime.now()
             delta = end - start
             logger.debug(str(delta.total_seconds()))
@@ -5,9 +5,11 @@ from os import getcwd
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 
-from petllang.execution.execute import execute_petl_script
-from petllang.phases.interpreter.definitions.value import PetlValue, NoneValue
+from petllang.builtins import csv_cache, csv_reader
+from petllang.execution.execute import execute_petl_script, render_value, INTERPRETER_ENGINES
+from petllang.phases.interpreter.definitions.value import PetlValue
 from petllang.phases.interpreter.environment import InterpreterEnvironment
+from petllang.phases.interpreter.interpreter import MAXIMUM_DEPTH
 from petllang.utils.log import Log
 
 
@@ -17,7 +19,14 @@ def parse_arguments():
     parser.add_argument("-f", "--file", required=False, metavar="{file}", help="Petl file to run")
     parser.add_argument("-d", "--debug", action="store_true", help="Enable debugging output")
     parser.add_argument("--no-debug", dest="debug", metavar="{debug}", help="Enable debugging output")
-    parser.set_defaults(debug=False)
+    parser.add_argument("--no-csv-cache", dest="csv_cache", action="store_false", help="Always parse CSV files instead of using cached tables")
+    parser.add_argument("-w", "--workers", type=int, metavar="{workers}", help="Number of processes used to read large CSV files")
+    parser.add_argument("-e", "--engine", choices=list(INTERPRETER_ENGINES), help="Interpreter engine used to run scripts")
+    parser.add_argument("--no-type-check", dest="type_check", action="store_false", help="Check types only while interpreting scripts")
+    parser.add_argument("--no-opt", dest="optimize", action="store_false", help="Interpret scripts without folding constant expressions first")
+    parser.add_argument("--max-depth", dest="maximum_depth", type=int, metavar="{depth}",
+                        help="Maximum expression depth, recursion deeper than Python's stack requires the vm engine")
+    parser.set_defaults(debug=False, csv_cache=True, engine="tree", type_check=True, maximum_depth=MAXIMUM_DEPTH, optimize=True)
     return vars(parser.parse_known_args(sys.argv)[0])
 
 
@@ -80,7 +89,7 @@ def read_repl_input(history: List[str], history_index: int, logger: Log) -> Opti
             return repl_input
 
 
-def run_petl_repl(logger: Log):
+def run_petl_repl(logger: Log, engine: str, type_check: bool, maximum_depth: int, optimize: bool):
     banner_str = "=" * 9
     logger.info(f"{banner_str}\nPetl REPL\n{banner_str}")
 
@@ -106,23 +115,33 @@ def run_petl_repl(logger: Log):
             interpreter_input += repl_input
             history.append(interpreter_input)
             history_index = len(history)
-            result_value: Optional[PetlValue] = execute_petl_script(interpreter_input, logger.get_debug_enabled(), logger, environment)
-            if result_value and not isinstance(result_value, NoneValue):
-                logger.info(result_value.to_string())
+            result_value: Optional[PetlValue] = execute_petl_script(interpreter_input, logger.get_debug_enabled(), logger, environment, engine, type_check, maximum_depth,
+                                                                     optimize)
+            result_str: str = render_value(result_value, logger)
+            if result_str:
+                logger.info(result_str)
             interpreter_input = ""
 
 
 def run_cli():
     arguments: Dict[str, Any] = parse_arguments()
     debug: bool = arguments["debug"]
+    engine: str = arguments.get("engine", "tree")
+    type_check: bool = arguments.get("type_check", True)
+    maximum_depth: int = arguments.get("maximum_depth", MAXIMUM_DEPTH)
+    optimize: bool = arguments.get("optimize", True)
 
     logger: Log = Log(debug)
+    if arguments.get("workers"):
+        csv_reader.csv_workers = arguments["workers"]
+    if not arguments.get("csv_cache", True):
+        csv_cache.csv_cache_enabled = False
     try:
         if arguments["file"]:
             petl_raw_str = read_petl_file(arguments["file"], logger)
             if petl_raw_str:
-                execute_petl_script(petl_raw_str, debug, logger)
+                execute_petl_script(petl_raw_str, debug, logger, engine=engine, type_check=type_check, maximum_depth=maximum_depth, optimize=optimize)
         else:
-            run_petl_repl(logger)
+            run_petl_repl(logger, engine, type_check, maximum_depth, optimize)
     except Exception as main_exception:
         logger.error(f"Unhandled exception occurred: {main_exception}, {traceback.format_exc()}")
@@ -0,0 +1,42 @@
+from typing import Any, List, Tuple
+
+# Instructions are tuples of an opcode followed by its operands, registers are indices into the frame's register list.
+# Expected type operands are either a PetlType or a tuple resolved by the VM: () is the type expected by the frame's
+# caller, (register, index) is the type expected for argument index of the value applied in register.
+DEPTH = 0               # depth, token
+LOAD = 1                # dst, identifier, expected, token, checked
+LITERAL = 2             # dst, value_class, value, literal_type, expected, token, checked
+BINARY = 3              # dst, operator_function, left, right, expected, token, operator_str, checked
+BRANCH = 4              # predicate, else_target, end_target, dst
+JUMP = 5                # target
+BIND = 6                # src, identifiers, token
+APPLY_PREPARE = 7       # function, argument_count, token, end_target, dst
+APPLY = 8               # dst, function, first_argument, argument_count, expected, application, depth, tail
+RETURN = 9              # src
+NONE = 10               # dst
+LAMBDA = 11             # dst, lambda_expression, expected
+FOR_PREPARE = 12        # iterable, iterator, outer_environment, token, end_target, dst
+FOR_NEXT = 13           # iterator, outer_environment, reference, exit_target
+MATCH_TYPE = 14         # value, case_type, identifier, token_str, fail_target
+JUMP_UNLESS_TRUE = 15   # predicate, target
+MATCH_LITERALS = 16     # value, literal_values, literals, token_str, fail_target
+MATCH_RANGE = 17        # value, bounds, range_definition, fail_target
+MAKE_LIST = 18          # dst, first_value, value_count, expected, token
+MAKE_TUPLE = 19         # dst, first_value, value_count, tuple_type, expected, token
+MAKE_DICT = 20          # dst, first_key, first_value, entry_count, expected, token
+RANGE = 21              # dst, range_definition, expected
+SCHEMA = 22             # dst, schema_definition, expected
+ALIAS = 23              # identifier, alias_type
+ERROR = 24              # text, token
+INVALID = 25            # expression
+
+Instruction = Tuple[Any, ...]
+
+
+class CodeUnit:
+    # Compiled expression, checked_instructions also tracks the expression depth and is run when a frame could exceed it
+    def __init__(self, instructions: List[Instruction], checked_instructions: List[Instruction], register_count: int, max_depth: int):
+        self.instructions = instructions
+        self.checked_instructions = checked_instructions
+        self.register_count = register_count
+        self.max_depth = max_depth
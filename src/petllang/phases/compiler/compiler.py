@@ -0,0 +1,326 @@
+from typing import Any, List
+
+from petllang.phases.compiler.bytecode import *
+from petllang.phases.interpreter.closure_interpreter import get_operator_function, ANY_TYPE, UNKNOWN_TYPE, BOOL_TYPE
+from petllang.phases.interpreter.definitions.value import *
+from petllang.phases.parser.defintions.expression import *
+
+# Operand for the type expected by the frame's caller
+FRAME_EXPECTED: Tuple = ()
+
+
+def int_literal_value(value: Any) -> PetlValue:
+    return int_value(int(value))
+
+
+def none_literal_value(_: Any) -> PetlValue:
+    return NONE_VALUE
+
+
+def literal_values(literals: List[Literal]) -> Optional[List[PetlValue]]:
+    values: List[PetlValue] = []
+    for literal in literals:
+        if isinstance(literal, IntLiteral):
+            values.append(int_value(literal.value))
+        elif isinstance(literal, BoolLiteral):
+            values.append(bool_value(literal.value))
+        elif isinstance(literal, CharLiteral):
+            values.append(char_value(literal.value))
+        elif isinstance(literal, StringLiteral):
+            values.append(StringValue(literal.value))
+        elif isinstance(literal, NoneLiteral):
+            values.append(none_value())
+        else:
+            return None
+    return values
+
+
+# Lowers an expression to register bytecode, every node writes its value to a destination register chosen by its
+# parent and temporaries are allocated like a stack. Lambda bodies are compiled into their own code units on their
+# first call. A checked compiler also emits a DEPTH instruction on entering each node.
+class BytecodeCompiler:
+    def __init__(self, interpreter, checked: bool):
+        self.interpreter = interpreter
+        self.checked = checked
+        self.instructions: List[List[Any]] = []
+        self.next_register: int = 0
+        self.register_count: int = 0
+        self.max_depth: int = 0
+
+    def emit(self, *instruction: Any) -> int:
+        self.instructions.append(list(instruction))
+        return len(self.instructions) - 1
+
+    def patch(self, instruction_index: int, operand_index: int):
+        # Points a jump operand at the next instruction to be emitted
+        self.instructions[instruction_index][operand_index] = len(self.instructions)
+
+    def allocate(self, count: int = 1) -> int:
+        register: int = self.next_register
+        self.next_register += count
+        self.register_count = max(self.register_count, self.next_register)
+        return register
+
+    def release(self, register: int):
+        self.next_register = register
+
+    def compile_root(self, root: Expression):
+        root_register: int = self.allocate()
+        self.compile_expression(root, root_register, FRAME_EXPECTED, 1)
+        self.emit(RETURN, root_register)
+        self.mark_tail_calls()
+
+    def mark_tail_calls(self):
+        # An application is a tail call when the frame returns its value right after it, possibly through jumps
+        for index, instruction in enumerate(self.instructions):
+            if instruction[0] == APPLY and instruction[5] == FRAME_EXPECTED:
+                next_instruction: List[Any] = self.instructions[index + 1]
+                while next_instruction[0] == JUMP:
+                    next_instruction = self.instructions[next_instruction[1]]
+                instruction[8] = next_instruction[0] == RETURN and next_instruction[1] == instruction[1]
+
+    def compile_expression(self, expression: Expression, dst: int, expected: Any, depth: int):
+        self.max_depth = max(self.max_depth, depth)
+        if self.checked:
+            self.emit(DEPTH, depth, expression.token)
+
+        if isinstance(expression, LitExpression):
+            self.compile_literal(expression, dst, expected)
+        elif isinstance(expression, Let):
+            self.compile_let(expression, dst, expected, depth)
+        elif isinstance(expression, Alias):
+            self.compile_alias(expression, dst, expected, depth)
+        elif isinstance(expression, Lambda):
+            self.emit(LAMBDA, dst, expression, expected)
+        elif isinstance(expression, Application):
+            self.compile_application(expression, dst, expected, depth)
+        elif isinstance(expression, Match):
+            self.compile_match(expression, dst, expected, depth)
+        elif isinstance(expression, Primitive):
+            self.compile_primitive(expression, dst, expected, depth)
+        elif isinstance(expression, Reference):
+            self.emit(LOAD, dst, expression.identifier, expected, expression.token, expression.checked_type is not None)
+        elif isinstance(expression, Branch):
+            self.compile_branch(expression, dst, expected, depth)
+        elif isinstance(expression, For):
+            self.compile_for(expression, dst, expected, depth)
+        elif isinstance(expression, Block):
+            self.compile_block(expression, dst, expected, depth)
+        elif isinstance(expression, ListDefinition):
+            self.compile_list_definition(expression, dst, expected, depth)
+        elif isinstance(expression, RangeDefinition):
+            self.compile_range_definition(expression, dst, expected)
+        elif isinstance(expression, TupleDefinition):
+            self.compile_tuple_definition(expression, dst, expected, depth)
+        elif isinstance(expression, DictDefinition):
+            self.compile_dict_definition(expression, dst, expected, depth)
+        elif isinstance(expression, SchemaDefinition):
+            self.emit(SCHEMA, dst, expression, expected)
+        else:
+            self.emit(INVALID, expression)
+
+    def compile_literal(self, literal_expression: LitExpression, dst: int, expected: Any):
+        literal: Literal = literal_expression.literal
+        value_class: Optional[Any] = None
+        if isinstance(literal, IntLiteral):
+            value_class = int_value if type(literal.value) is int else int_literal_value
+        elif isinstance(literal, BoolLiteral):
+            value_class = bool_value
+        elif isinstance(literal, CharLiteral):
+            value_class = char_value
+        elif isinstance(literal, StringLiteral):
+            value_class = StringValue
+        elif isinstance(literal, NoneLiteral):
+            value_class = none_literal_value
+        self.emit(LITERAL, dst, value_class, literal.value, literal_expression.petl_type, expected, literal_expression.token,
+                  literal_expression.checked_type is not None)
+
+    def compile_binding(self, let: Let, depth: int):
+        let_register: int = self.allocate()
+        self.compile_expression(let.let_expression, let_register, let.let_type, depth + 1)
+        self.emit(BIND, let_register, let.identifiers, let.token)
+        self.release(let_register)
+
+    def compile_let(self, let: Let, dst: int, expected: Any, depth: int):
+        self.compile_binding(let, depth)
+        if let.after_let_expression:
+            self.compile_expression(let.after_let_expression, dst, expected, depth + 1)
+        else:
+            self.emit(NONE, dst)
+
+    def compile_alias(self, alias: Alias, dst: int, expected: Any, depth: int):
+        if alias.after_alias_expression:
+            self.emit(ALIAS, alias.identifier, alias.alias_type)
+            self.compile_expression(alias.after_alias_expression, dst, expected, depth + 1)
+        else:
+            self.emit(NONE, dst)
+
+    def compile_application(self, application: Application, dst: int, expected: Any, depth: int):
+        function_register: int = self.allocate()
+        self.compile_expression(application.identifier, function_register, UNKNOWN_TYPE, depth + 1)
+        argument_count: int = len(application.arguments)
+        prepare: int = self.emit(APPLY_PREPARE, function_register, argument_count, application.token, None, dst)
+        first_argument: int = self.allocate(argument_count)
+        for index, argument in enumerate(application.arguments):
+            self.compile_expression(argument, first_argument + index, (function_register, index), depth + 1)
+        self.emit(APPLY, dst, function_register, first_argument, argument_count, expected, application, depth, False)
+        self.patch(prepare, 4)
+        self.release(function_register)
+
+    def compile_match(self, match: Match, dst: int, expected: Any, depth: int):
+        match_register: int = self.allocate()
+        self.compile_expression(match.match_expression, match_register, ANY_TYPE, depth + 1)
+        end_jumps: List[int] = []
+        for case in match.cases:
+            pattern: Pattern = case.pattern
+            token_str: str = case.case_expression.token.file_position.to_string()
+            fail_jumps: List[Tuple[int, int]] = []
+            if isinstance(pattern, TypePattern):
+                fail_jumps.append((self.emit(MATCH_TYPE, match_register, pattern.case_type, pattern.identifier, token_str, None), 5))
+                if pattern.predicate:
+                    predicate_register: int = self.allocate()
+                    self.compile_expression(pattern.predicate, predicate_register, BOOL_TYPE, depth + 1)
+                    fail_jumps.append((self.emit(JUMP_UNLESS_TRUE, predicate_register, None), 2))
+                    self.release(predicate_register)
+            elif isinstance(pattern, LiteralPattern) or isinstance(pattern, MultiLiteralPattern):
+                literals: List[Literal] = pattern.literals if isinstance(pattern, MultiLiteralPattern) else [pattern.literal]
+                fail_jumps.append((self.emit(MATCH_LITERALS, match_register, literal_values(literals), literals, token_str, None), 5))
+            elif isinstance(pattern, RangePattern):
+                range_definition: Expression = pattern.range
+                bounds: Optional[Tuple[int, int]] = None
+                if isinstance(range_definition, RangeDefinition) and isinstance(range_definition.start, IntLiteral) and \
+                        isinstance(range_definition.end, IntLiteral) and range_definition.start.value >= 0 and range_definition.end.value >= 0:
+                    bounds = (min(range_definition.start.value, range_definition.end.value),
+                              max(range_definition.start.value, range_definition.end.value))
+                fail_jumps.append((self.emit(MATCH_RANGE, match_register, bounds, range_definition, None), 4))
+            elif not isinstance(pattern, AnyPattern):
+                self.emit(ERROR, f"Invalid pattern found", case.case_expression.token)
+                continue
+
+            self.compile_expression(case.case_expression, dst, expected, depth + 1)
+            end_jumps.append(self.emit(JUMP, None))
+            for fail_jump, operand_index in fail_jumps:
+                self.patch(fail_jump, operand_index)
+
+        self.emit(ERROR, f"Reached end of pattern-match, add catch-all case", match.token)
+        for end_jump in end_jumps:
+            self.patch(end_jump, 1)
+        self.release(match_register)
+
+    def compile_primitive(self, primitive: Primitive, dst: int, expected: Any, depth: int):
+        left_register: int = self.allocate(2)
+        self.compile_expression(primitive.left, left_register, ANY_TYPE, depth + 1)
+        self.compile_expression(primitive.right, left_register + 1, ANY_TYPE, depth + 1)
+        operator_function = get_operator_function(self.interpreter, primitive.operator, primitive.token)
+        self.emit(BINARY, dst, operator_function, left_register, left_register + 1, expected, primitive.token, primitive.operator.to_string(),
+                  primitive.checked_type is not None)
+        self.release(left_register)
+
+    def compile_branch(self, branch: Branch, dst: int, expected: Any, depth: int):
+        predicate_register: int = self.allocate()
+        self.compile_expression(branch.predicate, predicate_register, BOOL_TYPE, depth + 1)
+        branch_index: int = self.emit(BRANCH, predicate_register, None, None, dst)
+        self.release(predicate_register)
+        self.compile_expression(branch.if_branch, dst, expected, depth + 1)
+        end_jump: int = self.emit(JUMP, None)
+        self.patch(branch_index, 2)
+        if branch.else_branch:
+            self.compile_expression(branch.else_branch, dst, expected, depth + 1)
+        else:
+            # A missing else branch fails when it is reached, like the tree walker
+            self.emit(INVALID, branch)
+        self.patch(end_jump, 1)
+        self.patch(branch_index, 3)
+
+    def compile_for_loop(self, for_expression: For, dst: int, depth: int) -> int:
+        # Returns the FOR_PREPARE index, whose end target is patched to where an empty iterable continues
+        iterable_register: int = self.allocate(3)
+        iterator_register, environment_register = iterable_register + 1, iterable_register + 2
+        self.compile_expression(for_expression.iterable, iterable_register, UNKNOWN_TYPE, depth + 1)
+        prepare: int = self.emit(FOR_PREPARE, iterable_register, iterator_register, environment_register, for_expression.token, None, dst)
+        loop: int = self.emit(FOR_NEXT, iterator_register, environment_register, for_expression.reference, None)
+        body_register: int = self.allocate()
+        self.compile_expression(for_expression.body, body_register, ANY_TYPE, depth + 1)
+        self.emit(JUMP, loop)
+        self.patch(loop, 4)
+        self.release(iterable_register)
+        return prepare
+
+    def compile_for(self, for_expression: For, dst: int, expected: Any, depth: int):
+        prepare: int = self.compile_for_loop(for_expression, dst, depth)
+        if for_expression.after_for_expression:
+            self.compile_expression(for_expression.after_for_expression, dst, expected, depth + 1)
+        else:
+            self.emit(NONE, dst)
+        self.patch(prepare, 5)
+
+    def compile_block(self, block: Block, dst: int, expected: Any, depth: int):
+        # An empty loop skips the rest of the block, leaving none in dst
+        prepares: List[int] = []
+        for statement in block.statements:
+            if isinstance(statement, Let):
+                self.compile_binding(statement, depth + 1)
+            elif isinstance(statement, Alias):
+                self.emit(ALIAS, statement.identifier, statement.alias_type)
+            elif isinstance(statement, For):
+                prepares.append(self.compile_for_loop(statement, dst, depth))
+            else:
+                statement_register: int = self.allocate()
+                self.compile_expression(statement, statement_register, statement.petl_type, depth + 1)
+                self.release(statement_register)
+        self.compile_expression(block.result, dst, expected, depth + 1)
+        for prepare in prepares:
+            self.patch(prepare, 5)
+
+    def compile_list_definition(self, list_definition: ListDefinition, dst: int, expected: Any, depth: int):
+        if not isinstance(list_definition.petl_type, ListType):
+            self.emit(NONE, dst)
+            return
+        value_count: int = len(list_definition.values)
+        first_value: int = self.allocate(value_count)
+        for index, value in enumerate(list_definition.values):
+            self.compile_expression(value, first_value + index, list_definition.petl_type.list_type, depth + 1)
+        self.emit(MAKE_LIST, dst, first_value, value_count, expected, list_definition.token)
+        self.release(first_value)
+
+    def compile_range_definition(self, range_definition: RangeDefinition, dst: int, expected: Any):
+        if not isinstance(range_definition.start, IntLiteral) or not isinstance(range_definition.end, IntLiteral):
+            self.emit(NONE, dst)
+            return
+        self.emit(RANGE, dst, range_definition, expected)
+
+    def compile_tuple_definition(self, tuple_definition: TupleDefinition, dst: int, expected: Any, depth: int):
+        if not isinstance(tuple_definition.petl_type, TupleType):
+            self.emit(NONE, dst)
+            return
+        typed_values: List[Tuple[Expression, PetlType]] = list(zip(tuple_definition.values, tuple_definition.petl_type.tuple_types))
+        first_value: int = self.allocate(len(typed_values))
+        for index, (value, value_type) in enumerate(typed_values):
+            self.compile_expression(value, first_value + index, value_type, depth + 1)
+        self.emit(MAKE_TUPLE, dst, first_value, len(typed_values), tuple_definition.petl_type, expected, tuple_definition.token)
+        self.release(first_value)
+
+    def compile_dict_definition(self, dict_definition: DictDefinition, dst: int, expected: Any, depth: int):
+        if not isinstance(dict_definition.petl_type, DictType):
+            self.emit(NONE, dst)
+            return
+        # Every key is evaluated before the values, like the tree walker
+        entry_count: int = len(dict_definition.mapping)
+        first_key: int = self.allocate(entry_count * 2)
+        for index, entry in enumerate(dict_definition.mapping):
+            self.compile_expression(entry[0], first_key + index, dict_definition.petl_type.key_type, depth + 1)
+        for index, entry in enumerate(dict_definition.mapping):
+            self.compile_expression(entry[1], first_key + entry_count + index, dict_definition.petl_type.value_type, depth + 1)
+        self.emit(MAKE_DICT, dst, first_key, first_key + entry_count, entry_count, expected, dict_definition.token)
+        self.release(first_key)
+
+    def to_instructions(self) -> List[Instruction]:
+        return [tuple(instruction) for instruction in self.instructions]
+
+
+def compile_code_unit(root: Expression, interpreter) -> CodeUnit:
+    compiler: BytecodeCompiler = BytecodeCompiler(interpreter, False)
+    compiler.compile_root(root)
+    checked_compiler: BytecodeCompiler = BytecodeCompiler(interpreter, True)
+    checked_compiler.compile_root(root)
+    return CodeUnit(compiler.to_instructions(), checked_compiler.to_instructions(), compiler.register_count, compiler.max_depth)
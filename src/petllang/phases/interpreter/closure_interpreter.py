@@ -0,0 +1,726 @@
+from copy import copy
+from typing import Callable, Dict, FrozenSet
+
+from petllang.builtins.builtin_definitions import require_iterable
+from petllang.phases.interpreter.definitions.value import *
+from petllang.phases.interpreter.environment import InterpreterEnvironment, copy_environment, capture_environment
+from petllang.phases.interpreter.free_identifiers import free_identifiers
+from petllang.phases.interpreter.interpreter import TreeWalkInterpreter, MAXIMUM_DEPTH
+from petllang.phases.interpreter.type_resolution import types_conform, conforms
+from petllang.phases.parser.defintions.expression import *
+
+# Takes the environment and the type expected by the caller, like TreeWalkInterpreter.evaluate
+CompiledExpression = Callable[[InterpreterEnvironment, PetlType], PetlValue]
+
+
+def add_values(left: PetlValue, right: PetlValue) -> Optional[PetlValue]:
+    if isinstance(left, IntValue) and isinstance(right, IntValue):
+        return int_value(left.value + right.value)
+    elif (isinstance(left, CharValue) or isinstance(left, StringValue)) and \
+            (isinstance(right, CharValue) or isinstance(right, StringValue)):
+        return StringValue(left.value + right.value)
+    return None
+
+
+def subtract_values(left: PetlValue, right: PetlValue) -> Optional[PetlValue]:
+    if isinstance(left, IntValue) and isinstance(right, IntValue):
+        return int_value(left.value - right.value)
+    return None
+
+
+def multiply_values(left: PetlValue, right: PetlValue) -> Optional[PetlValue]:
+    if isinstance(left, IntValue) and isinstance(right, IntValue):
+        return int_value(left.value * right.value)
+    return None
+
+
+def modulus_values(left: PetlValue, right: PetlValue) -> Optional[PetlValue]:
+    if isinstance(left, IntValue) and isinstance(right, IntValue):
+        return int_value(left.value % right.value)
+    return None
+
+
+def greater_than_values(left: PetlValue, right: PetlValue) -> Optional[PetlValue]:
+    if isinstance(left, IntValue) and isinstance(right, IntValue):
+        return bool_value(left.value > right.value)
+    return None
+
+
+def less_than_values(left: PetlValue, right: PetlValue) -> Optional[PetlValue]:
+    if isinstance(left, IntValue) and isinstance(right, IntValue):
+        return bool_value(left.value < right.value)
+    return None
+
+
+def greater_than_equal_to_values(left: PetlValue, right: PetlValue) -> Optional[PetlValue]:
+    if isinstance(left, IntValue) and isinstance(right, IntValue):
+        return bool_value(left.value >= right.value)
+    return None
+
+
+def less_than_equal_to_values(left: PetlValue, right: PetlValue) -> Optional[PetlValue]:
+    if isinstance(left, IntValue) and isinstance(right, IntValue):
+        return bool_value(left.value <= right.value)
+    return None
+
+
+def equal_values(left: PetlValue, right: PetlValue) -> Optional[PetlValue]:
+    return bool_value(values_equal(left, right))
+
+
+def not_equal_values(left: PetlValue, right: PetlValue) -> Optional[PetlValue]:
+    return bool_value(not values_equal(left, right))
+
+
+def and_values(left: PetlValue, right: PetlValue) -> Optional[PetlValue]:
+    if isinstance(left, BoolValue) and isinstance(right, BoolValue):
+        return bool_value(left.value and right.value)
+    return None
+
+
+def or_values(left: PetlValue, right: PetlValue) -> Optional[PetlValue]:
+    if isinstance(left, BoolValue) and isinstance(right, BoolValue):
+        return bool_value(left.value or right.value)
+    return None
+
+
+OPERATOR_FUNCTIONS: Dict[Operator.OperatorType, Callable[[PetlValue, PetlValue], Optional[PetlValue]]] = {
+    Operator.OperatorType.PLUS: add_values,
+    Operator.OperatorType.MINUS: subtract_values,
+    Operator.OperatorType.MULTIPLY: multiply_values,
+    Operator.OperatorType.MODULUS: modulus_values,
+    Operator.OperatorType.GREATER_THAN: greater_than_values,
+    Operator.OperatorType.LESS_THAN: less_than_values,
+    Operator.OperatorType.GREATER_THAN_EQUAL_TO: greater_than_equal_to_values,
+    Operator.OperatorType.LESS_THAN_EQUAL_TO: less_than_equal_to_values,
+    Operator.OperatorType.EQUAL: equal_values,
+    Operator.OperatorType.NOT_EQUAL: not_equal_values,
+    Operator.OperatorType.AND: and_values,
+    Operator.OperatorType.OR: or_values
+}
+
+
+def get_operator_function(interpreter: TreeWalkInterpreter, operator: Operator, token: Token) -> Callable[[PetlValue, PetlValue], Optional[PetlValue]]:
+    # Operators that can report errors or need the interpreter stay on the tree walker's implementation
+    if operator.operator_type == Operator.OperatorType.DIVIDE:
+        return lambda left, right: interpreter.evaluate_arithmetic_operator(left, right, operator, token)
+    elif operator.is_collection():
+        return lambda left, right: interpreter.evaluate_collection_operator(left, right, operator, token)
+    elif not operator.is_arithmetic() and not operator.is_boolean():
+        def invalid_operator(left: PetlValue, right: PetlValue) -> Optional[PetlValue]:
+            interpreter.error(f"Invalid operator", token)
+            return None
+
+        return invalid_operator
+    return OPERATOR_FUNCTIONS[operator.operator_type]
+
+
+# Compiles every expression once into a closure with its dispatch, operator and static type checks resolved, the
+# closures keep the tree walker's semantics (descent counting, stack traces and error messages) so both engines
+# produce the same output. The closures are kept in a table keyed by expression, so builtins calling evaluate reuse
+# them.
+class ClosureInterpreter(TreeWalkInterpreter):
+    def __init__(self, debug=False, trusted=False, maximum_depth=MAXIMUM_DEPTH):
+        TreeWalkInterpreter.__init__(self, debug, trusted, maximum_depth)
+        # Every expression compiled by this interpreter and its closure, by id. The expressions are kept alive so their
+        # ids are not reused
+        self.compiled_expressions: Dict[int, Tuple[Expression, CompiledExpression]] = {}
+
+    def evaluate(self, expression: Expression, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+        return self.compile(expression)(environment, expected_type)
+
+    def compile(self, expression: Expression) -> CompiledExpression:
+        compiled: Optional[Tuple[Expression, CompiledExpression]] = self.compiled_expressions.get(id(expression))
+        if compiled is None:
+            compiled = (expression, self.compile_expression(expression))
+            self.compiled_expressions[id(expression)] = compiled
+        return compiled[1]
+
+    def compile_expression(self, expression: Expression) -> CompiledExpression:
+        if isinstance(expression, LitExpression):
+            return self.compile_literal(expression)
+        elif isinstance(expression, Let):
+            return self.compile_let(expression)
+        elif isinstance(expression, Alias):
+            return self.compile_alias(expression)
+        elif isinstance(expression, Lambda):
+            return self.compile_lambda_definition(expression)
+        elif isinstance(expression, Application):
+            return self.compile_application(expression)
+        elif isinstance(expression, Match):
+            return self.compile_match(expression)
+        elif isinstance(expression, Primitive):
+            return self.compile_primitive(expression)
+        elif isinstance(expression, Reference):
+            return self.compile_reference(expression)
+        elif isinstance(expression, Branch):
+            return self.compile_branch(expression)
+        elif isinstance(expression, For):
+            return self.compile_for(expression)
+        elif isinstance(expression, Block):
+            return self.compile_block(expression)
+        elif isinstance(expression, ListDefinition):
+            return self.compile_list_definition(expression)
+        elif isinstance(expression, RangeDefinition):
+            return self.compile_range_definition(expression)
+        elif isinstance(expression, TupleDefinition):
+            return self.compile_tuple_definition(expression)
+        elif isinstance(expression, DictDefinition):
+            return self.compile_dict_definition(expression)
+        elif isinstance(expression, SchemaDefinition):
+            return self.compile_schema_definition(expression)
+        else:
+            return self.compile_invalid(expression)
+
+    def compile_invalid(self, expression: Expression) -> CompiledExpression:
+        token: Token = expression.token
+
+        def evaluate_invalid(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            self.error(f"Invalid expression found", token)
+            return none_value()
+
+        return evaluate_invalid
+
+    def compile_literal(self, literal_expression: LitExpression) -> CompiledExpression:
+        token: Token = literal_expression.token
+        literal_type: PetlType = literal_expression.petl_type
+        literal: Literal = literal_expression.literal
+        literal_value: Any = literal.value
+        checked: bool = literal_expression.checked_type is not None
+        value_class: Optional[type] = None
+        if isinstance(literal, IntLiteral):
+            value_class = int_value
+            if type(literal_value) is not int:
+                # Converted on evaluation so a bad literal fails where the tree walker fails
+                value_class = lambda value: int_value(int(value))
+        elif isinstance(literal, BoolLiteral):
+            value_class = bool_value
+        elif isinstance(literal, CharLiteral):
+            value_class = char_value
+        elif isinstance(literal, StringLiteral):
+            value_class = StringValue
+        elif isinstance(literal, NoneLiteral):
+            value_class = lambda _: NONE_VALUE
+
+        def evaluate_literal(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            if not (checked and self.trusted) and not conforms(token, literal_type, expected_type, self.error) or value_class is None:
+                self.error(f"Invalid expression found", token)
+            literal_petl_value: PetlValue = value_class(literal_value)
+            self.descent_counter -= 1
+            return literal_petl_value
+
+        return evaluate_literal
+
+    def compile_let(self, let: Let) -> CompiledExpression:
+        token: Token = let.token
+        identifiers: List[str] = let.identifiers
+        let_type: PetlType = let.let_type
+        evaluate_let_expression: CompiledExpression = self.compile(let.let_expression)
+        evaluate_after_let: Optional[CompiledExpression] = self.compile(let.after_let_expression) if let.after_let_expression else None
+
+        def evaluate_let(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            let_value: PetlValue = evaluate_let_expression(environment, let_type)
+            if len(identifiers) > 1:
+                if not isinstance(let_value, TupleValue):
+                    self.error(f"Cannot unpack, requires tuple value", token)
+                for identifier, value in zip(identifiers, let_value.values):
+                    environment.map[identifier] = value
+            else:
+                environment.map[identifiers[0]] = let_value
+
+            after_let_value: PetlValue = evaluate_after_let(environment, expected_type) if evaluate_after_let else none_value()
+            self.descent_counter -= 1
+            return after_let_value
+
+        return evaluate_let
+
+    def compile_alias(self, alias: Alias) -> CompiledExpression:
+        token: Token = alias.token
+        evaluate_after_alias: Optional[CompiledExpression] = self.compile(alias.after_alias_expression) if alias.after_alias_expression else None
+
+        def evaluate_alias(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            after_alias_value: PetlValue = none_value()
+            if evaluate_after_alias:
+                environment.add_alias(alias.identifier, alias.alias_type)
+                after_alias_value = evaluate_after_alias(environment, expected_type)
+            self.descent_counter -= 1
+            return after_alias_value
+
+        return evaluate_alias
+
+    def compile_lambda_definition(self, lambda_expression: Lambda) -> CompiledExpression:
+        token: Token = lambda_expression.token
+        body: Expression = lambda_expression.body
+        parameters: List[Tuple[str, PetlType]] = list(map(lambda p: (p.identifier, p.parameter_type), lambda_expression.parameters))
+        typed_bodies: List[Tuple[PetlType, Expression]] = []
+        captured_identifiers: FrozenSet[str] = free_identifiers(lambda_expression)
+        self.compile(body)
+
+        def get_typed_body(return_type: PetlType) -> Expression:
+            # Bodies are never mutated, so only the root carrying the return type needs copying
+            for typed_return_type, typed_body in typed_bodies:
+                if typed_return_type == return_type:
+                    return typed_body
+            typed_body: Expression = copy(body)
+            typed_body.petl_type = return_type
+            self.compile(typed_body)
+            typed_bodies.append((return_type, typed_body))
+            return typed_body
+
+        def evaluate_lambda_definition(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            lambda_value: PetlValue = none_value()
+            lambda_type = types_conform(token, lambda_expression.petl_type, expected_type, self.error)
+            if lambda_type and isinstance(lambda_type, FuncType):
+                lambda_return_type = lambda_type.return_type
+                if lambda_return_type and types_conform(body.token, lambda_return_type, body.petl_type, self.error):
+                    lambda_value = FuncValue(lambda_expression.petl_type, None, list(parameters),
+                                             get_typed_body(lambda_return_type), capture_environment(environment, captured_identifiers))
+            self.descent_counter -= 1
+            return lambda_value
+
+        return evaluate_lambda_definition
+
+    def compile_application(self, application: Application) -> CompiledExpression:
+        token: Token = application.token
+        evaluate_identifier: CompiledExpression = self.compile(application.identifier)
+        evaluate_arguments: List[CompiledExpression] = [self.compile(argument) for argument in application.arguments]
+        argument_count: int = len(evaluate_arguments)
+        checked: bool = application.checked_type is not None
+
+        def evaluate_function_application(identifier: FuncValue, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            if argument_count != len(identifier.parameters):
+                func_types_str: str = ", ".join(map(lambda p: p[1].to_string(), identifier.parameters))
+                self.error(f"Invalid argument count for function, requires: {func_types_str}", token)
+
+            function_return_value: PetlValue = none_value()
+            if isinstance(identifier.petl_type, FuncType):
+                builtin = identifier.builtin
+                if builtin:
+                    argument_values: List[PetlValue] = [evaluate_argument(environment, parameter[1])
+                                                        for evaluate_argument, parameter in zip(evaluate_arguments, identifier.parameters)]
+                    self.stack_trace.append(token.file_position)
+                    function_return_value = self.evaluate_builtin(builtin, application, argument_values, environment)
+                else:
+                    function_environment: InterpreterEnvironment = copy_environment(identifier.environment)
+                    for evaluate_argument, parameter in zip(evaluate_arguments, identifier.parameters):
+                        function_environment.map[parameter[0]] = evaluate_argument(environment, parameter[1])
+                    self.stack_trace.append(token.file_position)
+                    function_return_value = self.compile(identifier.body)(function_environment, identifier.petl_type.return_type)
+                if not (checked and self.trusted):
+                    conforms(token, function_return_value.petl_type, expected_type, self.error)
+                self.stack_trace.pop()
+            return function_return_value
+
+        def evaluate_index_application(name: str, identifier: PetlValue, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            if argument_count != 1:
+                self.error(f"Argument count must be 1 for {name} access", token)
+
+            argument_value: PetlValue = evaluate_arguments[0](environment, INT_TYPE)
+            if isinstance(argument_value, IntValue):
+                elements = identifier.value if isinstance(identifier, StringValue) else identifier.elements() if isinstance(identifier, ListValue) else identifier.values
+                if argument_value.value < 0 or argument_value.value >= len(elements):
+                    self.error(f"Invalid argument value for {name} access", token)
+                element_value: PetlValue = char_value(elements[argument_value.value]) if isinstance(identifier, StringValue) else elements[argument_value.value]
+                if conforms(token, element_value.petl_type, expected_type, self.error):
+                    return element_value
+            return none_value()
+
+        def evaluate_dict_application(identifier: DictValue, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            if argument_count != 1:
+                self.error(f"Argument count must be 1 for dictionary access", token)
+
+            if isinstance(identifier.petl_type, DictType):
+                argument_value: PetlValue = evaluate_arguments[0](environment, identifier.petl_type.key_type)
+                value: Optional[PetlValue] = identifier.lookup(argument_value)
+                if value and types_conform(token, value.petl_type, expected_type, self.error):
+                    return value
+                else:
+                    self.error(f"Key does not exist in dictionary", application.arguments[0].token)
+            return none_value()
+
+        def evaluate_application(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            identifier: PetlValue = evaluate_identifier(environment, UNKNOWN_TYPE)
+            if isinstance(identifier, FuncValue):
+                application_value: PetlValue = evaluate_function_application(identifier, environment, expected_type)
+            elif isinstance(identifier, StringValue):
+                application_value = evaluate_index_application("string", identifier, environment, expected_type)
+            elif isinstance(identifier, ListValue):
+                application_value = evaluate_index_application("list", identifier, environment, expected_type)
+            elif isinstance(identifier, TupleValue):
+                application_value = evaluate_index_application("tuple", identifier, environment, expected_type)
+            elif isinstance(identifier, DictValue):
+                application_value = evaluate_dict_application(identifier, environment, expected_type)
+            else:
+                self.error(f"Invalid type for application: {identifier.petl_type.to_string()}", token)
+                application_value = none_value()
+            self.descent_counter -= 1
+            return application_value
+
+        return evaluate_application
+
+    def compile_case(self, case: Case) -> Callable[[PetlValue, InterpreterEnvironment, PetlType], Optional[PetlValue]]:
+        pattern: Pattern = case.pattern
+        evaluate_case_expression: CompiledExpression = self.compile(case.case_expression)
+        token_str: str = case.case_expression.token.file_position.to_string()
+
+        if isinstance(pattern, TypePattern):
+            evaluate_predicate: Optional[CompiledExpression] = self.compile(pattern.predicate) if pattern.predicate else None
+
+            def evaluate_type_pattern(match_value: PetlValue, environment: InterpreterEnvironment, expected_type: PetlType) -> Optional[PetlValue]:
+                if conforms(token_str, match_value.petl_type, pattern.case_type, self.logger, no_error=True):
+                    environment.add(pattern.identifier, match_value)
+                    predicate_value: PetlValue = evaluate_predicate(environment, BOOL_TYPE) if evaluate_predicate else bool_value(True)
+                    if isinstance(predicate_value, BoolValue) and predicate_value.value:
+                        return evaluate_case_expression(environment, expected_type)
+                return None
+
+            return evaluate_type_pattern
+        elif isinstance(pattern, LiteralPattern) or isinstance(pattern, MultiLiteralPattern):
+            literals: List[Literal] = pattern.literals if isinstance(pattern, MultiLiteralPattern) else [pattern.literal]
+            literal_values: Optional[List[PetlValue]] = None
+            if all(isinstance(literal, (IntLiteral, BoolLiteral, CharLiteral, StringLiteral, NoneLiteral)) for literal in literals):
+                literal_values = [self.literal_to_value(token_str, literal) for literal in literals]
+
+            def evaluate_literal_pattern(match_value: PetlValue, environment: InterpreterEnvironment, expected_type: PetlType) -> Optional[PetlValue]:
+                pattern_values: List[PetlValue] = literal_values
+                if pattern_values is None:
+                    pattern_values = map(lambda l: self.literal_to_value(token_str, l), literals)
+                if any(map(lambda v: values_equal(match_value, v), pattern_values)):
+                    return evaluate_case_expression(environment, expected_type)
+                return None
+
+            return evaluate_literal_pattern
+        elif isinstance(pattern, RangePattern):
+            range_definition: Expression = pattern.range
+            bounds: Optional[Tuple[int, int]] = None
+            if isinstance(range_definition, RangeDefinition) and isinstance(range_definition.start, IntLiteral) and \
+                    isinstance(range_definition.end, IntLiteral) and range_definition.start.value >= 0 and range_definition.end.value >= 0:
+                bounds = (min(range_definition.start.value, range_definition.end.value),
+                          max(range_definition.start.value, range_definition.end.value))
+
+            def evaluate_range_pattern(match_value: PetlValue, environment: InterpreterEnvironment, expected_type: PetlType) -> Optional[PetlValue]:
+                if bounds is None:
+                    # Reports invalid bounds when the case is reached, like the tree walker
+                    if isinstance(range_definition, RangeDefinition):
+                        self.evaluate_range_definition(range_definition, ListType(IntType()))
+                    return None
+                if isinstance(match_value, IntValue) and bounds[0] <= match_value.value <= bounds[1]:
+                    return evaluate_case_expression(environment, expected_type)
+                return None
+
+            return evaluate_range_pattern
+        elif isinstance(pattern, AnyPattern):
+            return lambda match_value, environment, expected_type: evaluate_case_expression(environment, expected_type)
+
+        def evaluate_invalid_pattern(match_value: PetlValue, environment: InterpreterEnvironment, expected_type: PetlType) -> Optional[PetlValue]:
+            self.error(f"Invalid pattern found", case.case_expression.token)
+            return None
+
+        return evaluate_invalid_pattern
+
+    def compile_match(self, match: Match) -> CompiledExpression:
+        token: Token = match.token
+        evaluate_match_expression: CompiledExpression = self.compile(match.match_expression)
+        evaluate_cases: List[Callable[[PetlValue, InterpreterEnvironment, PetlType], Optional[PetlValue]]] = [self.compile_case(case) for case in match.cases]
+
+        def evaluate_match(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            match_value: PetlValue = evaluate_match_expression(environment, ANY_TYPE)
+            for evaluate_case in evaluate_cases:
+                case_value: Optional[PetlValue] = evaluate_case(match_value, environment, expected_type)
+                if case_value:
+                    self.descent_counter -= 1
+                    return case_value
+
+            self.error(f"Reached end of pattern-match, add catch-all case", token)
+            return none_value()
+
+        return evaluate_match
+
+    def compile_primitive(self, primitive: Primitive) -> CompiledExpression:
+        token: Token = primitive.token
+        operator: Operator = primitive.operator
+        evaluate_left: CompiledExpression = self.compile(primitive.left)
+        evaluate_right: CompiledExpression = self.compile(primitive.right)
+        operator_function: Callable[[PetlValue, PetlValue], Optional[PetlValue]] = get_operator_function(self, operator, token)
+        checked: bool = primitive.checked_type is not None
+
+        def evaluate_primitive(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            result_value: Optional[PetlValue] = operator_function(evaluate_left(environment, ANY_TYPE), evaluate_right(environment, ANY_TYPE))
+            if not result_value:
+                self.error(f"Invalid types for operator \'{operator.to_string()}\'", token)
+            if not (checked and self.trusted):
+                conforms(token, result_value.petl_type, expected_type, self.error)
+            self.descent_counter -= 1
+            return result_value
+
+        return evaluate_primitive
+
+    def compile_reference(self, reference: Reference) -> CompiledExpression:
+        token: Token = reference.token
+        identifier: str = reference.identifier
+        checked: bool = reference.checked_type is not None
+
+        def evaluate_reference(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            reference_value: Optional[PetlValue] = environment.map.get(identifier)
+            if reference_value is None:
+                reference_value = environment.get(identifier, token, self.error)
+            if not (checked and self.trusted):
+                conforms(token, reference_value.petl_type, expected_type, self.error)
+            self.descent_counter -= 1
+            return reference_value
+
+        return evaluate_reference
+
+    def compile_branch(self, branch: Branch) -> CompiledExpression:
+        token: Token = branch.token
+        evaluate_predicate: CompiledExpression = self.compile(branch.predicate)
+        evaluate_if_branch: CompiledExpression = self.compile(branch.if_branch)
+        # A missing else branch fails when it is reached, like the tree walker
+        evaluate_else_branch: CompiledExpression = self.compile(branch.else_branch) if branch.else_branch else self.compile_invalid(branch)
+
+        def evaluate_branch(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            predicate_value: PetlValue = evaluate_predicate(environment, BOOL_TYPE)
+            branch_value: PetlValue = none_value()
+            if isinstance(predicate_value, BoolValue):
+                if predicate_value.value:
+                    branch_value = evaluate_if_branch(environment, expected_type)
+                else:
+                    branch_value = evaluate_else_branch(environment, expected_type)
+            self.descent_counter -= 1
+            return branch_value
+
+        return evaluate_branch
+
+    def compile_for_loop(self, for_expression: For) -> Callable[[InterpreterEnvironment], bool]:
+        token: Token = for_expression.token
+        evaluate_iterable: CompiledExpression = self.compile(for_expression.iterable)
+        evaluate_body: CompiledExpression = self.compile(for_expression.body)
+
+        def evaluate_for_loop(environment: InterpreterEnvironment) -> bool:
+            iterable: PetlValue = evaluate_iterable(environment, UNKNOWN_TYPE)
+            if not require_iterable("for", iterable, token, self.error) or iterable.is_empty():
+                return False
+
+            for iterable_value in iterable.iterate():
+                for_body_environment: InterpreterEnvironment = copy_environment(environment)
+                for_body_environment.map[for_expression.reference] = iterable_value
+                evaluate_body(for_body_environment, ANY_TYPE)
+            return True
+
+        return evaluate_for_loop
+
+    def compile_for(self, for_expression: For) -> CompiledExpression:
+        token: Token = for_expression.token
+        evaluate_for_loop: Callable[[InterpreterEnvironment], bool] = self.compile_for_loop(for_expression)
+        evaluate_after_for: Optional[CompiledExpression] = self.compile(for_expression.after_for_expression) if for_expression.after_for_expression else None
+
+        def evaluate_for(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            if not evaluate_for_loop(environment):
+                self.descent_counter -= 1
+                return none_value()
+
+            after_for_value: PetlValue = evaluate_after_for(environment, expected_type) if evaluate_after_for else none_value()
+            self.descent_counter -= 1
+            return after_for_value
+
+        return evaluate_for
+
+    def compile_statement(self, statement: Expression) -> Callable[[InterpreterEnvironment], bool]:
+        # Statements return False when the rest of their block is skipped
+        if isinstance(statement, Alias):
+            def evaluate_alias_statement(environment: InterpreterEnvironment) -> bool:
+                environment.add_alias(statement.identifier, statement.alias_type)
+                return True
+
+            return evaluate_alias_statement
+        elif isinstance(statement, For):
+            return self.compile_for_loop(statement)
+
+        evaluate_statement: CompiledExpression = self.compile(statement)
+        statement_type: PetlType = statement.petl_type
+
+        def evaluate_expression_statement(environment: InterpreterEnvironment) -> bool:
+            evaluate_statement(environment, statement_type)
+            return True
+
+        return evaluate_expression_statement
+
+    def compile_block(self, block: Block) -> CompiledExpression:
+        token: Token = block.token
+        evaluate_statements: List[Callable[[InterpreterEnvironment], bool]] = [self.compile_statement(statement) for statement in block.statements]
+        evaluate_result: CompiledExpression = self.compile(block.result)
+
+        def evaluate_block(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            for evaluate_statement in evaluate_statements:
+                if not evaluate_statement(environment):
+                    self.descent_counter -= 1
+                    return none_value()
+            block_value: PetlValue = evaluate_result(environment, expected_type)
+            self.descent_counter -= 1
+            return block_value
+
+        return evaluate_block
+
+    def compile_list_definition(self, list_definition: ListDefinition) -> CompiledExpression:
+        token: Token = list_definition.token
+        if not isinstance(list_definition.petl_type, ListType):
+            return self.compile_none(token)
+        element_type: PetlType = list_definition.petl_type.list_type
+        evaluate_values: List[CompiledExpression] = [self.compile(value) for value in list_definition.values]
+
+        def evaluate_list_definition(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            list_values: List[PetlValue] = [evaluate_value(environment, element_type) for evaluate_value in evaluate_values]
+            if list_values and all(map(lambda v: conforms(token, v.petl_type, list_values[0].petl_type, self.error), list_values)):
+                list_element_type: PetlType = list_values[0].petl_type
+            else:
+                list_element_type = UnknownType()
+            list_value: PetlValue = none_value()
+            list_type: PetlType = types_conform(token, ListType(list_element_type), expected_type, self.logger)
+            if list_type:
+                list_value = ListValue(list_type, list_values)
+            self.descent_counter -= 1
+            return list_value
+
+        return evaluate_list_definition
+
+    def compile_range_definition(self, range_definition: RangeDefinition) -> CompiledExpression:
+        token: Token = range_definition.token
+        if not isinstance(range_definition.start, IntLiteral) or not isinstance(range_definition.end, IntLiteral):
+            return self.compile_none(token)
+        start_value: int = range_definition.start.value
+        end_value: int = range_definition.end.value
+        checked: bool = range_definition.checked_type is not None
+
+        def evaluate_range_definition(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            range_value: PetlValue = none_value()
+            if start_value < 0 or end_value < 0:
+                self.error(f"Range bounds cannot be negative", token)
+            elif checked and self.trusted or types_conform(token, ListType(IntType()), expected_type, self.error):
+                range_value = RangeValue(start_value, end_value)
+            self.descent_counter -= 1
+            return range_value
+
+        return evaluate_range_definition
+
+    def compile_tuple_definition(self, tuple_definition: TupleDefinition) -> CompiledExpression:
+        token: Token = tuple_definition.token
+        if not isinstance(tuple_definition.petl_type, TupleType):
+            return self.compile_none(token)
+        evaluate_values: List[Tuple[CompiledExpression, PetlType]] = \
+            list(zip([self.compile(value) for value in tuple_definition.values], tuple_definition.petl_type.tuple_types))
+
+        def evaluate_tuple_definition(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            tuple_values: List[PetlValue] = [evaluate_value(environment, element_type) for evaluate_value, element_type in evaluate_values]
+            tuple_value: PetlValue = none_value()
+            tuple_type: Optional[PetlType] = types_conform(token, TupleType(list(map(lambda tt: tt.petl_type, tuple_values))),
+                                                           expected_type, self.error)
+            if tuple_type:
+                tuple_value = TupleValue(tuple_definition.petl_type, tuple_values)
+            self.descent_counter -= 1
+            return tuple_value
+
+        return evaluate_tuple_definition
+
+    def compile_dict_definition(self, dict_definition: DictDefinition) -> CompiledExpression:
+        token: Token = dict_definition.token
+        if not isinstance(dict_definition.petl_type, DictType):
+            return self.compile_none(token)
+        key_type: PetlType = dict_definition.petl_type.key_type
+        value_type: PetlType = dict_definition.petl_type.value_type
+        evaluate_keys: List[CompiledExpression] = [self.compile(entry[0]) for entry in dict_definition.mapping]
+        evaluate_values: List[CompiledExpression] = [self.compile(entry[1]) for entry in dict_definition.mapping]
+
+        def all_types_align(dict_values: List[Tuple[PetlValue, PetlValue]]) -> bool:
+            return dict_values and \
+                   all(map(lambda v: types_conform(token, v[0].petl_type, dict_values[0][0].petl_type, self.logger), dict_values)) and \
+                   all(map(lambda v: types_conform(token, v[1].petl_type, dict_values[0][1].petl_type, self.logger), dict_values))
+
+        def evaluate_dict_definition(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            entry_key_values: List[PetlValue] = [evaluate_key(environment, key_type) for evaluate_key in evaluate_keys]
+            entry_values: List[PetlValue] = [evaluate_value(environment, value_type) for evaluate_value in evaluate_values]
+            dict_values: List[Tuple[PetlValue, PetlValue]] = list(zip(entry_key_values, entry_values))
+            if all_types_align(dict_values):
+                dict_key_type: PetlType = dict_values[0][0].petl_type
+                dict_value_type: PetlType = dict_values[0][1].petl_type
+            else:
+                dict_key_type = UnknownType()
+                dict_value_type = UnknownType()
+            dict_value: PetlValue = none_value()
+            dict_type: PetlType = types_conform(token, DictType(dict_key_type, dict_value_type), expected_type, self.logger)
+            if dict_type:
+                dict_value = DictValue(dict_type, dict_values)
+            self.descent_counter -= 1
+            return dict_value
+
+        return evaluate_dict_definition
+
+    def compile_schema_definition(self, schema_definition: SchemaDefinition) -> CompiledExpression:
+        token: Token = schema_definition.token
+
+        def evaluate_schema_definition(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            schema_value: PetlValue = self.evaluate_schema_definition(schema_definition, expected_type)
+            self.descent_counter -= 1
+            return schema_value
+
+        return evaluate_schema_definition
+
+    def compile_none(self, token: Token) -> CompiledExpression:
+        def evaluate_none(environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+            self.descent_counter += 1
+            if self.descent_counter > self.maximum_depth:
+                self.error(f"Maximum expression depth exceeded, possible infinite recursion", token)
+            self.descent_counter -= 1
+            return none_value()
+
+        return evaluate_none
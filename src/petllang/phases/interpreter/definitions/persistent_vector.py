@@ -0,0 +1,180 @@
+from itertools import chain
+from typing import Any, Iterable, Iterator, List, Tuple, Union
+
+# Maximum number of elements stored together in a leaf
+CHUNK_SIZE: int = 32
+
+
+class _Leaf:
+    __slots__ = ("items", "size")
+    height: int = 0
+
+    def __init__(self, items: Tuple[Any, ...]):
+        self.items = items
+        self.size = len(items)
+
+
+class _Branch:
+    __slots__ = ("left", "right", "size", "height")
+
+    def __init__(self, left: '_Node', right: '_Node'):
+        self.left = left
+        self.right = right
+        self.size = left.size + right.size
+        self.height = max(left.height, right.height) + 1
+
+
+_Node = Union[_Leaf, _Branch]
+
+_EMPTY_LEAF: _Leaf = _Leaf(())
+
+
+def _balance(left: _Node, right: _Node) -> _Node:
+    # Children of an AVL node differ in height by at most one, joins leave them at most two apart
+    if left.height > right.height + 1:
+        if left.left.height >= left.right.height:
+            return _Branch(left.left, _Branch(left.right, right))
+        return _Branch(_Branch(left.left, left.right.left), _Branch(left.right.right, right))
+    elif right.height > left.height + 1:
+        if right.right.height >= right.left.height:
+            return _Branch(_Branch(left, right.left), right.right)
+        return _Branch(_Branch(left, right.left.left), _Branch(right.left.right, right.right))
+    return _Branch(left, right)
+
+
+def _join(left: _Node, right: _Node) -> _Node:
+    if left.size == 0:
+        return right
+    elif right.size == 0:
+        return left
+    elif left.height > right.height + 1:
+        return _balance(left.left, _join(left.right, right))
+    elif right.height > left.height + 1:
+        return _balance(_join(left, right.left), right.right)
+    elif isinstance(left, _Leaf) and isinstance(right, _Leaf) and left.size + right.size <= CHUNK_SIZE:
+        return _Leaf(left.items + right.items)
+    return _Branch(left, right)
+
+
+def _split(node: _Node, index: int) -> Tuple[_Node, _Node]:
+    if index <= 0:
+        return _EMPTY_LEAF, node
+    elif index >= node.size:
+        return node, _EMPTY_LEAF
+    elif isinstance(node, _Leaf):
+        return _Leaf(node.items[:index]), _Leaf(node.items[index:])
+    elif index < node.left.size:
+        left, right = _split(node.left, index)
+        return left, _join(right, node.right)
+    elif index == node.left.size:
+        return node.left, node.right
+    left, right = _split(node.right, index - node.left.size)
+    return _join(node.left, left), right
+
+
+def _replace(node: _Node, index: int, value: Any) -> _Node:
+    if isinstance(node, _Leaf):
+        return _Leaf(node.items[:index] + (value,) + node.items[index + 1:])
+    elif index < node.left.size:
+        return _Branch(_replace(node.left, index, value), node.right)
+    return _Branch(node.left, _replace(node.right, index - node.left.size, value))
+
+
+def _build(chunks: List[_Leaf], start: int, end: int) -> _Node:
+    if end - start == 1:
+        return chunks[start]
+    middle: int = (start + end) // 2
+    return _Branch(_build(chunks, start, middle), _build(chunks, middle, end))
+
+
+def _leaves(node: _Node, reverse: bool = False) -> Iterator[_Leaf]:
+    stack: List[_Node] = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, _Leaf):
+            yield node
+        elif reverse:
+            stack.append(node.left)
+            stack.append(node.right)
+        else:
+            stack.append(node.right)
+            stack.append(node.left)
+
+
+# Immutable sequence stored as a height balanced tree of chunks. Every update returns a new vector in O(log n) that
+# shares all untouched chunks with the original, which stays valid.
+class PersistentVector:
+    __slots__ = ("root",)
+
+    def __init__(self, values: Iterable[Any] = ()):
+        items: Tuple[Any, ...] = tuple(values)
+        if len(items) <= CHUNK_SIZE:
+            self.root: _Node = _Leaf(items)
+        else:
+            chunks: List[_Leaf] = [_Leaf(items[start:start + CHUNK_SIZE]) for start in range(0, len(items), CHUNK_SIZE)]
+            self.root = _build(chunks, 0, len(chunks))
+
+    @staticmethod
+    def from_root(root: _Node) -> 'PersistentVector':
+        vector: PersistentVector = PersistentVector.__new__(PersistentVector)
+        vector.root = root
+        return vector
+
+    def __len__(self) -> int:
+        return self.root.size
+
+    def __iter__(self) -> Iterator[Any]:
+        return chain.from_iterable(leaf.items for leaf in _leaves(self.root))
+
+    def __reversed__(self) -> Iterator[Any]:
+        return chain.from_iterable(reversed(leaf.items) for leaf in _leaves(self.root, reverse=True))
+
+    def __getitem__(self, index: int) -> Any:
+        index = self.element_index(index)
+        node: _Node = self.root
+        while isinstance(node, _Branch):
+            if index < node.left.size:
+                node = node.left
+            else:
+                index -= node.left.size
+                node = node.right
+        return node.items[index]
+
+    # Indices follow the rules of the Python list operations they replace
+    def element_index(self, index: int, error_text: str = "list index out of range") -> int:
+        if index < 0:
+            index += self.root.size
+        if index < 0 or index >= self.root.size:
+            raise IndexError(error_text)
+        return index
+
+    def position(self, index: int) -> int:
+        if index < 0:
+            index += self.root.size
+        return min(max(index, 0), self.root.size)
+
+    def to_list(self) -> List[Any]:
+        return list(self)
+
+    def insert(self, index: int, value: Any) -> 'PersistentVector':
+        left, right = _split(self.root, self.position(index))
+        return PersistentVector.from_root(_join(_join(left, _Leaf((value,))), right))
+
+    def remove(self, index: int) -> 'PersistentVector':
+        left, right = _split(self.root, self.element_index(index, "pop index out of range"))
+        return PersistentVector.from_root(_join(left, _split(right, 1)[1]))
+
+    def replace(self, index: int, value: Any) -> 'PersistentVector':
+        return PersistentVector.from_root(_replace(self.root, self.element_index(index, "list assignment index out of range"), value))
+
+    def concat(self, other: 'PersistentVector') -> 'PersistentVector':
+        return PersistentVector.from_root(_join(self.root, other.root))
+
+    def slice(self, start: int, end: int) -> 'PersistentVector':
+        start, end = self.position(start), self.position(end)
+        if end <= start:
+            return PersistentVector()
+        return PersistentVector.from_root(_split(_split(self.root, end)[0], start)[1])
+
+    def reverse(self) -> 'PersistentVector':
+        return PersistentVector(reversed(self))
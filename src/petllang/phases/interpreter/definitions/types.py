@@ -134,3 +134,13 @@ class FuncType(PetlType):
             [petl_type.to_string() for petl_type in self.parameter_types]
         )
         return f"({parameter_type_list_str}) -> {self.return_type.to_string()}"
+
+
+# Types without parameters are never changed, so values and interpreters share these instead of creating their own
+ANY_TYPE: AnyType = AnyType()
+UNKNOWN_TYPE: UnknownType = UnknownType()
+INT_TYPE: IntType = IntType()
+BOOL_TYPE: BoolType = BoolType()
+CHAR_TYPE: CharType = CharType()
+STRING_TYPE: StringType = StringType()
+NONE_TYPE: NoneType = NoneType()
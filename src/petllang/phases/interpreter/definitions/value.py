@@ -1,11 +1,18 @@
+from itertools import chain
 from pprint import pformat
-from typing import Tuple
+from typing import Callable, Dict, Hashable, Iterator, Optional, Tuple, Union
 
+import numpy as np
+
+from petllang.phases.interpreter.definitions.persistent_vector import PersistentVector
 from petllang.phases.interpreter.definitions.types import *
 from petllang.phases.parser.defintions.expression import Expression
+from petllang.utils.int_range import IntRange
 
 
 class PetlValue(ABC):
+    __slots__ = ("petl_type",)
+
     def __init__(self, petl_type: PetlType):
         self.petl_type = petl_type
 
@@ -16,6 +23,24 @@ class PetlValue(ABC):
     def to_formatted_string(self) -> str:
         return pformat(self)
 
+    def hash_key(self) -> Hashable:
+        # Keys of values are equal exactly when values_equal holds, values without equality never match anything
+        return object()
+
+    # Iteration protocol used by for loops and iterable builtins. Iterable values hand out their elements one at a time
+    # and answer length and emptiness without making them.
+    def is_iterable(self) -> bool:
+        return False
+
+    def iterate(self) -> Iterator['PetlValue']:
+        return iter(())
+
+    def length(self) -> int:
+        return 0
+
+    def is_empty(self) -> bool:
+        return self.length() == 0
+
 
 def values_equal(value1: PetlValue, value2: PetlValue) -> bool:
     if isinstance(value1, IntValue) and isinstance(value2, IntValue):
@@ -29,71 +54,280 @@ def values_equal(value1: PetlValue, value2: PetlValue) -> bool:
     elif isinstance(value1, NoneValue) and isinstance(value2, NoneValue):
         return True
     elif isinstance(value1, ListValue) and isinstance(value2, ListValue):
-        return all(map(lambda v1, v2: values_equal(v1, v2), value1.values, value2.values))
+        return value1.length() == value2.length() and all(map(lambda v1, v2: values_equal(v1, v2), value1.elements(), value2.elements()))
     elif isinstance(value1, TupleValue) and isinstance(value2, TupleValue):
-        return all(map(lambda v1, v2: values_equal(v1, v2), value1.values, value2.values))
+        return len(value1.values) == len(value2.values) and all(map(lambda v1, v2: values_equal(v1, v2), value1.values, value2.values))
     elif isinstance(value1, DictValue) and isinstance(value2, DictValue):
-        return all(map(lambda v1, v2: values_equal(v1[0], v2[0]) and values_equal(v1[1], v2[1]), value1.values, value2.values))
+        return len(value1.values) == len(value2.values) and \
+            all(map(lambda v1, v2: values_equal(v1[0], v2[0]) and values_equal(v1[1], v2[1]), value1.values, value2.values))
     else:
         return False
 
 
 class IntValue(PetlValue):
+    __slots__ = ("value",)
+
     def __init__(self, value: int):
-        PetlValue.__init__(self, IntType())
+        PetlValue.__init__(self, INT_TYPE)
         self.value: int = value
 
     def to_string(self) -> str:
         return str(self.value)
 
+    def hash_key(self) -> Hashable:
+        return self.value
+
 
 class BoolValue(PetlValue):
+    __slots__ = ("value",)
+
     def __init__(self, value: bool):
-        PetlValue.__init__(self, BoolType())
+        PetlValue.__init__(self, BOOL_TYPE)
         self.value: bool = value
 
     def to_string(self) -> str:
         return str("true" if self.value else "false")
 
+    def hash_key(self) -> Hashable:
+        # Tagged so that true and 1 stay different keys
+        return BoolValue, bool(self.value)
+
 
 class CharValue(PetlValue):
+    __slots__ = ("value",)
+
     def __init__(self, value: str):
-        PetlValue.__init__(self, CharType())
+        PetlValue.__init__(self, CHAR_TYPE)
         self.value: str = value
 
     def to_string(self) -> str:
         return self.value
 
+    def hash_key(self) -> Hashable:
+        return CharValue, self.value
+
 
 class StringValue(PetlValue):
+    __slots__ = ("value",)
+
     def __init__(self, value: str):
-        PetlValue.__init__(self, StringType())
+        PetlValue.__init__(self, STRING_TYPE)
         self.value: str = value
 
     def to_string(self) -> str:
         return self.value
 
+    def hash_key(self) -> Hashable:
+        return self.value
+
+    def is_iterable(self) -> bool:
+        return isinstance(self.petl_type, StringType)
+
+    def iterate(self) -> Iterator[PetlValue]:
+        return map(char_value, self.value)
+
+    def length(self) -> int:
+        return len(self.value)
+
 
 class NoneValue(PetlValue):
+    __slots__ = ("value",)
+
     def __init__(self):
-        PetlValue.__init__(self, NoneType())
+        PetlValue.__init__(self, NONE_TYPE)
         self.value: None = None
 
     def to_string(self) -> str:
         return "none"
 
+    def hash_key(self) -> Hashable:
+        return None
+
+
+# Values of literal types are immutable, so the factories below hand out shared instances where they can. Code that
+# creates int, bool, char or none values should use them instead of the constructors.
+SMALL_INT_MIN: int = -128
+SMALL_INT_MAX: int = 1024
+
+_SMALL_INT_VALUES: List[IntValue] = [IntValue(value) for value in range(SMALL_INT_MIN, SMALL_INT_MAX + 1)]
+_CHAR_VALUES: Dict[str, CharValue] = {chr(code): CharValue(chr(code)) for code in range(256)}
+
+TRUE_VALUE: BoolValue = BoolValue(True)
+FALSE_VALUE: BoolValue = BoolValue(False)
+NONE_VALUE: NoneValue = NoneValue()
+
+
+def int_value(value: int) -> IntValue:
+    if type(value) is int and SMALL_INT_MIN <= value <= SMALL_INT_MAX:
+        return _SMALL_INT_VALUES[value - SMALL_INT_MIN]
+    return IntValue(value)
+
+
+def bool_value(value: bool) -> BoolValue:
+    return TRUE_VALUE if value else FALSE_VALUE
+
+
+def char_value(value: str) -> CharValue:
+    cached_value: Optional[CharValue] = _CHAR_VALUES.get(value)
+    return cached_value if cached_value is not None else CharValue(value)
+
+
+def none_value() -> NoneValue:
+    return NONE_VALUE
+
 
+# Holds its elements as a list or as a PersistentVector, the other one is built and kept the first time it is used.
+# Neither is ever changed, list builtins return new values that share the vector of the original. The same goes for
+# the membership index, which is only built once a list is searched.
 class ListValue(PetlValue):
-    def __init__(self, petl_type: PetlType, values: List[PetlValue]):
+    __slots__ = ("_values", "_vector", "_index")
+
+    def __init__(self, petl_type: PetlType, values: Union[List[PetlValue], PersistentVector]):
         PetlValue.__init__(self, petl_type)
-        self.values = values
+        self._values: Optional[List[PetlValue]] = None
+        self._vector: Optional[PersistentVector] = None
+        self._index: Optional[Dict[Hashable, int]] = None
+        if isinstance(values, PersistentVector):
+            self._vector = values
+        else:
+            self._values = values
+
+    @property
+    def values(self) -> List[PetlValue]:
+        if self._values is None:
+            self._values = self._vector.to_list()
+        return self._values
+
+    @property
+    def vector(self) -> PersistentVector:
+        if self._vector is None:
+            self._vector = PersistentVector(self._values)
+        return self._vector
+
+    def elements(self) -> Union[List[PetlValue], PersistentVector]:
+        # Supports len and indexing without building the other representation
+        return self._values if self._values is not None else self._vector
+
+    def is_iterable(self) -> bool:
+        return isinstance(self.petl_type, ListType)
+
+    def iterate(self) -> Iterator[PetlValue]:
+        return iter(self.elements())
+
+    def length(self) -> int:
+        return len(self.elements())
+
+    def membership_index(self) -> Dict[Hashable, int]:
+        # Maps the hash key of every element to its first position
+        if self._index is None:
+            index: Dict[Hashable, int] = {}
+            for position, value in enumerate(self.elements()):
+                index.setdefault(value.hash_key(), position)
+            self._index = index
+        return self._index
+
+    def find(self, value: PetlValue) -> int:
+        return self.membership_index().get(value.hash_key(), -1)
 
     def to_string(self) -> str:
         elements_string: str = functools.reduce(lambda v1, v2: v1 + ", " + v2, map(lambda v: v.to_string(), self.values))
         return f"[{elements_string}]"
 
+    def hash_key(self) -> Hashable:
+        return ListValue, tuple(value.hash_key() for value in self.elements())
+
+
+# List of the integers in an inclusive range. Length, indexing and membership are answered from the bounds, elements
+# are made when they are read and only stored as a list for builtins that need one.
+class RangeValue(ListValue):
+    __slots__ = ("range",)
+
+    def __init__(self, start: int, end: int):
+        PetlValue.__init__(self, ListType(IntType()))
+        self._values: Optional[List[PetlValue]] = None
+        self._vector: Optional[PersistentVector] = None
+        self._index: Optional[Dict[Hashable, int]] = None
+        self.range: IntRange = IntRange(start, end, int_value)
+
+    @property
+    def values(self) -> List[PetlValue]:
+        if self._values is None:
+            self._values = list(self.range)
+        return self._values
+
+    @property
+    def vector(self) -> PersistentVector:
+        if self._vector is None:
+            self._vector = PersistentVector(self.range)
+        return self._vector
+
+    def elements(self) -> IntRange:
+        return self.range
+
+    def find(self, value: PetlValue) -> int:
+        return self.range.position(value.value) if isinstance(value, IntValue) else -1
+
+
+# List made by a fused pipeline stage, its elements are produced from the elements of its sources when the next stage
+# reads them and are only stored when they are read as a list. The stream is read once, by the stage it is passed to.
+class StreamValue(ListValue):
+    __slots__ = ("sources", "stage", "keeps_length", "_stream")
+
+    def __init__(self, petl_type: PetlType, sources: List[PetlValue], stage: Callable[..., Iterator[PetlValue]], keeps_length: bool):
+        PetlValue.__init__(self, petl_type)
+        self._values: Optional[List[PetlValue]] = None
+        self._vector: Optional[PersistentVector] = None
+        self._index: Optional[Dict[Hashable, int]] = None
+        self.sources: List[PetlValue] = sources
+        self.stage: Callable[..., Iterator[PetlValue]] = stage
+        # Stages making one element per source element have the length of their first source
+        self.keeps_length: bool = keeps_length
+        self._stream: Optional[Iterator[PetlValue]] = None
+
+    def stream(self) -> Iterator[PetlValue]:
+        if self._stream is None:
+            self._stream = self.stage(*[source.iterate() for source in self.sources])
+        return self._stream
+
+    @property
+    def values(self) -> List[PetlValue]:
+        if self._values is None:
+            self._values = list(self.stream())
+        return self._values
+
+    @property
+    def vector(self) -> PersistentVector:
+        if self._vector is None:
+            self._vector = PersistentVector(self.values)
+        return self._vector
+
+    def elements(self) -> List[PetlValue]:
+        return self.values
+
+    def iterate(self) -> Iterator[PetlValue]:
+        return iter(self._values) if self._values is not None else self.stream()
+
+    def length(self) -> int:
+        if self._values is None and self.keeps_length:
+            return self.sources[0].length()
+        return len(self.values)
+
+    def is_empty(self) -> bool:
+        if self._values is None and self.keeps_length:
+            return self.sources[0].is_empty()
+        elif self._values is None:
+            # The first element is read ahead and handed out again when the stream is read
+            first_value: Optional[PetlValue] = next(self.stream(), None)
+            if first_value is None:
+                self._values = []
+            else:
+                self._stream = chain((first_value,), self._stream)
+        return self._values is not None and not self._values
+
 
 class TupleValue(PetlValue):
+    __slots__ = ("values",)
+
     def __init__(self, petl_type: PetlType, values: List[PetlValue]):
         PetlValue.__init__(self, petl_type)
         self.values = values
@@ -102,11 +336,46 @@ class TupleValue(PetlValue):
         elements_string: str = functools.reduce(lambda v1, v2: v1 + ", " + v2, map(lambda v: v.to_string(), self.values))
         return f"({elements_string})"
 
+    def hash_key(self) -> Hashable:
+        return TupleValue, tuple(value.hash_key() for value in self.values)
+
+    def is_iterable(self) -> bool:
+        return isinstance(self.petl_type, TupleType)
+
+    def iterate(self) -> Iterator[PetlValue]:
+        return iter(self.values)
 
+    def length(self) -> int:
+        return len(self.values)
+
+
+# Keeps its entries in order for printing and iteration, lookups go through a hash map from key to the value of the
+# first entry with that key, built the first time the dictionary is accessed
 class DictValue(PetlValue):
+    __slots__ = ("values", "_index")
+
     def __init__(self, petl_type: PetlType, values: List[Tuple[PetlValue, PetlValue]]):
         PetlValue.__init__(self, petl_type)
         self.values = values
+        self._index: Optional[Dict[Hashable, PetlValue]] = None
+
+    def lookup(self, key: PetlValue) -> Optional[PetlValue]:
+        if self._index is None:
+            self._index = {}
+            for entry_key, entry_value in self.values:
+                self._index.setdefault(entry_key.hash_key(), entry_value)
+        return self._index.get(key.hash_key())
+
+    def is_iterable(self) -> bool:
+        return isinstance(self.petl_type, DictType)
+
+    def iterate(self) -> Iterator[PetlValue]:
+        # Entries are read as (key, value) tuples
+        for key, value in self.values:
+            yield TupleValue(TupleType([key.petl_type, value.petl_type]), [key, value])
+
+    def length(self) -> int:
+        return len(self.values)
 
     def to_string(self) -> str:
         elements_string: str = functools.reduce(
@@ -115,8 +384,13 @@ class DictValue(PetlValue):
         )
         return f"[{elements_string}]"
 
+    def hash_key(self) -> Hashable:
+        return DictValue, tuple((key.hash_key(), value.hash_key()) for key, value in self.values)
+
 
 class SchemaValue(PetlValue):
+    __slots__ = ("values",)
+
     def __init__(self, petl_type: PetlType, values: List[Tuple[StringValue, PetlType]]):
         PetlValue.__init__(self, petl_type)
         self.values = values
@@ -129,11 +403,223 @@ class SchemaValue(PetlValue):
         return "${" + elements_string + "}"
 
 
+def column_value_class(column_type: PetlType) -> Optional[type]:
+    if isinstance(column_type, UnionType):
+        non_none_types: List[PetlType] = [ut for ut in column_type.union_types if not isinstance(ut, NoneType)]
+        if len(non_none_types) == 1 and len(non_none_types) < len(column_type.union_types):
+            column_type = non_none_types[0]
+    if isinstance(column_type, IntType):
+        return IntValue
+    elif isinstance(column_type, BoolType):
+        return BoolValue
+    elif isinstance(column_type, CharType):
+        return CharValue
+    elif isinstance(column_type, StringType):
+        return StringValue
+    return None
+
+
+VALUE_FACTORIES: Dict[type, Callable[[object], PetlValue]] = {
+    IntValue: int_value,
+    BoolValue: bool_value,
+    CharValue: char_value,
+    StringValue: StringValue,
+}
+
+
+# Typed array of raw column values plus a null mask, non-primitive columns hold PetlValues (value_class is None)
+# Never mutated after creation, so columns can be shared between tables
+class TableColumn:
+    def __init__(self, value_class: Optional[type], data: Optional[np.ndarray], nulls: Optional[np.ndarray] = None):
+        self.value_class = value_class
+        self.value_factory: Optional[Callable[[object], PetlValue]] = VALUE_FACTORIES.get(value_class)
+        self._data = data
+        self.nulls = nulls
+        self.load_data: Optional[Callable[[], np.ndarray]] = None
+        self.length: int = 0
+
+    @staticmethod
+    def from_loader(value_class: type, length: int, load_data: Callable[[], np.ndarray], nulls: Optional[np.ndarray] = None) -> 'TableColumn':
+        # The data is only loaded once it is first read, columns a table never reads cost nothing
+        column: TableColumn = TableColumn(value_class, None, nulls)
+        column.load_data = load_data
+        column.length = length
+        return column
+
+    @property
+    def data(self) -> np.ndarray:
+        if self._data is None:
+            self._data = self.load_data()
+            self.load_data = None
+        return self._data
+
+    @staticmethod
+    def from_values(column_type: PetlType, values: List[PetlValue]) -> 'TableColumn':
+        value_class: Optional[type] = column_value_class(column_type)
+        if value_class and all(isinstance(v, value_class) or isinstance(v, NoneValue) for v in values):
+            nulls: np.ndarray = np.fromiter((isinstance(v, NoneValue) for v in values), dtype=bool, count=len(values))
+            return TableColumn.from_raw(value_class, [v.value for v in values], nulls if nulls.any() else None)
+        return TableColumn(None, np.fromiter(values, dtype=object, count=len(values)))
+
+    @staticmethod
+    def from_raw(value_class: type, raw_values: List, nulls: Optional[np.ndarray] = None) -> 'TableColumn':
+        if value_class is IntValue:
+            raw_values = [0 if v is None else v for v in raw_values]
+            try:
+                data: np.ndarray = np.array(raw_values, dtype=np.int64)
+            except OverflowError:
+                data = np.fromiter(raw_values, dtype=object, count=len(raw_values))
+        elif value_class is BoolValue:
+            data = np.array([bool(v) for v in raw_values], dtype=bool)
+        else:
+            data = np.fromiter(("" if v is None else v for v in raw_values), dtype=object, count=len(raw_values))
+        return TableColumn(value_class, data, nulls)
+
+    def __len__(self) -> int:
+        return len(self._data) if self._data is not None else self.length
+
+    def is_null(self, index: int) -> bool:
+        return self.nulls is not None and bool(self.nulls[index])
+
+    def value_at(self, index: int) -> PetlValue:
+        if self.is_null(index):
+            return NONE_VALUE
+        raw_value = self.data[index]
+        if self.value_factory is None:
+            return raw_value
+        return self.value_factory(raw_value.item() if isinstance(raw_value, np.generic) else raw_value)
+
+    def to_values(self, start: int = 0, end: Optional[int] = None) -> List[PetlValue]:
+        raw_values: List = self.data[start:end].tolist()
+        if self.value_factory is None:
+            return raw_values
+        elif self.nulls is None:
+            return list(map(self.value_factory, raw_values))
+        nulls: List[bool] = self.nulls[start:end].tolist()
+        return [NONE_VALUE if null else self.value_factory(v) for v, null in zip(raw_values, nulls)]
+
+    def take(self, indices) -> 'TableColumn':
+        indices = np.asarray(indices, dtype=np.intp)
+        return TableColumn(self.value_class, self.data[indices], self.nulls[indices] if self.nulls is not None else None)
+
+    def concat(self, other: 'TableColumn') -> 'TableColumn':
+        if self.value_class is not other.value_class:
+            values: List[PetlValue] = self.to_values() + other.to_values()
+            return TableColumn(None, np.fromiter(values, dtype=object, count=len(values)))
+        nulls: Optional[np.ndarray] = None
+        if self.nulls is not None or other.nulls is not None:
+            self_nulls = self.nulls if self.nulls is not None else np.zeros(len(self), dtype=bool)
+            other_nulls = other.nulls if other.nulls is not None else np.zeros(len(other), dtype=bool)
+            nulls = np.concatenate([self_nulls, other_nulls])
+        return TableColumn(self.value_class, np.concatenate([self.data, other.data]), nulls)
+
+    @staticmethod
+    def concat_all(columns: List['TableColumn']) -> 'TableColumn':
+        if any(column.value_class is not columns[0].value_class for column in columns):
+            return functools.reduce(lambda c1, c2: c1.concat(c2), columns)
+        nulls: Optional[np.ndarray] = None
+        if any(column.nulls is not None for column in columns):
+            nulls = np.concatenate([column.nulls if column.nulls is not None else np.zeros(len(column), dtype=bool)
+                                    for column in columns])
+        return TableColumn(columns[0].value_class, np.concatenate([column.data for column in columns]), nulls)
+
+
+TABLE_ROW_CHUNK_SIZE: int = 4096
+
+
 class TableValue(PetlValue):
-    def __init__(self, petl_type: PetlType, schema: SchemaValue, rows: List[PetlValue]):
+    __slots__ = ("schema", "plan", "_columns", "_rows", "_row_count")
+
+    def __init__(self, petl_type: PetlType, schema: SchemaValue, rows: Optional[List[PetlValue]] = None,
+                 columns: Optional[List[TableColumn]] = None, plan=None, row_count: Optional[int] = None):
         PetlValue.__init__(self, petl_type)
         self.schema = schema
-        self.rows = rows
+        # A lazy table only holds a query plan (see petllang.query.plan), which is run the first time its data is needed
+        self.plan = plan
+        self._columns: Optional[List[TableColumn]] = columns
+        self._rows: List[PetlValue] = rows if rows is not None else []
+        self._row_count: int = row_count if row_count is not None else 0
+
+    def materialize(self):
+        if self.plan is not None:
+            table_value: TableValue = self.plan.collect()
+            self._columns = table_value.columns
+            self._row_count = table_value.row_count()
+            self.plan = None
+
+    @property
+    def columns(self) -> Optional[List[TableColumn]]:
+        self.materialize()
+        return self._columns
+
+    @property
+    def rows(self) -> List[PetlValue]:
+        if self.columns is not None:
+            return list(self.iter_rows())
+        return self._rows
+
+    def is_lazy(self) -> bool:
+        return self.plan is not None
+
+    def is_columnar(self) -> bool:
+        return self.plan is not None or self._columns is not None
+
+    def is_streaming(self) -> bool:
+        return self.plan is not None and self.plan.is_streaming()
+
+    def iter_chunks(self) -> Iterator['TableValue']:
+        # A streaming table is re-read chunk by chunk on every pass instead of being loaded into memory
+        if self.is_streaming():
+            yield from self.plan.stream()
+        else:
+            yield self
+
+    def column_types(self) -> List[PetlType]:
+        return list(map(lambda sv: sv[1], self.schema.values))
+
+    def row_count(self) -> int:
+        if self.columns is not None:
+            return len(self._columns[0]) if self._columns else self._row_count
+        return len(self._rows)
+
+    def is_iterable(self) -> bool:
+        return isinstance(self.petl_type, TableType)
+
+    def iterate(self) -> Iterator[PetlValue]:
+        return self.iter_rows()
+
+    def length(self) -> int:
+        return self.row_count()
+
+    def iter_rows(self) -> Iterator[PetlValue]:
+        if self.columns is None:
+            yield from self._rows
+            return
+        row_type: TupleType = TupleType(self.column_types())
+        row_count: int = self.row_count()
+        for start in range(0, row_count, TABLE_ROW_CHUNK_SIZE):
+            end: int = min(start + TABLE_ROW_CHUNK_SIZE, row_count)
+            if not self._columns:
+                for _ in range(start, end):
+                    yield TupleValue(row_type, [])
+                continue
+            column_values: List[List[PetlValue]] = [column.to_values(start, end) for column in self._columns]
+            for row_values in zip(*column_values):
+                yield TupleValue(row_type, list(row_values))
+
+    def get_columns(self) -> Optional[List[TableColumn]]:
+        if self.columns is not None:
+            return self._columns
+        return rows_to_columns(self.column_types(), self._rows)
+
+    def with_rows(self, rows: List[PetlValue]) -> 'TableValue':
+        # Returns a new table, the rows and columns of this one are shared and never changed
+        if self.columns is not None:
+            appended_columns: Optional[List[TableColumn]] = rows_to_columns(self.column_types(), rows)
+            if appended_columns is not None:
+                return TableValue(self.petl_type, self.schema, columns=[column.concat(appended) for column, appended in zip(self._columns, appended_columns)],
+                                  row_count=self.row_count() + len(rows))
+        return TableValue(self.petl_type, self.schema, self.rows + rows)
 
     def to_string(self) -> str:
         def row_to_strings(row: List[str]) -> List[str]:
@@ -165,6 +651,8 @@ class TableValue(PetlValue):
 
 
 class FuncValue(PetlValue):
+    __slots__ = ("builtin", "parameters", "body", "environment")
+
     def __init__(self, petl_type: PetlType, builtin, parameters: List[Tuple[str, PetlType]], body: Expression, environment):
         PetlValue.__init__(self, petl_type)
         self.builtin = builtin
@@ -177,3 +665,17 @@ class FuncValue(PetlValue):
         return_type: str = self.petl_type.return_type.to_string() if isinstance(self.petl_type, FuncType) else "?"
         parameters: str = ", ".join(list(map(lambda p: p[0] + ": " + p[1].to_string(), self.parameters)))
         return f"{name}({parameters}) -> {return_type}"
+
+
+def rows_to_columns(column_types: List[PetlType], rows: List[PetlValue]) -> Optional[List[TableColumn]]:
+    if not column_types or not all(isinstance(row, TupleValue) and len(row.values) == len(column_types) for row in rows):
+        return None
+    return [TableColumn.from_values(column_type, [row.values[index] for row in rows])
+            for index, column_type in enumerate(column_types)]
+
+
+def create_table_value(petl_type: PetlType, schema: SchemaValue, rows: List[PetlValue]) -> TableValue:
+    columns: Optional[List[TableColumn]] = rows_to_columns(list(map(lambda sv: sv[1], schema.values)), rows)
+    if columns is not None:
+        return TableValue(petl_type, schema, columns=columns)
+    return TableValue(petl_type, schema, rows)
@@ -1,17 +1,39 @@
-from typing import Dict
+from typing import Dict, Iterable, Optional
 
 from petllang.phases.interpreter.definitions.types import PetlType, NoneType
-from petllang.phases.interpreter.definitions.value import PetlValue, NoneValue
+from petllang.phases.interpreter.definitions.value import PetlValue, none_value
 from petllang.phases.lexer.definitions.token_petl import Token
 
 
+class FrozenScope:
+    # Bindings shared by every environment copied from the same scope, never changed once frozen
+    def __init__(self, map: Dict[str, PetlValue], aliases: Dict[str, PetlType], parent: Optional['FrozenScope']):
+        self.map = map
+        self.aliases = aliases
+        self.parent = parent
+        self.size: int = len(map) + len(aliases)
+
+    def merge_parents(self) -> 'FrozenScope':
+        # Merges parents that are not much larger than this scope, which keeps the chain logarithmic in its bindings
+        scope: FrozenScope = self
+        while scope.parent and scope.parent.size <= 2 * scope.size:
+            merged_map: Dict[str, PetlValue] = dict(scope.parent.map)
+            merged_map.update(scope.map)
+            merged_aliases: Dict[str, PetlType] = dict(scope.parent.aliases)
+            merged_aliases.update(scope.aliases)
+            scope = FrozenScope(merged_map, merged_aliases, scope.parent.parent)
+        return scope
+
+
 class InterpreterEnvironment:
     map: Dict[str, PetlValue] = {}
     aliases: Dict[str, PetlType] = {}
 
     def __init__(self):
+        # Only bindings added since the environment was last copied are local, the rest is read through the parent chain
         self.map = {}
         self.aliases = {}
+        self.parent: Optional[FrozenScope] = None
 
     def add(self, identifier: str, value: PetlValue):
         self.map[identifier] = value
@@ -19,23 +41,54 @@ class InterpreterEnvironment:
     def add_alias(self, identifier: str, alias_type: PetlType):
         self.aliases[identifier] = alias_type
 
+    def lookup(self, identifier: str) -> Optional[PetlValue]:
+        value: Optional[PetlValue] = self.map.get(identifier)
+        scope: Optional[FrozenScope] = self.parent
+        while value is None and scope:
+            value = scope.map.get(identifier)
+            scope = scope.parent
+        return value
+
     def get(self, identifier: str, token: Token, error) -> PetlValue:
-        if identifier in self.map:
-            return self.map[identifier]
+        value: Optional[PetlValue] = self.lookup(identifier)
+        if value is not None:
+            return value
         else:
             error(f"Identifier \'{identifier}\' does not exist in this scope", token)
-            return NoneValue()
+            return none_value()
 
     def get_alias(self, alias: str, token: Token, error) -> PetlType:
-        if alias in self.aliases:
-            return self.aliases[alias]
+        alias_type: Optional[PetlType] = self.aliases.get(alias)
+        scope: Optional[FrozenScope] = self.parent
+        while alias_type is None and scope:
+            alias_type = scope.aliases.get(alias)
+            scope = scope.parent
+        if alias_type is not None:
+            return alias_type
         else:
             error(f"Alias \'{alias}\' does not exist in this scope", token)
             return NoneType()
 
+    def freeze(self) -> Optional[FrozenScope]:
+        # Moves the local bindings into a new frozen scope, so copies can share them instead of duplicating them
+        if self.map or self.aliases:
+            self.parent = FrozenScope(self.map, self.aliases, self.parent).merge_parents()
+            self.map = {}
+            self.aliases = {}
+        return self.parent
+
 
 def copy_environment(environment: InterpreterEnvironment) -> InterpreterEnvironment:
     new_environment: InterpreterEnvironment = InterpreterEnvironment()
-    new_environment.map = dict(environment.map)
-    new_environment.aliases = dict(environment.aliases)
+    new_environment.parent = environment.freeze()
     return new_environment
+
+
+def capture_environment(environment: InterpreterEnvironment, identifiers: Iterable[str]) -> InterpreterEnvironment:
+    # Copies only the given bindings, closures keep what their body can read instead of the whole enclosing scope
+    captured_environment: InterpreterEnvironment = InterpreterEnvironment()
+    for identifier in identifiers:
+        value: Optional[PetlValue] = environment.lookup(identifier)
+        if value is not None:
+            captured_environment.map[identifier] = value
+    return captured_environment
@@ -0,0 +1,29 @@
+from typing import Any, FrozenSet, List, Set
+
+from petllang.phases.parser.defintions.expression import Expression, Lambda, Reference, Case, Pattern
+
+
+def referenced_identifiers(expression: Expression) -> Set[str]:
+    # Every identifier the expression may look up. Identifiers bound inside it are kept as well, so the result is a
+    # superset of what the expression reads from its scope.
+    identifiers: Set[str] = set()
+    nodes: List[Any] = [expression]
+    while nodes:
+        node: Any = nodes.pop()
+        if isinstance(node, Reference):
+            identifiers.add(node.identifier)
+        elif isinstance(node, Lambda):
+            identifiers.update(free_identifiers(node))
+        elif isinstance(node, (Expression, Case, Pattern)):
+            nodes.extend(vars(node).values())
+        elif isinstance(node, (list, tuple)):
+            nodes.extend(node)
+    return identifiers
+
+
+def free_identifiers(lambda_expression: Lambda) -> FrozenSet[str]:
+    # Parameters are always bound when the body runs, everything else it references comes from the enclosing scope
+    if lambda_expression.free_identifiers is None:
+        parameters: Set[str] = set(map(lambda p: p.identifier, lambda_expression.parameters))
+        lambda_expression.free_identifiers = frozenset(referenced_identifiers(lambda_expression.body) - parameters)
+    return lambda_expression.free_identifiers
@@ -1,10 +1,11 @@
 import traceback
-from copy import deepcopy
+from copy import copy
 from typing import Set
 
-from petllang.builtins.builtin_definitions import Builtin, extract_iterable_values
+from petllang.builtins.builtin_definitions import Builtin, require_iterable
 from petllang.phases.interpreter.definitions.value import *
-from petllang.phases.interpreter.environment import InterpreterEnvironment, copy_environment
+from petllang.phases.interpreter.environment import InterpreterEnvironment, copy_environment, capture_environment
+from petllang.phases.interpreter.free_identifiers import free_identifiers
 from petllang.phases.interpreter.type_resolution import types_conform
 from petllang.phases.parser.defintions.expression import *
 from petllang.phases.phase import PetlPhase
@@ -22,52 +23,74 @@ class InterpreterException(Exception):
     pass
 
 
+# Deepest expression nesting evaluated before a script is assumed to recurse infinitely
+MAXIMUM_DEPTH: int = 1000
+# Stack traces longer than this only show the calls at both of their ends
+MAXIMUM_STACK_TRACE_LENGTH: int = 100
+
+
 class TreeWalkInterpreter(PetlPhase):
-    def __init__(self, debug=False):
+    def __init__(self, debug=False, trusted=False, maximum_depth=MAXIMUM_DEPTH):
         self.logger.__init__(debug)
         self.stack_trace: List[FilePosition] = []
         self.descent_counter = 0
+        self.maximum_depth = maximum_depth
+        # Skips the type checks of expressions the type checker resolved, only valid for trees it has checked
+        self.trusted = trusted
+        # Lambda expressions are kept alive with their typed bodies so their ids stay unique
+        self.typed_bodies: Dict[int, Tuple[Lambda, List[Tuple[PetlType, Expression]]]] = {}
 
     def error(self, text: str, token: Optional[Token] = None):
         if not self.stack_trace or (self.stack_trace and self.stack_trace[-1] != token.file_position):
             self.stack_trace.append(token.file_position)
-        stack_trace_strs: List[str] = list(map(lambda fp: fp.to_string(), list(reversed(self.stack_trace))))
-        stack_trace_str: Optional[str] = "" if not stack_trace_strs else functools.reduce(lambda fp1, fp2: f"{fp1}\n\tin\n{fp2}", stack_trace_strs)
+        stack_trace: List[FilePosition] = list(reversed(self.stack_trace))
+        omitted_length: int = len(stack_trace) - MAXIMUM_STACK_TRACE_LENGTH
+        if omitted_length > 0:
+            shown_length: int = MAXIMUM_STACK_TRACE_LENGTH // 2
+            stack_trace = stack_trace[:shown_length] + stack_trace[-shown_length:]
+        stack_trace_strs: List[str] = list(map(lambda fp: fp.to_string(), stack_trace))
+        if omitted_length > 0:
+            stack_trace_strs.insert(MAXIMUM_STACK_TRACE_LENGTH // 2, f"... {omitted_length} more calls ...")
+        stack_trace_str: str = "\n\tin\n".join(stack_trace_strs)
         self.logger.error(f"{text}\n{stack_trace_str}")
         raise InterpreterException
 
     def literal_to_value(self, token: Token, literal: Literal) -> PetlValue:
         if isinstance(literal, IntLiteral):
-            return IntValue(literal.value)
+            return int_value(literal.value)
         elif isinstance(literal, BoolLiteral):
-            return BoolValue(literal.value)
+            return bool_value(literal.value)
         if isinstance(literal, CharLiteral):
-            return CharValue(literal.value)
+            return char_value(literal.value)
         elif isinstance(literal, StringLiteral):
             return StringValue(literal.value)
         elif isinstance(literal, NoneLiteral):
-            return NoneValue()
+            return none_value()
         else:
             self.error(f"Invalid type for pattern matching on literal value", token)
-            return NoneValue()
+            return none_value()
 
     def interpret(self, root: Expression, environment: InterpreterEnvironment) -> PetlValue:
         try:
-            return self.evaluate(root, environment, AnyType())
+            result_value: PetlValue = self.evaluate(root, environment, AnyType())
+            # Lazy tables run their plans here so query errors are reported like any other runtime error
+            if isinstance(result_value, TableValue):
+                result_value.materialize()
+            return result_value
         except InterpreterException as _:
-            return NoneValue()
+            return none_value()
         except Exception as e:
             self.logger.error(f"Unhandled exception while interpreting: {e}, {traceback.format_exc()}")
-            return NoneValue()
+            return none_value()
 
     def evaluate(self, expression: Expression, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         self.descent_counter += 1
 
-        if self.descent_counter > 1000:
+        if self.descent_counter > self.maximum_depth:
             self.error(f"Maximum expression depth exceeded, possible infinite recursion", expression.token)
-            return NoneValue()
+            return none_value()
 
-        evaluated_value: PetlValue = NoneValue()
+        evaluated_value: PetlValue = none_value()
         if isinstance(expression, LitExpression):
             evaluated_value = self.evaluate_literal(expression, expected_type)
         elif isinstance(expression, Let):
@@ -88,6 +111,8 @@ class TreeWalkInterpreter(PetlPhase):
             evaluated_value = self.evaluate_branch(expression, environment, expected_type)
         elif isinstance(expression, For):
             evaluated_value = self.evaluate_for(expression, environment, expected_type)
+        elif isinstance(expression, Block):
+            evaluated_value = self.evaluate_block(expression, environment, expected_type)
         elif isinstance(expression, ListDefinition):
             evaluated_value = self.evaluate_list_definition(expression, environment, expected_type)
         elif isinstance(expression, RangeDefinition):
@@ -104,20 +129,38 @@ class TreeWalkInterpreter(PetlPhase):
         self.descent_counter -= 1
         return evaluated_value
 
+    def is_checked(self, expression: Expression) -> bool:
+        return self.trusted and expression.checked_type is not None
+
+    def evaluate_builtin(self, builtin: Builtin, application: Application, arguments: List[PetlValue], environment: InterpreterEnvironment) -> PetlValue:
+        # Builtins bind unchecked values and may evaluate lambda bodies in other environments, so nothing is trusted
+        trusted: bool = self.trusted
+        self.trusted = False
+        try:
+            if builtin.positional:
+                return builtin.call(arguments, application, self, self.error)
+            # Builtins only defining evaluate read their arguments from a copy of the calling environment
+            builtin_environment: InterpreterEnvironment = copy_environment(environment)
+            for parameter, argument in zip(builtin.parameters, arguments):
+                builtin_environment.add(parameter[0], argument)
+            return builtin.evaluate(application, builtin_environment, self, self.error)
+        finally:
+            self.trusted = trusted
+
     def evaluate_literal(self, literal_expression: LitExpression, expected_type: PetlType) -> PetlValue:
-        if types_conform(literal_expression.token, literal_expression.petl_type, expected_type, self.error):
+        if self.is_checked(literal_expression) or types_conform(literal_expression.token, literal_expression.petl_type, expected_type, self.error):
             if isinstance(literal_expression.literal, IntLiteral):
-                return IntValue(int(literal_expression.literal.value))
+                return int_value(int(literal_expression.literal.value))
             elif isinstance(literal_expression.literal, BoolLiteral):
-                return BoolValue(literal_expression.literal.value)
+                return bool_value(literal_expression.literal.value)
             elif isinstance(literal_expression.literal, CharLiteral):
-                return CharValue(literal_expression.literal.value)
+                return char_value(literal_expression.literal.value)
             elif isinstance(literal_expression.literal, StringLiteral):
                 return StringValue(literal_expression.literal.value)
             elif isinstance(literal_expression.literal, NoneLiteral):
-                return NoneValue()
+                return none_value()
         self.error(f"Invalid expression found", literal_expression.token)
-        return NoneValue()
+        return none_value()
 
     def evaluate_let(self, let: Let, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         let_value: PetlValue = self.evaluate(let.let_expression, environment, let.let_type)
@@ -126,7 +169,7 @@ class TreeWalkInterpreter(PetlPhase):
             unpacked_values = list(map(lambda i, v: (i, v), let.identifiers, let_value.values))
         elif len(let.identifiers) > 1 and not isinstance(let_value, TupleValue):
             self.error(f"Cannot unpack, requires tuple value", let.token)
-            return NoneValue()
+            return none_value()
 
         after_let_environment = environment
         for unpacked_value in unpacked_values:
@@ -135,7 +178,7 @@ class TreeWalkInterpreter(PetlPhase):
         if let.after_let_expression:
             return self.evaluate(let.after_let_expression, after_let_environment, expected_type)
         else:
-            return NoneValue()
+            return none_value()
 
     def evaluate_alias(self, alias: Alias, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         if alias.after_alias_expression:
@@ -143,7 +186,7 @@ class TreeWalkInterpreter(PetlPhase):
             after_alias_environment.add_alias(alias.identifier, alias.alias_type)
             return self.evaluate(alias.after_alias_expression, after_alias_environment, expected_type)
         else:
-            return NoneValue()
+            return none_value()
 
     def evaluate_lambda_definition(self, lambda_expression: Lambda, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         lambda_type = types_conform(lambda_expression.token, lambda_expression.petl_type, expected_type, self.error)
@@ -151,10 +194,25 @@ class TreeWalkInterpreter(PetlPhase):
             lambda_return_type = lambda_type.return_type
             if lambda_return_type and types_conform(lambda_expression.body.token, lambda_return_type, lambda_expression.body.petl_type, self.error):
                 parameters: List[Tuple[str, PetlType]] = list(map(lambda p: (p.identifier, p.parameter_type), lambda_expression.parameters))
-                typed_lambda_body = deepcopy(lambda_expression.body)
-                typed_lambda_body.petl_type = lambda_return_type
-                return FuncValue(lambda_expression.petl_type, None, parameters, typed_lambda_body, copy_environment(environment))
-        return NoneValue()
+                return FuncValue(lambda_expression.petl_type, None, parameters, self.get_typed_body(lambda_expression, lambda_return_type),
+                                 capture_environment(environment, free_identifiers(lambda_expression)))
+        return none_value()
+
+    def get_typed_body(self, lambda_expression: Lambda, return_type: PetlType) -> Expression:
+        # Every closure of a lambda with the same return type shares one typed body
+        typed_bodies: List[Tuple[PetlType, Expression]] = self.typed_bodies.setdefault(id(lambda_expression), (lambda_expression, []))[1]
+        for typed_return_type, typed_body in typed_bodies:
+            if typed_return_type == return_type:
+                return typed_body
+        typed_body: Expression = self.type_body(lambda_expression.body, return_type)
+        typed_bodies.append((return_type, typed_body))
+        return typed_body
+
+    def type_body(self, body: Expression, return_type: PetlType) -> Expression:
+        # Bodies are never mutated, so only the root carrying the return type needs copying
+        typed_body: Expression = copy(body)
+        typed_body.petl_type = return_type
+        return typed_body
 
     def evaluate_application(self, application: Application, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         identifier: PetlValue = self.evaluate(application.identifier, environment, UnknownType())
@@ -175,23 +233,24 @@ class TreeWalkInterpreter(PetlPhase):
         if len(application.arguments) != len(identifier.parameters):
             func_types_str: str = ", ".join(map(lambda p: p[1].to_string(), identifier.parameters))
             self.error(f"Invalid argument count for function, requires: {func_types_str}", application.token)
-            return NoneValue()
+            return none_value()
 
-        function_return_value: PetlValue = NoneValue()
+        function_return_value: PetlValue = none_value()
         if isinstance(identifier.petl_type, FuncType):
-            function_environment: InterpreterEnvironment = copy_environment(environment) if identifier.builtin else copy_environment(identifier.environment)
             argument_values: List[PetlValue] = []
             for argument, parameter in list(map(lambda a, p: (a, p), application.arguments, identifier.parameters)):
-                argument_value: PetlValue = self.evaluate(argument, environment, parameter[1])
-                function_environment.add(parameter[0], argument_value)
-                argument_values.append(argument_value)
+                argument_values.append(self.evaluate(argument, environment, parameter[1]))
 
             self.stack_trace.append(application.token.file_position)
             if identifier.builtin:
-                function_return_value = identifier.builtin.evaluate(application, function_environment, self, self.error)
+                function_return_value = self.evaluate_builtin(identifier.builtin, application, argument_values, environment)
             else:
+                function_environment: InterpreterEnvironment = copy_environment(identifier.environment)
+                for argument_value, parameter in zip(argument_values, identifier.parameters):
+                    function_environment.add(parameter[0], argument_value)
                 function_return_value = self.evaluate(identifier.body, function_environment, identifier.petl_type.return_type)
-            types_conform(application.token, function_return_value.petl_type, expected_type, self.error)
+            if not self.is_checked(application):
+                types_conform(application.token, function_return_value.petl_type, expected_type, self.error)
             self.stack_trace.pop()
 
         return function_return_value
@@ -199,62 +258,62 @@ class TreeWalkInterpreter(PetlPhase):
     def evaluate_string_application(self, application: Application, identifier: StringValue, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         if len(application.arguments) != 1:
             self.error(f"Argument count must be 1 for string access", application.token)
-            return NoneValue()
+            return none_value()
 
         argument_value: PetlValue = self.evaluate(application.arguments[0], environment, IntType())
         if isinstance(argument_value, IntValue):
             if argument_value.value < 0 or argument_value.value >= len(identifier.value):
                 self.error(f"Invalid argument value for string access", application.token)
-                return NoneValue()
-            element_value: PetlValue = CharValue(identifier.value[argument_value.value])
+                return none_value()
+            element_value: PetlValue = char_value(identifier.value[argument_value.value])
             if types_conform(application.token, element_value.petl_type, expected_type, self.error):
                 return element_value
-        return NoneValue()
+        return none_value()
 
     def evaluate_list_application(self, application: Application, identifier: ListValue, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         if len(application.arguments) != 1:
             self.error(f"Argument count must be 1 for list access", application.token)
-            return NoneValue()
+            return none_value()
 
         argument_value: PetlValue = self.evaluate(application.arguments[0], environment, IntType())
         if isinstance(argument_value, IntValue):
-            if argument_value.value < 0 or argument_value.value >= len(identifier.values):
+            if argument_value.value < 0 or argument_value.value >= identifier.length():
                 self.error(f"Invalid argument value for list access", application.token)
-                return NoneValue()
-            element_value: PetlValue = identifier.values[argument_value.value]
+                return none_value()
+            element_value: PetlValue = identifier.elements()[argument_value.value]
             if types_conform(application.token, element_value.petl_type, expected_type, self.error):
                 return element_value
-        return NoneValue()
+        return none_value()
 
     def evaluate_tuple_application(self, application: Application, identifier: TupleValue, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         if len(application.arguments) != 1:
             self.error(f"Argument count must be 1 for tuple access", application.token)
-            return NoneValue()
+            return none_value()
 
         argument_value: PetlValue = self.evaluate(application.arguments[0], environment, IntType())
         if isinstance(argument_value, IntValue):
             if argument_value.value < 0 or argument_value.value >= len(identifier.values):
                 self.error(f"Invalid argument value for tuple access", application.token)
-                return NoneValue()
+                return none_value()
             element_value: PetlValue = identifier.values[argument_value.value]
             if types_conform(application.token, element_value.petl_type, expected_type, self.error):
                 return element_value
-        return NoneValue()
+        return none_value()
 
     def evaluate_dict_application(self, application: Application, identifier: DictValue, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         if len(application.arguments) != 1:
             self.error(f"Argument count must be 1 for dictionary access", application.token)
-            return NoneValue()
+            return none_value()
 
         if isinstance(identifier.petl_type, DictType):
             argument_value: PetlValue = self.evaluate(application.arguments[0], environment, identifier.petl_type.key_type)
 
-            value: Optional[PetlValue] = next((v[1] for v in identifier.values if values_equal(v[0], argument_value)), None)
+            value: Optional[PetlValue] = identifier.lookup(argument_value)
             if value and types_conform(application.token, value.petl_type, expected_type, self.error):
                 return value
             else:
                 self.error(f"Key does not exist in dictionary", application.arguments[0].token)
-        return NoneValue()
+        return none_value()
 
     def evaluate_type_pattern(self, case: Case, match_value: PetlValue, environment: InterpreterEnvironment, expected_type: PetlType) -> Optional[PetlValue]:
         if isinstance(case.pattern, TypePattern):
@@ -263,7 +322,7 @@ class TreeWalkInterpreter(PetlPhase):
             if types_conform(token, match_value.petl_type, type_pattern.case_type, self.logger, no_error=True):
                 case_environment: InterpreterEnvironment = (environment)
                 case_environment.add(type_pattern.identifier, match_value)
-                predicate_value: PetlValue = BoolValue(True)
+                predicate_value: PetlValue = bool_value(True)
                 if type_pattern.predicate:
                     predicate_value: PetlValue = self.evaluate(type_pattern.predicate, case_environment, BoolType())
                 if isinstance(predicate_value, BoolValue) and predicate_value.value:
@@ -290,11 +349,9 @@ class TreeWalkInterpreter(PetlPhase):
         if isinstance(case.pattern, RangePattern):
             range_pattern: RangePattern = case.pattern
             if isinstance(range_pattern.range, RangeDefinition):
-                range_definition: PetlValue = self.evaluate_range_definition(range_pattern.range, ListType(IntType()))
-                if isinstance(range_definition, ListValue):
-                    list_values: List[PetlValue] = range_definition.values
-                    if any(map(lambda v: values_equal(v, match_value), list_values)):
-                        return self.evaluate(case.case_expression, environment, expected_type)
+                range_value: PetlValue = self.evaluate_range_definition(range_pattern.range, ListType(IntType()))
+                if isinstance(range_value, RangeValue) and range_value.find(match_value) >= 0:
+                    return self.evaluate(case.case_expression, environment, expected_type)
         return None
 
     def evaluate_match(self, match: Match, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
@@ -313,19 +370,19 @@ class TreeWalkInterpreter(PetlPhase):
                 case_value = self.evaluate(case.case_expression, environment, expected_type)
             else:
                 self.error(f"Invalid pattern found", case.case_expression.token)
-                return NoneValue()
+                return none_value()
 
             if case_value:
                 return case_value
 
         if not case_value:
             self.error(f"Reached end of pattern-match, add catch-all case", match.token)
-        return NoneValue()
+        return none_value()
 
     def evaluate_arithmetic_operator(self, left: PetlValue, right: PetlValue, operator: Operator, token) -> Optional[PetlValue]:
         if operator.operator_type == Operator.OperatorType.PLUS:
             if isinstance(left, IntValue) and isinstance(right, IntValue):
-                return IntValue(left.value + right.value)
+                return int_value(left.value + right.value)
             elif isinstance(left, CharValue) and isinstance(right, CharValue):
                 return StringValue(left.value + right.value)
             elif isinstance(left, StringValue) and isinstance(right, StringValue):
@@ -336,59 +393,55 @@ class TreeWalkInterpreter(PetlPhase):
                 return StringValue(left.value + right.value)
         elif operator.operator_type == Operator.OperatorType.MINUS:
             if isinstance(left, IntValue) and isinstance(right, IntValue):
-                return IntValue(left.value - right.value)
+                return int_value(left.value - right.value)
         elif operator.operator_type == Operator.OperatorType.MULTIPLY:
             if isinstance(left, IntValue) and isinstance(right, IntValue):
-                return IntValue(left.value * right.value)
+                return int_value(left.value * right.value)
         elif operator.operator_type == Operator.OperatorType.DIVIDE:
             if isinstance(left, IntValue) and isinstance(right, IntValue):
                 try:
-                    return IntValue(int(left.value / right.value))
+                    return int_value(int(left.value / right.value))
                 except ZeroDivisionError:
                     self.error(f"Division by zero", token)
                     return None
         elif operator.operator_type == Operator.OperatorType.MODULUS:
             if isinstance(left, IntValue) and isinstance(right, IntValue):
-                return IntValue(left.value % right.value)
+                return int_value(left.value % right.value)
         return None
 
     def evaluate_boolean_operator(self, left: PetlValue, right: PetlValue, operator: Operator) -> Optional[PetlValue]:
         if operator.operator_type == Operator.OperatorType.GREATER_THAN:
             if isinstance(left, IntValue) and isinstance(right, IntValue):
-                return BoolValue(left.value > right.value)
+                return bool_value(left.value > right.value)
         elif operator.operator_type == Operator.OperatorType.LESS_THAN:
             if isinstance(left, IntValue) and isinstance(right, IntValue):
-                return BoolValue(left.value < right.value)
+                return bool_value(left.value < right.value)
         elif operator.operator_type == Operator.OperatorType.GREATER_THAN_EQUAL_TO:
             if isinstance(left, IntValue) and isinstance(right, IntValue):
-                return BoolValue(left.value >= right.value)
+                return bool_value(left.value >= right.value)
         elif operator.operator_type == Operator.OperatorType.LESS_THAN_EQUAL_TO:
             if isinstance(left, IntValue) and isinstance(right, IntValue):
-                return BoolValue(left.value <= right.value)
+                return bool_value(left.value <= right.value)
         elif operator.operator_type == Operator.OperatorType.EQUAL:
-            return BoolValue(values_equal(left, right))
+            return bool_value(values_equal(left, right))
         elif operator.operator_type == Operator.OperatorType.NOT_EQUAL:
-            return BoolValue(not values_equal(left, right))
+            return bool_value(not values_equal(left, right))
         elif operator.operator_type == Operator.OperatorType.AND:
             if isinstance(left, BoolValue) and isinstance(right, BoolValue):
-                return BoolValue(left.value and right.value)
+                return bool_value(left.value and right.value)
         elif operator.operator_type == Operator.OperatorType.OR:
             if isinstance(left, BoolValue) and isinstance(right, BoolValue):
-                return BoolValue(left.value or right.value)
+                return bool_value(left.value or right.value)
         return None
 
     def evaluate_collection_operator(self, left: PetlValue, right: PetlValue, operator: Operator, token) -> Optional[PetlValue]:
         if types_conform(token, left.petl_type, right.petl_type, self.error):
             if operator.operator_type == Operator.OperatorType.COLLECTION_CONCAT:
                 if isinstance(left, ListValue) and isinstance(right, ListValue):
-                    return ListValue(left.petl_type, deepcopy(left.values) + deepcopy(right.values))
+                    return ListValue(left.petl_type, left.vector.concat(right.vector))
                 elif isinstance(left, TupleValue) and isinstance(right, TupleValue):
-                    left_values: List[PetlValue] = deepcopy(left.values)
-                    right_values: List[PetlValue] = deepcopy(right.values)
                     if isinstance(left.petl_type, TupleType) and isinstance(right.petl_type, TupleType):
-                        left_types: List[PetlType] = deepcopy(left.petl_type.tuple_types)
-                        right_types: List[PetlType] = deepcopy(right.petl_type.tuple_types)
-                        return TupleValue(TupleType(left_types + right_types), left_values + right_values)
+                        return TupleValue(TupleType(left.petl_type.tuple_types + right.petl_type.tuple_types), left.values + right.values)
                 elif isinstance(left, DictValue) and isinstance(right, DictValue):
                     pass
         return None
@@ -407,48 +460,66 @@ class TreeWalkInterpreter(PetlPhase):
 
         if not result_value:
             self.error(f"Invalid types for operator \'{operator.to_string()}\'", token)
-            return NoneValue()
+            return none_value()
         return result_value
 
     def evaluate_primitve(self, primitive: Primitive, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         left_value: PetlValue = self.evaluate(primitive.left, environment, AnyType())
         right_value: PetlValue = self.evaluate(primitive.right, environment, AnyType())
         result_value: PetlValue = self.evaluate_operator(primitive.token, left_value, right_value, primitive.operator)
-        if types_conform(primitive.token, result_value.petl_type, expected_type, self.error):
+        if self.is_checked(primitive) or types_conform(primitive.token, result_value.petl_type, expected_type, self.error):
             return result_value
-        return NoneValue()
+        return none_value()
 
     def evaluate_reference(self, reference: Reference, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         reference_value: PetlValue = environment.get(reference.identifier, reference.token, self.error)
-        if types_conform(reference.token, reference_value.petl_type, expected_type, self.error):
+        if self.is_checked(reference) or types_conform(reference.token, reference_value.petl_type, expected_type, self.error):
             return reference_value
         else:
-            return NoneValue()
+            return none_value()
 
     def evaluate_branch(self, branch: Branch, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         predicate_value: PetlValue = self.evaluate(branch.predicate, environment, BoolType())
         if isinstance(predicate_value, BoolValue):
             if predicate_value.value:
                 return self.evaluate(branch.if_branch, environment, expected_type)
+            elif branch.else_branch is None:
+                self.error(f"Invalid expression found", branch.token)
             else:
                 return self.evaluate(branch.else_branch, environment, expected_type)
-        return NoneValue()
+        return none_value()
 
-    def evaluate_for(self, for_expression: For, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+    def evaluate_for_loop(self, for_expression: For, environment: InterpreterEnvironment) -> bool:
         iterable: PetlValue = self.evaluate(for_expression.iterable, environment, UnknownType())
-        iterable_values: Optional[List[PetlValue]] = extract_iterable_values("for", iterable, for_expression.token, self.error)
-        if not iterable_values:
-            return NoneValue()
+        if not require_iterable("for", iterable, for_expression.token, self.error) or iterable.is_empty():
+            return False
 
-        for iterable_value in iterable_values:
-            for_body_environment: InterpreterEnvironment = deepcopy(environment)
+        for iterable_value in iterable.iterate():
+            for_body_environment: InterpreterEnvironment = copy_environment(environment)
             for_body_environment.add(for_expression.reference, iterable_value)
             self.evaluate(for_expression.body, for_body_environment, AnyType())
+        return True
+
+    def evaluate_for(self, for_expression: For, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+        if not self.evaluate_for_loop(for_expression, environment):
+            return none_value()
 
         if for_expression.after_for_expression:
             return self.evaluate(for_expression.after_for_expression, environment, expected_type)
         else:
-            return NoneValue()
+            return none_value()
+
+    def evaluate_block(self, block: Block, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+        for statement in block.statements:
+            if isinstance(statement, Alias):
+                environment.add_alias(statement.identifier, statement.alias_type)
+            elif isinstance(statement, For):
+                # An empty loop ends the block, like the loop did when it held the rest of the block
+                if not self.evaluate_for_loop(statement, environment):
+                    return none_value()
+            else:
+                self.evaluate(statement, environment, statement.petl_type)
+        return self.evaluate(block.result, environment, expected_type)
 
     def evaluate_list_definition(self, list_definition: ListDefinition, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         if isinstance(list_definition.petl_type, ListType):
@@ -463,7 +534,7 @@ class TreeWalkInterpreter(PetlPhase):
                                                 self.logger)
             if list_type:
                 return ListValue(list_type, list_values)
-        return NoneValue()
+        return none_value()
 
     def evaluate_range_definition(self, range_definition: RangeDefinition, expected_type: PetlType) -> PetlValue:
         if isinstance(range_definition.start, IntLiteral) and isinstance(range_definition.end, IntLiteral):
@@ -471,19 +542,9 @@ class TreeWalkInterpreter(PetlPhase):
             end_value: int = range_definition.end.value
             if start_value < 0 or end_value < 0:
                 self.error(f"Range bounds cannot be negative", range_definition.token)
-            elif types_conform(range_definition.token, ListType(IntType()), expected_type, self.error):
-                values: List[PetlValue] = []
-                if start_value == end_value:
-                    values.append(IntValue(start_value))
-                else:
-                    value_range: List[int] = []
-                    if start_value < end_value:
-                        value_range: List[int] = list(range(start_value, end_value + 1))
-                    elif start_value > end_value:
-                        value_range: List[int] = list(reversed(range(end_value, start_value + 1)))
-                    values = list(map(lambda l: IntValue(l), value_range))
-                return ListValue(ListType(IntType()), values)
-        return NoneValue()
+            elif self.is_checked(range_definition) or types_conform(range_definition.token, ListType(IntType()), expected_type, self.error):
+                return RangeValue(start_value, end_value)
+        return none_value()
 
     def evaluate_tuple_definition(self, tuple_definition: TupleDefinition, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         if isinstance(tuple_definition.petl_type, TupleType):
@@ -494,7 +555,7 @@ class TreeWalkInterpreter(PetlPhase):
                                                            expected_type, self.error)
             if tuple_type:
                 return TupleValue(tuple_definition.petl_type, tuple_values)
-        return NoneValue()
+        return none_value()
 
     def evaluate_dict_definition(self, dict_definition: DictDefinition, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
         def all_types_align(dict_values: List[Tuple[PetlValue, PetlValue]]) -> bool:
@@ -520,11 +581,11 @@ class TreeWalkInterpreter(PetlPhase):
                                                 self.logger)
             if dict_type:
                 return DictValue(dict_type, dict_values)
-        return NoneValue()
+        return none_value()
 
     def evaluate_schema_definition(self, schema_definition: SchemaDefinition, expected_type: PetlType) -> PetlValue:
-        if types_conform(schema_definition.token, schema_definition.petl_type, expected_type, self.error):
+        if self.is_checked(schema_definition) or types_conform(schema_definition.token, schema_definition.petl_type, expected_type, self.error):
             columns: List[Tuple[StringValue, PetlType]] = list(map(lambda column: (StringValue(column[0]), column[1]), schema_definition.mapping))
             column_types: List[PetlType] = list(map(lambda column: column[1], columns))
             return SchemaValue(SchemaType(column_types), columns)
-        return NoneValue()
+        return none_value()
@@ -1,3 +1,5 @@
+from typing import Dict
+
 from petllang.phases.interpreter.definitions.types import *
 from petllang.phases.parser.defintions.expression import *
 
@@ -146,3 +148,23 @@ def types_conform(token: Token, expression_type: PetlType, expected_type: PetlTy
         return None
     else:
         return conformed_type
+
+
+# Types without fields conform depending on their classes alone, so the result can be looked up instead of resolved
+FIELDLESS_TYPES: Tuple[type, ...] = (AnyType, UnknownType, LiteralType, IntType, BoolType, CharType, NoneType,
+                                     IterableType, StringType)
+fieldless_types_conform: Dict[Tuple[type, type], bool] = {}
+
+
+def conforms(token: Token, expression_type: PetlType, expected_type: PetlType, error, no_error=False) -> bool:
+    type_classes: Tuple[type, type] = (type(expression_type), type(expected_type))
+    conformed: Optional[bool] = fieldless_types_conform.get(type_classes)
+    if conformed is None:
+        if type_classes[0] not in FIELDLESS_TYPES or type_classes[1] not in FIELDLESS_TYPES:
+            return bool(types_conform(token, expression_type, expected_type, error, no_error))
+        conformed = _is_well_formed(_types_conform(token, expression_type, expected_type))
+        fieldless_types_conform[type_classes] = conformed
+    if not conformed:
+        # Reports the mismatch exactly like the tree walker
+        return bool(types_conform(token, expression_type, expected_type, error, no_error))
+    return True
@@ -0,0 +1,357 @@
+from typing import Dict
+
+from petllang.builtins.builtin_definitions import require_iterable
+from petllang.phases.compiler.bytecode import *
+from petllang.phases.compiler.compiler import compile_code_unit
+from petllang.phases.interpreter.definitions.types import INT_TYPE
+from petllang.phases.interpreter.definitions.value import *
+from petllang.phases.interpreter.environment import InterpreterEnvironment, copy_environment, capture_environment
+from petllang.phases.interpreter.free_identifiers import free_identifiers
+from petllang.phases.interpreter.interpreter import TreeWalkInterpreter, MAXIMUM_DEPTH
+from petllang.phases.interpreter.type_resolution import types_conform, conforms
+from petllang.phases.parser.defintions.expression import *
+
+
+def argument_expected_type(applied_value: PetlValue, index: int) -> PetlType:
+    if isinstance(applied_value, FuncValue):
+        return applied_value.parameters[index][1]
+    elif isinstance(applied_value, DictValue):
+        return applied_value.petl_type.key_type
+    return INT_TYPE
+
+
+# Runs bytecode from the compiler phase. Calls to lambdas push a frame instead of recursing in Python, builtins are
+# called like the tree walker does and re-enter the VM through evaluate. Every frame knows the expression depth it
+# started at, so the depth checks only run in frames that could exceed the maximum. Tail calls replace the running
+# frame, so tail recursion runs at a constant depth.
+class VirtualMachine(TreeWalkInterpreter):
+    def __init__(self, debug=False, trusted=False, maximum_depth=MAXIMUM_DEPTH):
+        TreeWalkInterpreter.__init__(self, debug, trusted, maximum_depth)
+        # Every expression compiled by this interpreter and its code unit, by id. The expressions are kept alive so their
+        # ids are not reused
+        self.compiled_expressions: Dict[int, Tuple[Expression, CodeUnit]] = {}
+
+    def evaluate(self, expression: Expression, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+        return self.execute(expression, environment, expected_type)
+
+    def load_code_unit(self, expression: Expression) -> CodeUnit:
+        code_unit: Optional[Tuple[Expression, CodeUnit]] = self.compiled_expressions.get(id(expression))
+        if code_unit is None:
+            code_unit = (expression, compile_code_unit(expression, self))
+            self.compiled_expressions[id(expression)] = code_unit
+        return code_unit[1]
+
+    def type_body(self, body: Expression, return_type: PetlType) -> Expression:
+        typed_body: Expression = TreeWalkInterpreter.type_body(self, body, return_type)
+        self.load_code_unit(typed_body)
+        return typed_body
+
+    def define_lambda(self, lambda_expression: Lambda, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+        lambda_type = types_conform(lambda_expression.token, lambda_expression.petl_type, expected_type, self.error)
+        if lambda_type and isinstance(lambda_type, FuncType):
+            lambda_return_type = lambda_type.return_type
+            body: Expression = lambda_expression.body
+            if lambda_return_type and types_conform(body.token, lambda_return_type, body.petl_type, self.error):
+                parameters: List[Tuple[str, PetlType]] = list(map(lambda p: (p.identifier, p.parameter_type), lambda_expression.parameters))
+                return FuncValue(lambda_expression.petl_type, None, parameters, self.get_typed_body(lambda_expression, lambda_return_type),
+                                 capture_environment(environment, free_identifiers(lambda_expression)))
+        return none_value()
+
+    def make_list(self, list_values: List[PetlValue], expected_type: PetlType, token: Token) -> PetlValue:
+        if list_values and all(map(lambda v: conforms(token, v.petl_type, list_values[0].petl_type, self.error), list_values)):
+            element_type: PetlType = list_values[0].petl_type
+        else:
+            element_type = UnknownType()
+        list_type: PetlType = types_conform(token, ListType(element_type), expected_type, self.logger)
+        if list_type:
+            return ListValue(list_type, list_values)
+        return none_value()
+
+    def make_dict(self, dict_values: List[Tuple[PetlValue, PetlValue]], expected_type: PetlType, token: Token) -> PetlValue:
+        if dict_values and \
+                all(map(lambda v: types_conform(token, v[0].petl_type, dict_values[0][0].petl_type, self.logger), dict_values)) and \
+                all(map(lambda v: types_conform(token, v[1].petl_type, dict_values[0][1].petl_type, self.logger), dict_values)):
+            dict_type: PetlType = DictType(dict_values[0][0].petl_type, dict_values[0][1].petl_type)
+        else:
+            dict_type = DictType(UnknownType(), UnknownType())
+        conformed_type: PetlType = types_conform(token, dict_type, expected_type, self.logger)
+        if conformed_type:
+            return DictValue(conformed_type, dict_values)
+        return none_value()
+
+    def make_range(self, range_definition: RangeDefinition, expected_type: PetlType) -> PetlValue:
+        if range_definition.start.value < 0 or range_definition.end.value < 0:
+            self.error(f"Range bounds cannot be negative", range_definition.token)
+        elif self.is_checked(range_definition) or types_conform(range_definition.token, ListType(IntType()), expected_type, self.error):
+            return RangeValue(range_definition.start.value, range_definition.end.value)
+        return none_value()
+
+    def match_literals(self, match_value: PetlValue, pattern_values: Optional[List[PetlValue]], literals: List[Literal], token_str: str) -> bool:
+        if pattern_values is None:
+            pattern_values = map(lambda l: self.literal_to_value(token_str, l), literals)
+        return any(map(lambda v: values_equal(match_value, v), pattern_values))
+
+    def prepare_application(self, applied_value: PetlValue, argument_count: int, token: Token) -> bool:
+        # Returns False when the application evaluates to none without evaluating its arguments
+        if isinstance(applied_value, FuncValue):
+            if argument_count != len(applied_value.parameters):
+                func_types_str: str = ", ".join(map(lambda p: p[1].to_string(), applied_value.parameters))
+                self.error(f"Invalid argument count for function, requires: {func_types_str}", token)
+            return isinstance(applied_value.petl_type, FuncType)
+        elif isinstance(applied_value, StringValue) or isinstance(applied_value, ListValue) or isinstance(applied_value, TupleValue):
+            if argument_count != 1:
+                self.error(f"Argument count must be 1 for {self.access_name(applied_value)} access", token)
+            return True
+        elif isinstance(applied_value, DictValue):
+            if argument_count != 1:
+                self.error(f"Argument count must be 1 for dictionary access", token)
+            return isinstance(applied_value.petl_type, DictType)
+        self.error(f"Invalid type for application: {applied_value.petl_type.to_string()}", token)
+        return False
+
+    def access_name(self, applied_value: PetlValue) -> str:
+        if isinstance(applied_value, StringValue):
+            return "string"
+        elif isinstance(applied_value, ListValue):
+            return "list"
+        return "tuple"
+
+    def access(self, applied_value: PetlValue, argument_value: PetlValue, expected_type: PetlType, application: Application) -> PetlValue:
+        token: Token = application.token
+        if isinstance(applied_value, DictValue):
+            value: Optional[PetlValue] = applied_value.lookup(argument_value)
+            if value and types_conform(token, value.petl_type, expected_type, self.error):
+                return value
+            self.error(f"Key does not exist in dictionary", application.arguments[0].token)
+        elif isinstance(argument_value, IntValue):
+            elements = applied_value.value if isinstance(applied_value, StringValue) else applied_value.elements() if isinstance(applied_value, ListValue) else applied_value.values
+            if argument_value.value < 0 or argument_value.value >= len(elements):
+                self.error(f"Invalid argument value for {self.access_name(applied_value)} access", token)
+            element_value: PetlValue = char_value(elements[argument_value.value]) if isinstance(applied_value, StringValue) else elements[argument_value.value]
+            if conforms(token, element_value.petl_type, expected_type, self.error):
+                return element_value
+        return none_value()
+
+    def execute(self, expression: Expression, environment: InterpreterEnvironment, expected_type: PetlType) -> PetlValue:
+        entry_depth: int = self.descent_counter
+        stack_trace: List[FilePosition] = self.stack_trace
+        error = self.error
+        trusted: bool = self.trusted
+        maximum_depth: int = self.maximum_depth
+
+        # State of the running frame, callers are saved on frames while a lambda runs
+        frames: List[Tuple[Any, ...]] = []
+        base_depth: int = entry_depth
+        code_unit: CodeUnit = self.load_code_unit(expression)
+        instructions: List[Instruction] = code_unit.checked_instructions if base_depth + code_unit.max_depth > maximum_depth else code_unit.instructions
+        registers: List[Any] = [None] * code_unit.register_count
+        frame_expected: PetlType = expected_type
+        pc: int = 0
+        # Return type checks of the frames replaced by tail calls, once for each call site and type, and the number of
+        # positions their calls added to the stack trace
+        tail_checks: Optional[Dict[Tuple[int, int], Tuple[Token, PetlType]]] = None
+        tail_positions: int = 0
+
+        while True:
+            instruction: Instruction = instructions[pc]
+            pc += 1
+            opcode: int = instruction[0]
+
+            if opcode == LOAD:
+                value: PetlValue = environment.map.get(instruction[2])
+                if value is None:
+                    value = environment.get(instruction[2], instruction[4], error)
+                expected = instruction[3]
+                if expected.__class__ is tuple:
+                    expected = argument_expected_type(registers[expected[0]], expected[1]) if expected else frame_expected
+                if not (instruction[5] and trusted):
+                    conforms(instruction[4], value.petl_type, expected, error)
+                registers[instruction[1]] = value
+            elif opcode == LITERAL:
+                expected = instruction[5]
+                if expected.__class__ is tuple:
+                    expected = argument_expected_type(registers[expected[0]], expected[1]) if expected else frame_expected
+                if not (instruction[7] and trusted) and not conforms(instruction[6], instruction[4], expected, error) or instruction[2] is None:
+                    error(f"Invalid expression found", instruction[6])
+                registers[instruction[1]] = instruction[2](instruction[3])
+            elif opcode == BINARY:
+                value = instruction[2](registers[instruction[3]], registers[instruction[4]])
+                if not value:
+                    error(f"Invalid types for operator \'{instruction[7]}\'", instruction[6])
+                expected = instruction[5]
+                if expected.__class__ is tuple:
+                    expected = argument_expected_type(registers[expected[0]], expected[1]) if expected else frame_expected
+                if not (instruction[8] and trusted):
+                    conforms(instruction[6], value.petl_type, expected, error)
+                registers[instruction[1]] = value
+            elif opcode == BRANCH:
+                predicate_value: PetlValue = registers[instruction[1]]
+                if isinstance(predicate_value, BoolValue):
+                    if not predicate_value.value:
+                        pc = instruction[2]
+                else:
+                    registers[instruction[4]] = none_value()
+                    pc = instruction[3]
+            elif opcode == JUMP:
+                pc = instruction[1]
+            elif opcode == BIND:
+                value = registers[instruction[1]]
+                identifiers: List[str] = instruction[2]
+                if len(identifiers) > 1:
+                    if not isinstance(value, TupleValue):
+                        error(f"Cannot unpack, requires tuple value", instruction[3])
+                    for identifier, unpacked_value in zip(identifiers, value.values):
+                        environment.map[identifier] = unpacked_value
+                else:
+                    environment.map[identifiers[0]] = value
+            elif opcode == APPLY_PREPARE:
+                if not self.prepare_application(registers[instruction[1]], instruction[2], instruction[3]):
+                    registers[instruction[5]] = none_value()
+                    pc = instruction[4]
+            elif opcode == APPLY:
+                applied_value: PetlValue = registers[instruction[2]]
+                expected = instruction[5]
+                if expected.__class__ is tuple:
+                    expected = argument_expected_type(registers[expected[0]], expected[1]) if expected else frame_expected
+                application: Application = instruction[6]
+                if isinstance(applied_value, FuncValue):
+                    builtin = applied_value.builtin
+                    first_argument: int = instruction[3]
+                    if builtin:
+                        # Builtins evaluating expressions continue from the application's depth
+                        stack_trace.append(application.token.file_position)
+                        self.descent_counter = base_depth + instruction[7]
+                        argument_values: List[PetlValue] = registers[first_argument:first_argument + len(applied_value.parameters)]
+                        value = self.evaluate_builtin(builtin, application, argument_values, environment)
+                        if not (trusted and application.checked_type is not None):
+                            conforms(application.token, value.petl_type, expected, error)
+                        stack_trace.pop()
+                        registers[instruction[1]] = value
+                        continue
+                    function_environment: InterpreterEnvironment = copy_environment(applied_value.environment)
+                    for index, parameter in enumerate(applied_value.parameters):
+                        function_environment.map[parameter[0]] = registers[first_argument + index]
+                    if instruction[8]:
+                        # Tail calls from the same position as the call on top of the stack trace are not added again
+                        if not stack_trace or stack_trace[-1] is not application.token.file_position:
+                            stack_trace.append(application.token.file_position)
+                            tail_positions += 1
+                        if tail_checks is None:
+                            tail_checks = {}
+                        tail_checks.setdefault((id(application.token), id(expected)), (application.token, expected))
+                    else:
+                        stack_trace.append(application.token.file_position)
+                        frames.append((instructions, registers, environment, pc, frame_expected, base_depth, instruction[1], expected, application.token,
+                                       tail_checks, tail_positions))
+                        base_depth += instruction[7]
+                        tail_checks = None
+                        tail_positions = 0
+                    code_unit = self.load_code_unit(applied_value.body)
+                    instructions = code_unit.checked_instructions if base_depth + code_unit.max_depth > maximum_depth else code_unit.instructions
+                    registers = [None] * code_unit.register_count
+                    environment = function_environment
+                    frame_expected = applied_value.petl_type.return_type
+                    pc = 0
+                else:
+                    registers[instruction[1]] = self.access(applied_value, registers[instruction[3]], expected, application)
+            elif opcode == RETURN:
+                value = registers[instruction[1]]
+                if tail_checks:
+                    for token, expected in reversed(list(tail_checks.values())):
+                        conforms(token, value.petl_type, expected, error)
+                if tail_positions:
+                    del stack_trace[-tail_positions:]
+                if not frames:
+                    self.descent_counter = entry_depth
+                    return value
+                instructions, registers, environment, pc, frame_expected, base_depth, dst, expected, token, tail_checks, tail_positions = frames.pop()
+                conforms(token, value.petl_type, expected, error)
+                stack_trace.pop()
+                registers[dst] = value
+            elif opcode == NONE:
+                registers[instruction[1]] = none_value()
+            elif opcode == LAMBDA:
+                expected = instruction[3]
+                if expected.__class__ is tuple:
+                    expected = argument_expected_type(registers[expected[0]], expected[1]) if expected else frame_expected
+                registers[instruction[1]] = self.define_lambda(instruction[2], environment, expected)
+            elif opcode == FOR_PREPARE:
+                iterable: PetlValue = registers[instruction[1]]
+                if not require_iterable("for", iterable, instruction[4], error) or iterable.is_empty():
+                    registers[instruction[6]] = none_value()
+                    pc = instruction[5]
+                else:
+                    registers[instruction[2]] = iterable.iterate()
+                    registers[instruction[3]] = environment
+            elif opcode == FOR_NEXT:
+                iterable_value: Optional[PetlValue] = next(registers[instruction[1]], None)
+                if iterable_value is not None:
+                    environment = copy_environment(registers[instruction[2]])
+                    environment.map[instruction[3]] = iterable_value
+                else:
+                    environment = registers[instruction[2]]
+                    pc = instruction[4]
+            elif opcode == DEPTH:
+                if base_depth + instruction[1] > maximum_depth:
+                    self.descent_counter = base_depth + instruction[1]
+                    error(f"Maximum expression depth exceeded, possible infinite recursion", instruction[2])
+            elif opcode == MATCH_TYPE:
+                value = registers[instruction[1]]
+                if conforms(instruction[4], value.petl_type, instruction[2], self.logger, no_error=True):
+                    environment.add(instruction[3], value)
+                else:
+                    pc = instruction[5]
+            elif opcode == JUMP_UNLESS_TRUE:
+                predicate_value = registers[instruction[1]]
+                if not isinstance(predicate_value, BoolValue) or not predicate_value.value:
+                    pc = instruction[2]
+            elif opcode == MATCH_LITERALS:
+                if not self.match_literals(registers[instruction[1]], instruction[2], instruction[3], instruction[4]):
+                    pc = instruction[5]
+            elif opcode == MATCH_RANGE:
+                value = registers[instruction[1]]
+                bounds: Optional[Tuple[int, int]] = instruction[2]
+                if bounds is None:
+                    # Reports invalid bounds when the case is reached, like the tree walker
+                    if isinstance(instruction[3], RangeDefinition):
+                        self.evaluate_range_definition(instruction[3], ListType(IntType()))
+                    pc = instruction[4]
+                elif not isinstance(value, IntValue) or not bounds[0] <= value.value <= bounds[1]:
+                    pc = instruction[4]
+            elif opcode == MAKE_LIST:
+                expected = instruction[4]
+                if expected.__class__ is tuple:
+                    expected = argument_expected_type(registers[expected[0]], expected[1]) if expected else frame_expected
+                registers[instruction[1]] = self.make_list(registers[instruction[2]:instruction[2] + instruction[3]], expected, instruction[5])
+            elif opcode == MAKE_TUPLE:
+                expected = instruction[5]
+                if expected.__class__ is tuple:
+                    expected = argument_expected_type(registers[expected[0]], expected[1]) if expected else frame_expected
+                tuple_values: List[PetlValue] = registers[instruction[2]:instruction[2] + instruction[3]]
+                value = none_value()
+                if types_conform(instruction[6], TupleType(list(map(lambda tv: tv.petl_type, tuple_values))), expected, error):
+                    value = TupleValue(instruction[4], tuple_values)
+                registers[instruction[1]] = value
+            elif opcode == MAKE_DICT:
+                expected = instruction[5]
+                if expected.__class__ is tuple:
+                    expected = argument_expected_type(registers[expected[0]], expected[1]) if expected else frame_expected
+                dict_values: List[Tuple[PetlValue, PetlValue]] = list(zip(registers[instruction[2]:instruction[2] + instruction[4]],
+                                                                          registers[instruction[3]:instruction[3] + instruction[4]]))
+                registers[instruction[1]] = self.make_dict(dict_values, expected, instruction[6])
+            elif opcode == RANGE:
+                expected = instruction[3]
+                if expected.__class__ is tuple:
+                    expected = argument_expected_type(registers[expected[0]], expected[1]) if expected else frame_expected
+                registers[instruction[1]] = self.make_range(instruction[2], expected)
+            elif opcode == SCHEMA:
+                expected = instruction[3]
+                if expected.__class__ is tuple:
+                    expected = argument_expected_type(registers[expected[0]], expected[1]) if expected else frame_expected
+                registers[instruction[1]] = self.evaluate_schema_definition(instruction[2], expected)
+            elif opcode == ALIAS:
+                environment.add_alias(instruction[1], instruction[2])
+            elif opcode == ERROR:
+                error(instruction[1], instruction[2])
+            else:
+                error(f"Invalid expression found", instruction[1].token)
@@ -82,6 +82,7 @@ class Keyword(str, PetlBaseEnum):
     CREATETABLE = "createTable",
     COLUMN = "column",
     READCSV = "readCsv",
+    SCANCSV = "scanCsv",
     WRITECSV = "writeCsv",
     JOIN = "join",
     WITH = "with",
@@ -137,6 +138,7 @@ class Keyword(str, PetlBaseEnum):
                self == self.CREATETABLE or \
                self == self.COLUMN or \
                self == self.READCSV or \
+               self == self.SCANCSV or \
                self == self.WRITECSV or \
                self == self.JOIN or \
                self == self.WITH or \
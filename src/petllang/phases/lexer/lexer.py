@@ -1,5 +1,4 @@
 import functools
-from copy import deepcopy
 from typing import List, Optional
 
 from petllang.phases.lexer.definitions.delimiter import Delimiter
@@ -12,6 +11,7 @@ from petllang.utils.file_position import FilePosition
 
 class Lexer(PetlPhase):
     raw_text: str = ""
+    lines: List[str] = []
     tokens: List[Token] = []
     token_text: str = ""
     file_position = FilePosition()
@@ -24,6 +24,7 @@ class Lexer(PetlPhase):
     def __init__(self, debug=False):
         self.logger.__init__(debug)
         self.raw_text = ""
+        self.lines = []
         self.tokens = []
         self.file_position = FilePosition()
 
@@ -32,12 +33,10 @@ class Lexer(PetlPhase):
         self.skip = False
 
     def get_line_text(self, line_number: int) -> str:
-        lines = self.raw_text.split('\n')
-        return lines[line_number] if line_number < len(lines) else ""
+        return self.lines[line_number] if line_number < len(self.lines) else ""
 
     def create_file_position(self, extra=False, delim=False) -> FilePosition:
-        file_position: FilePosition = deepcopy(self.file_position)
-        file_position.line_text = self.get_line_text(file_position.line)
+        file_position: FilePosition = FilePosition(self.file_position.line, self.file_position.column, self.get_line_text(self.file_position.line))
         column: int = file_position.column - ((1 if extra else 0) + (1 if delim else len(self.token_text)))
         file_position.column = 0 if column < 0 else column
         return file_position
@@ -135,6 +134,8 @@ class Lexer(PetlPhase):
     def scan(self, raw_text: str) -> Optional[List[Token]]:
         try:
             self.raw_text = raw_text
+            # Split once, every token looks up the text of its line
+            self.lines = raw_text.split('\n')
             for index in range(0, len(self.raw_text)):
                 character = raw_text[index]
                 self.update_file_position(character)
@@ -153,13 +154,14 @@ class Lexer(PetlPhase):
             if not self.tokens:
                 raise Exception("Invalid program, unable to parse")
 
-            self.logger.debug_block(
-                "TOKENS",
-                functools.reduce(
-                    lambda a, b: a + b,
-                    [f"{i}\n{token.to_string()}\n\n" for i, token in enumerate(self.tokens)]
+            if self.logger.get_debug_enabled():
+                self.logger.debug_block(
+                    "TOKENS",
+                    functools.reduce(
+                        lambda a, b: a + b,
+                        [f"{i}\n{token.to_string()}\n\n" for i, token in enumerate(self.tokens)]
+                    )
                 )
-            )
             tokens = self.tokens
         except Exception as scan_exception:
             self.logger.error(f"Unhandled error occurred: {scan_exception}")
@@ -0,0 +1,219 @@
+from petllang.phases.interpreter.closure_interpreter import OPERATOR_FUNCTIONS
+from petllang.phases.interpreter.definitions.value import *
+from petllang.phases.lexer.definitions.keyword_petl import Keyword
+from petllang.phases.parser.defintions.expression import *
+from petllang.phases.phase import PetlPhase
+
+
+def literal_value(literal: Literal) -> Optional[PetlValue]:
+    # The value a literal evaluates to, None for literals that only fail when they are interpreted
+    if isinstance(literal, IntLiteral):
+        return int_value(literal.value) if type(literal.value) is int else None
+    elif isinstance(literal, BoolLiteral):
+        return bool_value(literal.value)
+    elif isinstance(literal, CharLiteral):
+        return char_value(literal.value)
+    elif isinstance(literal, StringLiteral):
+        return StringValue(literal.value)
+    elif isinstance(literal, NoneLiteral):
+        return none_value()
+    return None
+
+
+def value_literal(value: PetlValue) -> Optional[Literal]:
+    if isinstance(value, IntValue):
+        return IntLiteral(value.value)
+    elif isinstance(value, BoolValue):
+        return BoolLiteral(value.value)
+    elif isinstance(value, StringValue):
+        return StringLiteral(value.value)
+    return None
+
+
+def fold_operator(operator: Operator, left: PetlValue, right: PetlValue) -> Optional[PetlValue]:
+    # Operations that would report an error are left to the interpreter, which reports them at their position
+    try:
+        if operator.operator_type == Operator.OperatorType.DIVIDE:
+            if isinstance(left, IntValue) and isinstance(right, IntValue) and right.value != 0:
+                return int_value(int(left.value / right.value))
+            return None
+        operator_function = OPERATOR_FUNCTIONS.get(operator.operator_type)
+        return operator_function(left, right) if operator_function else None
+    except ArithmeticError as _:
+        return None
+
+
+def cannot_fail(expression: Optional[Expression]) -> bool:
+    # Expressions made of checked literals, references and operators that report no error and have no effect when
+    # evaluated, given their references are bound to values of the types they were checked with
+    if isinstance(expression, LitExpression):
+        return expression.checked_type is not None and literal_value(expression.literal) is not None
+    elif isinstance(expression, Reference):
+        return expression.checked_type is not None
+    elif isinstance(expression, Primitive):
+        if expression.operator.operator_type in (Operator.OperatorType.DIVIDE, Operator.OperatorType.MODULUS):
+            divisor: Optional[PetlValue] = literal_value(expression.right.literal) if isinstance(expression.right, LitExpression) else None
+            if not isinstance(divisor, IntValue) or divisor.value == 0:
+                return False
+        return expression.checked_type is not None and cannot_fail(expression.left) and cannot_fail(expression.right)
+    elif isinstance(expression, Branch):
+        return cannot_fail(expression.predicate) and cannot_fail(expression.if_branch) and cannot_fail(expression.else_branch)
+    elif isinstance(expression, Let):
+        return len(expression.identifiers) == 1 and cannot_fail(expression.let_expression) and \
+            (expression.after_let_expression is None or cannot_fail(expression.after_let_expression))
+    elif isinstance(expression, Block):
+        return all(map(cannot_fail, expression.statements)) and cannot_fail(expression.result)
+    return False
+
+
+def applied_builtin(application: Application) -> Optional[Keyword]:
+    identifier: Expression = application.identifier
+    return identifier.identifier if isinstance(identifier, Reference) and isinstance(identifier.identifier, Keyword) else None
+
+
+def is_fusible_stage(expression: Expression) -> bool:
+    # Stages that make the same elements whichever order they are called in: zip, and map and filter with a lambda
+    # that cannot fail, so the elements they pass on are only made when the next stage reads them
+    if not isinstance(expression, Application) or len(expression.arguments) != 2:
+        return False
+    builtin: Optional[Keyword] = applied_builtin(expression)
+    function: Expression = expression.arguments[1]
+    return builtin == Keyword.ZIP or (builtin in (Keyword.MAP, Keyword.FILTER) and isinstance(function, Lambda) and
+                                      len(function.parameters) == 1 and cannot_fail(function.body))
+
+
+# Rewrites the parsed tree before it is interpreted: primitives on literals are folded into literals, branches with a
+# literal predicate and matches on a literal are replaced by the expression they always take. Pipelines of map, filter
+# and zip are fused, so only their last stage makes a list. Only rewrites that give the same output are made, folded
+# expressions keep the token of the expression they replace so errors reported by the rest of the tree point at the
+# same position.
+class Optimizer(PetlPhase):
+    def __init__(self, debug=False):
+        self.logger.__init__(debug)
+
+    def optimize(self, root: Expression) -> Expression:
+        try:
+            root = self.optimize_expression(root)
+        except RecursionError as _:
+            # Every rewrite is made in place once complete, the rest of the tree is interpreted as parsed
+            self.logger.debug("Expression tree too deep to optimize, remaining expressions are interpreted as parsed")
+        if self.logger.get_debug_enabled():
+            self.logger.debug_block("OPTIMIZED EXPRESSION", root.to_string())
+        return root
+
+    def optimize_typed(self, expression: Expression, return_type: Optional[PetlType] = None) -> Expression:
+        # Block statements and lambda bodies are evaluated against their own type, so they are only replaced by an
+        # expression of the same type. A literal checks its value against its own type, it can also replace an
+        # expression without one but only when it has the return type of the lambda it is the body of.
+        optimized: Expression = self.optimize_expression(expression)
+        if isinstance(optimized, LitExpression) and optimized is not expression:
+            if return_type is not None and optimized.petl_type != return_type:
+                return expression
+            return optimized if isinstance(expression.petl_type, UnknownType) or optimized.petl_type == expression.petl_type else expression
+        return optimized if optimized.petl_type == expression.petl_type else expression
+
+    def optimize_expression(self, expression: Optional[Expression]) -> Optional[Expression]:
+        if isinstance(expression, Primitive):
+            return self.optimize_primitive(expression)
+        elif isinstance(expression, Branch):
+            return self.optimize_branch(expression)
+        elif isinstance(expression, Match):
+            return self.optimize_match(expression)
+        elif isinstance(expression, Let):
+            expression.let_expression = self.optimize_expression(expression.let_expression)
+            expression.after_let_expression = self.optimize_expression(expression.after_let_expression)
+        elif isinstance(expression, Alias):
+            expression.after_alias_expression = self.optimize_expression(expression.after_alias_expression)
+        elif isinstance(expression, Lambda):
+            expression.body = self.optimize_typed(expression.body, expression.return_type)
+        elif isinstance(expression, Application):
+            expression.identifier = self.optimize_expression(expression.identifier)
+            expression.arguments = list(map(self.optimize_expression, expression.arguments))
+            self.fuse_stages(expression)
+        elif isinstance(expression, For):
+            expression.iterable = self.optimize_expression(expression.iterable)
+            expression.body = self.optimize_expression(expression.body)
+            expression.after_for_expression = self.optimize_expression(expression.after_for_expression)
+        elif isinstance(expression, Block):
+            expression.statements = list(map(self.optimize_typed, expression.statements))
+            expression.result = self.optimize_expression(expression.result)
+        elif isinstance(expression, ListDefinition) or isinstance(expression, TupleDefinition):
+            expression.values = list(map(self.optimize_expression, expression.values))
+        elif isinstance(expression, DictDefinition):
+            expression.mapping = list(map(lambda m: (self.optimize_expression(m[0]), self.optimize_expression(m[1])), expression.mapping))
+        return expression
+
+    def fuse_stages(self, application: Application):
+        # Stages passed to map, filter or zip only have their elements read by it. Only the last stage of a pipeline
+        # can fail or have an effect, so its errors and output come in the same order as when every stage makes a list.
+        builtin: Optional[Keyword] = applied_builtin(application)
+        if builtin in (Keyword.MAP, Keyword.FILTER, Keyword.ZIP) and len(application.arguments) == 2:
+            iterable_arguments: List[Expression] = application.arguments if builtin == Keyword.ZIP else application.arguments[:1]
+            for argument in iterable_arguments:
+                if is_fusible_stage(argument):
+                    argument.fused = True
+
+    def optimize_primitive(self, primitive: Primitive) -> Expression:
+        primitive.left = self.optimize_expression(primitive.left)
+        primitive.right = self.optimize_expression(primitive.right)
+        if isinstance(primitive.left, LitExpression) and isinstance(primitive.right, LitExpression):
+            left: Optional[PetlValue] = literal_value(primitive.left.literal)
+            right: Optional[PetlValue] = literal_value(primitive.right.literal)
+            folded_value: Optional[PetlValue] = fold_operator(primitive.operator, left, right) if left is not None and right is not None else None
+            folded_literal: Optional[Literal] = value_literal(folded_value) if folded_value is not None else None
+            if folded_literal is not None:
+                literal_expression: LitExpression = LitExpression(folded_value.petl_type, primitive.token, folded_literal)
+                literal_expression.checked_type = primitive.checked_type
+                return literal_expression
+        return primitive
+
+    def optimize_branch(self, branch: Branch) -> Expression:
+        branch.predicate = self.optimize_expression(branch.predicate)
+        branch.if_branch = self.optimize_expression(branch.if_branch)
+        branch.else_branch = self.optimize_expression(branch.else_branch)
+        if isinstance(branch.predicate, LitExpression) and isinstance(branch.predicate.literal, BoolLiteral):
+            taken_branch: Optional[Expression] = branch.if_branch if branch.predicate.literal.value else branch.else_branch
+            if taken_branch is not None:
+                return taken_branch
+        return branch
+
+    def optimize_match(self, match: Match) -> Expression:
+        match.match_expression = self.optimize_expression(match.match_expression)
+        for case in match.cases:
+            if isinstance(case.pattern, TypePattern) and case.pattern.predicate:
+                case.pattern.predicate = self.optimize_expression(case.pattern.predicate)
+            case.case_expression = self.optimize_expression(case.case_expression)
+        if isinstance(match.match_expression, LitExpression):
+            match_value: Optional[PetlValue] = literal_value(match.match_expression.literal)
+            taken_case: Optional[Case] = self.find_taken_case(match, match_value) if match_value is not None else None
+            if taken_case is not None:
+                return taken_case.case_expression
+        return match
+
+    def find_taken_case(self, match: Match, match_value: PetlValue) -> Optional[Case]:
+        # Cases are tried in order, a case that can only be decided while interpreting ends the search
+        for case in match.cases:
+            if isinstance(case.pattern, LiteralPattern):
+                pattern_literals: List[Literal] = [case.pattern.literal]
+            elif isinstance(case.pattern, MultiLiteralPattern):
+                pattern_literals = case.pattern.literals
+            elif isinstance(case.pattern, RangePattern) and isinstance(case.pattern.range, RangeDefinition):
+                start: Literal = case.pattern.range.start
+                end: Literal = case.pattern.range.end
+                if not (isinstance(start, IntLiteral) and isinstance(end, IntLiteral) and type(start.value) is int and
+                        type(end.value) is int and start.value >= 0 and end.value >= 0):
+                    return None
+                if isinstance(match_value, IntValue) and min(start.value, end.value) <= match_value.value <= max(start.value, end.value):
+                    return case
+                continue
+            elif isinstance(case.pattern, AnyPattern):
+                return case
+            else:
+                return None
+
+            pattern_values: List[Optional[PetlValue]] = list(map(literal_value, pattern_literals))
+            if any(map(lambda v: v is None, pattern_values)):
+                return None
+            if any(map(lambda v: values_equal(match_value, v), pattern_values)):
+                return case
+        return None
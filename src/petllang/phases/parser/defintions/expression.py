@@ -1,7 +1,7 @@
 from abc import ABC
 from dataclasses import dataclass, field
 from pprint import pformat
-from typing import Union, List, Optional, Tuple
+from typing import Union, List, Optional, Tuple, FrozenSet
 
 from petllang.phases.interpreter.definitions.types import PetlType, UnknownType
 from petllang.phases.lexer.definitions.token_petl import Token
@@ -12,6 +12,8 @@ from petllang.phases.parser.defintions.operator import Operator
 class Expression(ABC):
     petl_type: PetlType = field(default_factory=UnknownType)
     token: Token = field(default_factory=Token)
+    # Type of the evaluated value, set by the type checker when the check against the expected type always passes
+    checked_type: Optional[PetlType] = field(default=None, init=False, compare=False, repr=False)
 
     def to_string(self):
         return pformat(self)
@@ -142,12 +144,17 @@ class Lambda(Expression):
     parameters: List[Parameter] = field(default_factory=list)
     return_type: PetlType = field(default_factory=UnknownType)
     body: Expression = field(default_factory=UnknownExpression)
+    # Identifiers the body can read from the scope the lambda is defined in, set the first time a closure is created
+    free_identifiers: Optional[FrozenSet[str]] = field(default=None, init=False, compare=False, repr=False)
 
 
 @dataclass
 class Application(Expression):
     identifier: Expression = field(default_factory=UnknownExpression)
     arguments: List[Expression] = field(default_factory=list)
+    # Set by the optimizer on map, filter and zip stages of a pipeline, which hand their elements to the next stage as
+    # they are made instead of returning a list
+    fused: bool = field(default=False, init=False, compare=False, repr=False)
 
 
 @dataclass
@@ -183,6 +190,13 @@ class For(Expression):
     after_for_expression: Expression = field(default_factory=UnknownExpression)
 
 
+# Statements separated by ';' run in order in the same scope, the block evaluates to its result expression
+@dataclass
+class Block(Expression):
+    statements: List[Expression] = field(default_factory=list)
+    result: Expression = field(default_factory=UnknownExpression)
+
+
 @dataclass
 class ListDefinition(Expression):
     values: List[Expression] = field(default_factory=list)
@@ -16,7 +16,6 @@ class Parser(PetlPhase):
         self.last_token = None
         self.tokens_length = 0
         self.current_token_index = 0
-        self.dummy_count = 0
         self.aliases: dict[str, PetlType] = {}
         self.builtins: Set[Builtin] = set()
 
@@ -33,11 +32,6 @@ class Parser(PetlPhase):
     def advance(self):
         self.current_token_index += 1
 
-    def dummy(self) -> str:
-        dummy_str = f"dummy${self.dummy_count}"
-        self.dummy_count += 1
-        return dummy_str
-
     def is_binary_operator(self, min: int) -> bool:
         token = self.current_token()
         if token:
@@ -95,27 +89,32 @@ class Parser(PetlPhase):
         self.tokens_length = len(tokens)
         root: Optional[Expression] = self.parse_expression()
 
-        if root:
+        if root and self.logger.get_debug_enabled():
             self.logger.debug_block("PARSED EXPRESSION", root.to_string())
 
         return root
 
     def parse_expression(self) -> Optional[Expression]:
-        if self.current_token():
+        statements: List[Expression] = []
+        result: Expression = UnknownExpression()
+        while self.current_token():
             if self.match(Keyword.LET):
-                return self.parse_let()
+                statement: Optional[Expression] = self.parse_let()
+                if not statement:
+                    return None
             else:
-                simple_exp: Expression = self.parse_simple_expression()
-                if self.match(Delimiter.STMT_END, optional=True):
-                    token = simple_exp.token
-                    dummy_identifier = self.dummy()
-                    let_type: PetlType = simple_exp.petl_type
-                    after_let_expression: Expression = self.parse_expression()
-                    expression_type: PetlType = after_let_expression.petl_type
-                    return Let(expression_type, token, [dummy_identifier], let_type, simple_exp, after_let_expression)
-                else:
-                    return simple_exp
-        return UnknownExpression()
+                statement = self.parse_simple_expression()
+
+            if not self.match(Delimiter.STMT_END, optional=True):
+                result = statement
+                break
+            statements.append(statement)
+
+        if not statements:
+            return result
+        if isinstance(result, UnknownExpression) and isinstance(statements[-1], Let):
+            self.error(f"Valid expression required after \';\'", statements[-1].token)
+        return Block(result.petl_type, statements[0].token, statements, result)
 
     def parse_let_identifier(self) -> Optional[Tuple[str, PetlType]]:
         identifier: Optional[str] = self.match_ident()
@@ -149,15 +148,7 @@ class Parser(PetlPhase):
         self.match(Delimiter.ASSIGN)
         let_expression: Expression = self.parse_simple_expression()
 
-        after_let_expression: Optional[Expression] = None
-        if self.match(Delimiter.STMT_END):
-            after_let_expression = self.parse_expression()
-            if isinstance(after_let_expression, UnknownExpression):
-                self.error(f"Valid expression required after \';\'", token)
-
-        expression_type = after_let_expression.petl_type if after_let_expression else NoneType
-
-        return Let(expression_type, token, let_identifiers, let_type, let_expression, after_let_expression)
+        return Let(NoneType(), token, let_identifiers, let_type, let_expression, None)
 
     def parse_simple_expression(self) -> Optional[Expression]:
         if self.match(Keyword.IF, optional=True):
@@ -197,11 +188,7 @@ class Parser(PetlPhase):
         self.match(Delimiter.ASSIGN)
         alias_type: PetlType = self.parse_type()
         self.aliases[identifier] = alias_type
-        after_alias_expression: Optional[Expression] = None
-        if self.match(Delimiter.STMT_END, optional=True):
-            after_alias_expression = self.parse_expression()
-        expression_type: PetlType = after_alias_expression.petl_type
-        return Alias(expression_type, token, identifier, alias_type, after_alias_expression)
+        return Alias(NoneType(), token, identifier, alias_type, None)
 
     def parse_tuple_def_or_smp_expression(self) -> Optional[Expression]:
         token = self.current_token()
@@ -362,12 +349,7 @@ class Parser(PetlPhase):
         self.match(Delimiter.BRACE_LEFT)
         body: Expression = self.parse_expression()
         self.match(Delimiter.BRACE_RIGHT)
-
-        after_for_expression: Optional[Expression] = None
-        if self.match(Delimiter.STMT_END, optional=True):
-            after_for_expression = self.parse_expression()
-
-        return For(NoneType(), token, reference=element_reference, iterable=collection, body=body, after_for_expression=after_for_expression)
+        return For(NoneType(), token, reference=element_reference, iterable=collection, body=body, after_for_expression=None)
 
     def parse_collection_def(self) -> Optional[Expression]:
         token = self.current_token()
@@ -0,0 +1,307 @@
+from typing import Dict, Set
+
+from petllang.phases.interpreter.definitions.types import *
+from petllang.phases.interpreter.definitions.value import FuncValue
+from petllang.phases.interpreter.environment import InterpreterEnvironment
+from petllang.phases.interpreter.type_resolution import types_conform
+from petllang.phases.parser.defintions.expression import *
+from petllang.phases.phase import PetlPhase
+
+# A value conforming to one of these types has exactly that type, collection types can differ from their elements
+SIMPLE_TYPES: Tuple[type, ...] = (IntType, BoolType, CharType, StringType, NoneType)
+
+INT_OPERATORS: Set[Operator.OperatorType] = {Operator.OperatorType.PLUS, Operator.OperatorType.MINUS, Operator.OperatorType.MULTIPLY,
+                                             Operator.OperatorType.DIVIDE, Operator.OperatorType.MODULUS}
+COMPARISON_OPERATORS: Set[Operator.OperatorType] = {Operator.OperatorType.GREATER_THAN, Operator.OperatorType.LESS_THAN,
+                                                    Operator.OperatorType.GREATER_THAN_EQUAL_TO, Operator.OperatorType.LESS_THAN_EQUAL_TO}
+EQUALITY_OPERATORS: Set[Operator.OperatorType] = {Operator.OperatorType.EQUAL, Operator.OperatorType.NOT_EQUAL}
+LOGICAL_OPERATORS: Set[Operator.OperatorType] = {Operator.OperatorType.AND, Operator.OperatorType.OR}
+TEXT_TYPES: Tuple[type, ...] = (CharType, StringType)
+
+
+def simple_type(petl_type: Optional[PetlType]) -> Optional[PetlType]:
+    return petl_type if isinstance(petl_type, SIMPLE_TYPES) else None
+
+
+def exact_type(petl_type: Optional[PetlType]) -> Optional[PetlType]:
+    # Function values keep the type of the lambda they were defined by
+    return petl_type if isinstance(petl_type, SIMPLE_TYPES) or isinstance(petl_type, FuncType) else None
+
+
+def empty_iterable(expression: Optional[Expression]) -> bool:
+    if isinstance(expression, LitExpression):
+        return isinstance(expression.literal, StringLiteral) and expression.literal.value == ""
+    elif isinstance(expression, ListDefinition):
+        return not expression.values
+    elif isinstance(expression, DictDefinition):
+        return not expression.mapping
+    return False
+
+
+def operator_result_type(operator: Operator, left_type: Optional[PetlType], right_type: Optional[PetlType]) -> Optional[PetlType]:
+    operator_type: Operator.OperatorType = operator.operator_type
+    if operator_type in EQUALITY_OPERATORS:
+        return BoolType()
+    elif operator_type in INT_OPERATORS and isinstance(left_type, IntType) and isinstance(right_type, IntType):
+        return IntType()
+    elif operator_type == Operator.OperatorType.PLUS and isinstance(left_type, TEXT_TYPES) and isinstance(right_type, TEXT_TYPES):
+        return StringType()
+    elif operator_type in COMPARISON_OPERATORS and isinstance(left_type, IntType) and isinstance(right_type, IntType):
+        return BoolType()
+    elif operator_type in LOGICAL_OPERATORS and isinstance(left_type, BoolType) and isinstance(right_type, BoolType):
+        return BoolType()
+    return None
+
+
+class TypeCheckException(Exception):
+    pass
+
+
+# Static types of the bindings in scope, None when the type of the bound value is only known at runtime. Bindings
+# that are not found fall back to the values already in the interpreter's environment, e.g. builtins or REPL lines.
+class TypeEnvironment:
+    def __init__(self, environment: Optional[InterpreterEnvironment] = None, unreturned_types: Optional[Set[int]] = None):
+        self.types: Dict[str, Optional[PetlType]] = {}
+        self.environment = environment
+        # Ids of builtin function types whose applications may return values of other types than their return type
+        self.unreturned_types: Set[int] = unreturned_types if unreturned_types is not None else set()
+
+    def add(self, identifier: str, petl_type: Optional[PetlType]):
+        self.types[identifier] = petl_type
+
+    def get(self, identifier: str) -> Optional[PetlType]:
+        if identifier in self.types:
+            return self.types[identifier]
+        value = self.environment.lookup(identifier) if self.environment else None
+        if isinstance(value, FuncValue) and value.builtin and not value.builtin.returns_declared_type:
+            self.unreturned_types.add(id(value.petl_type))
+        return exact_type(value.petl_type) if value is not None else None
+
+    def return_type(self, applied_type: FuncType) -> Optional[PetlType]:
+        # Applied lambdas conform their result to their return type, only the values of simple types are exactly that type
+        return simple_type(applied_type.return_type) if id(applied_type) not in self.unreturned_types else None
+
+    def copy(self) -> 'TypeEnvironment':
+        type_environment: TypeEnvironment = TypeEnvironment(self.environment, self.unreturned_types)
+        type_environment.types = dict(self.types)
+        return type_environment
+
+    def join(self, branch_environments: List['TypeEnvironment']):
+        # Lets mutate the environment they are evaluated in, so bindings made on only some paths become unknown
+        identifiers: Set[str] = set()
+        for branch_environment in branch_environments:
+            identifiers.update(branch_environment.types)
+        for identifier in identifiers:
+            petl_type: Optional[PetlType] = self.get(identifier)
+            if any(map(lambda e: e.get(identifier) != petl_type, branch_environments)):
+                self.types[identifier] = None
+
+
+# Checks the types of an expression tree before it is interpreted. Only the type of a value the interpreter is
+# certain to produce is resolved, so a reported mismatch is one the interpreter reports every time it evaluates the
+# expression. Mismatches are reported wherever that may happen, also in lambda bodies that are never applied, branch
+# arms and match cases that are never taken and statements after loops over empty iterables. Only code that can never
+# be evaluated, the arm a literal predicate skips, cases after a catch-all and the rest of a block after a loop over a
+# literal empty iterable, is checked without reporting. Expressions whose check always passes get their checked_type
+# set, a trusted interpreter skips them.
+class TypeChecker(PetlPhase):
+    def __init__(self, debug=False):
+        self.logger.__init__(debug)
+        self.reporting: bool = True
+
+    def error(self, text: str, token: Token):
+        self.logger.error(f"{text}\n{token.file_position.to_string()}")
+        raise TypeCheckException
+
+    def check(self, root: Expression, environment: Optional[InterpreterEnvironment] = None) -> bool:
+        try:
+            self.check_expression(root, TypeEnvironment(environment), AnyType())
+        except TypeCheckException as _:
+            return False
+        except RecursionError as _:
+            # Every resolved type stays valid, the interpreter reports the expression depth it exceeds
+            self.logger.debug("Expression tree too deep to check, remaining types are checked while interpreting")
+        return True
+
+    def types_conform(self, token: Token, resolved_type: PetlType, expected_type: PetlType) -> Optional[PetlType]:
+        return types_conform(token, resolved_type, expected_type, self.error, no_error=not self.reporting)
+
+    def conform(self, expression: Expression, resolved_type: Optional[PetlType], expected_type: Optional[PetlType]) -> Optional[PetlType]:
+        if resolved_type is not None and expected_type is not None:
+            if self.types_conform(expression.token, resolved_type, expected_type) is None:
+                return None
+            expression.checked_type = resolved_type
+        return resolved_type
+
+    def check_unreachable(self, expression: Optional[Expression], environment: TypeEnvironment, expected_type: Optional[PetlType]) -> Optional[PetlType]:
+        # Checks an expression that is never evaluated
+        reporting: bool = self.reporting
+        self.reporting = False
+        try:
+            return self.check_expression(expression, environment, expected_type)
+        finally:
+            self.reporting = reporting
+
+    def check_expression(self, expression: Optional[Expression], environment: TypeEnvironment, expected_type: Optional[PetlType]) -> Optional[PetlType]:
+        if isinstance(expression, LitExpression):
+            return self.conform(expression, expression.petl_type, expected_type)
+        elif isinstance(expression, Let):
+            return self.check_let(expression, environment, expected_type)
+        elif isinstance(expression, Alias):
+            return self.check_expression(expression.after_alias_expression, environment, expected_type) if expression.after_alias_expression else NoneType()
+        elif isinstance(expression, Lambda):
+            return self.check_lambda(expression, environment, expected_type)
+        elif isinstance(expression, Application):
+            return self.check_application(expression, environment, expected_type)
+        elif isinstance(expression, Match):
+            return self.check_match(expression, environment, expected_type)
+        elif isinstance(expression, Primitive):
+            left_type: Optional[PetlType] = self.check_expression(expression.left, environment, AnyType())
+            right_type: Optional[PetlType] = self.check_expression(expression.right, environment, AnyType())
+            return self.conform(expression, operator_result_type(expression.operator, left_type, right_type), expected_type)
+        elif isinstance(expression, Reference):
+            return self.conform(expression, environment.get(expression.identifier), expected_type)
+        elif isinstance(expression, Branch):
+            return self.check_branch(expression, environment, expected_type)
+        elif isinstance(expression, For):
+            return self.check_for(expression, environment, expected_type)
+        elif isinstance(expression, Block):
+            return self.check_block(expression, environment, expected_type)
+        elif isinstance(expression, ListDefinition):
+            element_type: Optional[PetlType] = expression.petl_type.list_type if isinstance(expression.petl_type, ListType) else None
+            for value in expression.values:
+                self.check_expression(value, environment, element_type)
+        elif isinstance(expression, RangeDefinition):
+            if isinstance(expression.start, IntLiteral) and isinstance(expression.end, IntLiteral) and \
+                    expression.start.value >= 0 and expression.end.value >= 0:
+                return self.conform(expression, ListType(IntType()), expected_type)
+        elif isinstance(expression, TupleDefinition):
+            element_types: List[PetlType] = expression.petl_type.tuple_types if isinstance(expression.petl_type, TupleType) else []
+            for value, value_type in zip(expression.values, element_types):
+                self.check_expression(value, environment, value_type)
+        elif isinstance(expression, DictDefinition):
+            if isinstance(expression.petl_type, DictType):
+                for key, _ in expression.mapping:
+                    self.check_expression(key, environment, expression.petl_type.key_type)
+                for _, value in expression.mapping:
+                    self.check_expression(value, environment, expression.petl_type.value_type)
+        elif isinstance(expression, SchemaDefinition):
+            self.conform(expression, expression.petl_type, expected_type)
+        return None
+
+    def check_let(self, let: Let, environment: TypeEnvironment, expected_type: Optional[PetlType]) -> Optional[PetlType]:
+        let_type: Optional[PetlType] = self.check_expression(let.let_expression, environment, let.let_type)
+        if len(let.identifiers) > 1:
+            for identifier in let.identifiers:
+                environment.add(identifier, None)
+        else:
+            environment.add(let.identifiers[0], exact_type(let_type))
+
+        if let.after_let_expression:
+            return self.check_expression(let.after_let_expression, environment, expected_type)
+        return NoneType()
+
+    def check_lambda(self, lambda_expression: Lambda, environment: TypeEnvironment, expected_type: Optional[PetlType]) -> Optional[PetlType]:
+        if expected_type is not None:
+            lambda_type: Optional[PetlType] = self.types_conform(lambda_expression.token, lambda_expression.petl_type, expected_type)
+            if isinstance(lambda_type, FuncType) and lambda_type.return_type:
+                self.types_conform(lambda_expression.body.token, lambda_type.return_type, lambda_expression.body.petl_type)
+
+        # Applied lambdas run in a copy of the environment they were defined in, with arguments conforming to the parameters
+        body_environment: TypeEnvironment = environment.copy()
+        for parameter in lambda_expression.parameters:
+            body_environment.add(parameter.identifier, simple_type(parameter.parameter_type))
+        self.check_expression(lambda_expression.body, body_environment, lambda_expression.petl_type.return_type)
+        return lambda_expression.petl_type
+
+    def check_application(self, application: Application, environment: TypeEnvironment, expected_type: Optional[PetlType]) -> Optional[PetlType]:
+        applied_type: Optional[PetlType] = self.check_expression(application.identifier, environment, UnknownType())
+        argument_types: List[Optional[PetlType]] = [None] * len(application.arguments)
+        return_type: Optional[PetlType] = None
+        if isinstance(applied_type, FuncType) and len(applied_type.parameter_types) == len(application.arguments):
+            argument_types = list(applied_type.parameter_types)
+            return_type = environment.return_type(applied_type)
+        elif isinstance(applied_type, StringType) and len(application.arguments) == 1:
+            self.check_expression(application.arguments[0], environment, IntType())
+            return self.conform(application, CharType(), expected_type)
+        elif isinstance(applied_type, (ListType, TupleType)):
+            argument_types = [IntType()] * len(application.arguments)
+
+        for argument, argument_type in zip(application.arguments, argument_types):
+            self.check_expression(argument, environment, argument_type)
+        return self.conform(application, return_type, expected_type)
+
+    def check_match(self, match: Match, environment: TypeEnvironment, expected_type: Optional[PetlType]) -> Optional[PetlType]:
+        self.check_expression(match.match_expression, environment, AnyType())
+        # Type patterns bind the matched value before their predicate runs, also when a later case is taken
+        unmatched_environment: TypeEnvironment = environment.copy()
+        case_environments: List[TypeEnvironment] = []
+        # Cases after a catch-all are never taken
+        check = self.check_expression
+        for case in match.cases:
+            case_environment: TypeEnvironment = unmatched_environment.copy()
+            if isinstance(case.pattern, TypePattern):
+                case_environment.add(case.pattern.identifier, simple_type(case.pattern.case_type))
+                if case.pattern.predicate:
+                    check(case.pattern.predicate, case_environment, BoolType())
+                unmatched_environment.join([case_environment.copy()])
+            check(case.case_expression, case_environment, expected_type)
+            case_environments.append(case_environment)
+            if isinstance(case.pattern, AnyPattern):
+                check = self.check_unreachable
+        environment.join(case_environments)
+        return None
+
+    def check_branch(self, branch: Branch, environment: TypeEnvironment, expected_type: Optional[PetlType]) -> Optional[PetlType]:
+        predicate_type: Optional[PetlType] = self.check_expression(branch.predicate, environment, BoolType())
+        # A literal predicate skips one of the arms
+        taken: Optional[bool] = branch.predicate.literal.value if isinstance(branch.predicate, LitExpression) and \
+            isinstance(branch.predicate.literal, BoolLiteral) else None
+        if_environment: TypeEnvironment = environment.copy()
+        check_if = self.check_unreachable if taken is False else self.check_expression
+        if_type: Optional[PetlType] = check_if(branch.if_branch, if_environment, expected_type)
+        else_environment: TypeEnvironment = environment.copy()
+        check_else = self.check_unreachable if taken is True else self.check_expression
+        else_type: Optional[PetlType] = check_else(branch.else_branch, else_environment, expected_type) if branch.else_branch else None
+        environment.join([if_environment, else_environment])
+        return if_type if isinstance(predicate_type, BoolType) and if_type is not None and if_type == else_type else None
+
+    def check_for_loop(self, for_expression: For, environment: TypeEnvironment, check=None):
+        # Every iteration runs the body in a fresh copy of the environment the loop is evaluated in
+        check = check or self.check_expression
+        check(for_expression.iterable, environment, UnknownType())
+        body_environment: TypeEnvironment = environment.copy()
+        body_environment.add(for_expression.reference, IntType() if isinstance(for_expression.iterable, RangeDefinition) else None)
+        (self.check_unreachable if empty_iterable(for_expression.iterable) else check)(for_expression.body, body_environment, AnyType())
+
+    def check_for(self, for_expression: For, environment: TypeEnvironment, expected_type: Optional[PetlType]) -> Optional[PetlType]:
+        self.check_for_loop(for_expression, environment)
+
+        # An empty iterable skips the expression after the loop
+        if for_expression.after_for_expression:
+            after_for_environment: TypeEnvironment = environment.copy()
+            check = self.check_unreachable if empty_iterable(for_expression.iterable) else self.check_expression
+            check(for_expression.after_for_expression, after_for_environment, expected_type)
+            environment.join([after_for_environment])
+        return None
+
+    def check_block(self, block: Block, environment: TypeEnvironment, expected_type: Optional[PetlType]) -> Optional[PetlType]:
+        # An empty iterable skips the rest of the block, so it is checked in a copy that is joined back afterwards
+        block_environment: TypeEnvironment = environment
+        loop_environments: List[TypeEnvironment] = []
+        check = self.check_expression
+        for statement in block.statements:
+            if isinstance(statement, For):
+                self.check_for_loop(statement, block_environment, check)
+                loop_environments.append(block_environment)
+                block_environment = block_environment.copy()
+                if empty_iterable(statement.iterable):
+                    check = self.check_unreachable
+            elif not isinstance(statement, Alias):
+                check(statement, block_environment, statement.petl_type)
+
+        result_type: Optional[PetlType] = check(block.result, block_environment, expected_type)
+        for loop_environment in reversed(loop_environments):
+            loop_environment.join([block_environment])
+            block_environment = loop_environment
+        return result_type if not loop_environments else None
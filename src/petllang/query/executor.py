@@ -1,13 +1,26 @@
-from typing import List, Tuple
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from petllang.phases.interpreter.definitions.value import PetlValue, IntValue, BoolValue, CharValue, StringValue
+import numpy as np
+
+from petllang.phases.interpreter.definitions.value import PetlValue, IntValue, BoolValue, CharValue, StringValue, \
+    TableColumn, TableValue, TupleValue
+from petllang.phases.interpreter.definitions.types import PetlType, IntType, BoolType, CharType, StringType
 from petllang.query.interpreter.environment import QueryEnvironment
 from petllang.query.interpreter.interpreter import QueryInterpreter
+from petllang.query.interpreter.type_resolver import resolve_query_type
+from petllang.query.interpreter.types import QueryType, QueryIntType, QueryBoolType, QueryCharType, QueryStringType
+from petllang.query.interpreter.vectorized_interpreter import QueryVectorizedInterpreter
 from petllang.query.interpreter.value import QueryValue, QueryIntValue, QueryBoolValue, QueryCharValue, QueryStringValue
 from petllang.query.lexer.lexer import QueryLexer
 from petllang.query.lexer.query_token import QueryToken
 from petllang.query.parser.expression import QueryExpression
 from petllang.query.parser.parser import QueryParser
+from petllang.query.planner import JoinPlan, plan_join, get_referenced_identifiers
+
+QUERY_CACHE_SIZE: int = 256
+JOIN_PAIR_CHUNK_SIZE: int = 65536
 
 
 def petl_to_query_value(value: PetlValue) -> QueryValue:
@@ -23,12 +36,242 @@ def petl_to_query_value(value: PetlValue) -> QueryValue:
         raise Exception(f"Invalid type for query: {value.petl_type.to_string()}")
 
 
+def petl_to_query_type(petl_type: PetlType) -> QueryType:
+    if isinstance(petl_type, IntType):
+        return QueryIntType()
+    elif isinstance(petl_type, BoolType):
+        return QueryBoolType()
+    elif isinstance(petl_type, CharType):
+        return QueryCharType()
+    elif isinstance(petl_type, StringType):
+        return QueryStringType()
+    else:
+        raise Exception(f"Invalid type for query: {petl_type.to_string()}")
+
+
+def petl_to_query_key(value: PetlValue) -> Tuple[type, Any]:
+    query_value: QueryValue = petl_to_query_value(value)
+    return type(query_value), query_value.value
+
+
+class CompiledQuery:
+    def __init__(self, query_text: str):
+        self.query_text: str = query_text
+        tokens: List[QueryToken] = QueryLexer().scan(query_text)
+        self.root: QueryExpression = QueryParser().parse(tokens)
+        self.interpreter: QueryInterpreter = QueryInterpreter()
+        self.vectorized_interpreter: QueryVectorizedInterpreter = QueryVectorizedInterpreter()
+
+    def execute(self, variables: List[Tuple[str, PetlValue]], token, error) -> bool:
+        return self.execute_expression(self.root, variables, token, error)
+
+    def execute_expression(self, root: QueryExpression, variables: List[Tuple[str, PetlValue]], token, error) -> bool:
+        environment = QueryEnvironment()
+        for variable in variables:
+            environment.add(identifier=variable[0], value=petl_to_query_value(variable[1]))
+        query_result_value: QueryValue = self.interpreter.interpret(root, environment, token, error)
+        if isinstance(query_result_value, QueryBoolValue):
+            return query_result_value.value
+        return False
+
+    # Returns a row mask, or None when the columns cannot be vectorized and the rows have to be interpreted one by one
+    def execute_vectorized(self, columns: Dict[str, TableColumn], row_count: int,
+                           root: Optional[QueryExpression] = None) -> Optional[np.ndarray]:
+        return self.vectorized_interpreter.interpret(root if root is not None else self.root, columns, row_count)
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_query(query_text: str) -> CompiledQuery:
+    return CompiledQuery(query_text)
+
+
+def check_query(where_query: CompiledQuery, column_types: Dict[str, PetlType], token, error) -> bool:
+    # Resolves the query against the column types of its tables, so a query that fails on every row is reported when
+    # it is compiled rather than when (or if) a lazy table runs it
+    try:
+        variable_types: Dict[str, QueryType] = {identifier: petl_to_query_type(column_types[identifier])
+                                                for identifier in get_referenced_identifiers(where_query.root)
+                                                if identifier in column_types}
+        resolve_query_type(where_query.root, variable_types, QueryBoolType())
+        return True
+    except Exception as query_exception:
+        error(f"Unhandled exception while interpreting: {query_exception}", token)
+        return False
+
+
 def execute_query(query_text: str, variables: List[Tuple[str, PetlValue]], token, error) -> bool:
-    tokens: List[QueryToken] = QueryLexer().scan(query_text)
-    query_ast_root: QueryExpression = QueryParser().parse(tokens)
-    environment = QueryEnvironment()
-    for variable in variables:
-        environment.add(identifier=variable[0], value=petl_to_query_value(variable[1]))
-    query_result_value: QueryValue = QueryInterpreter().interpret(query_ast_root, environment, token, error)
-    if isinstance(query_result_value, QueryBoolValue):
-        return query_result_value.value
+    return compile_query(query_text).execute(variables, token, error)
+
+
+# Table query helper functions #
+def add_variable_to_query_environment(table_columns: List[Tuple[StringValue, PetlType]],
+                                      row: PetlValue,
+                                      table_name: Optional[str] = None) -> List[Tuple[str, PetlValue]]:
+    variables = []
+    if isinstance(row, TupleValue):
+        for (column_name, column_type), columns_value in zip(table_columns, row.values):
+            variables.append((f"{table_name}.{column_name.value}" if table_name else column_name.value, columns_value))
+    return variables
+
+
+def get_variable_types(table_columns: List[Tuple[StringValue, PetlType]], table_name: Optional[str] = None) -> Dict[str, PetlType]:
+    # Query variables are bound column by column, so a repeated column name refers to the last column with that name
+    return {f"{table_name}.{column_name.value}" if table_name else column_name.value: column_type
+            for column_name, column_type in table_columns}
+
+
+def get_column_index(table_columns: List[Tuple[StringValue, PetlType]], column_name: str, table_name: str) -> int:
+    column_index = -1
+    for index, (table_column_name, _) in enumerate(table_columns):
+        if f"{table_name}.{table_column_name.value}" == column_name:
+            column_index = index
+    return column_index
+
+
+def get_column_values(table_value: TableValue, column_index: int) -> List[PetlValue]:
+    if table_value.is_columnar():
+        return table_value.columns[column_index].to_values()
+    return [row.values[column_index] for row in table_value.rows if isinstance(row, TupleValue)]
+
+
+def get_row_variables(table_value: TableValue, table_name: Optional[str] = None) -> List[List[Tuple[str, PetlValue]]]:
+    return [add_variable_to_query_environment(table_value.schema.values, row, table_name) for row in table_value.iter_rows()]
+
+
+def get_named_columns(table_value: TableValue, identifiers: List[str],
+                      table_name: Optional[str] = None) -> Optional[Dict[str, TableColumn]]:
+    columns: Optional[List[TableColumn]] = table_value.get_columns()
+    if columns is None:
+        return None
+    named_columns: Dict[str, TableColumn] = {}
+    for index, (column_name, _) in enumerate(table_value.schema.values):
+        name = f"{table_name}.{column_name.value}" if table_name else column_name.value
+        if name in identifiers:
+            named_columns[name] = columns[index]
+    return named_columns
+
+
+def cross_product_chunks(left_row_count: int, right_row_count: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    left_rows_per_chunk = max(1, JOIN_PAIR_CHUNK_SIZE // max(1, right_row_count))
+    for start in range(0, left_row_count, left_rows_per_chunk):
+        end = min(start + left_rows_per_chunk, left_row_count)
+        yield np.repeat(np.arange(start, end), right_row_count), np.tile(np.arange(right_row_count), end - start)
+
+
+def vectorized_join_indices(left_table_value: TableValue,
+                            right_table_value: TableValue,
+                            where_query: CompiledQuery,
+                            root: QueryExpression,
+                            candidate_chunks: Iterator[Tuple[np.ndarray, np.ndarray]]) -> Optional[List[Tuple[int, int]]]:
+    referenced_identifiers: List[str] = get_referenced_identifiers(root)
+    left_columns = get_named_columns(left_table_value, referenced_identifiers, "left")
+    right_columns = get_named_columns(right_table_value, referenced_identifiers, "right")
+    if left_columns is None or right_columns is None:
+        return None
+
+    joined_indices: List[Tuple[int, int]] = []
+    for left_indices, right_indices in candidate_chunks:
+        pair_columns: Dict[str, TableColumn] = {name: column.take(left_indices) for name, column in left_columns.items()}
+        pair_columns.update({name: column.take(right_indices) for name, column in right_columns.items()})
+        mask = where_query.execute_vectorized(pair_columns, len(left_indices), root)
+        if mask is None:
+            return None
+        joined_indices.extend(zip(left_indices[mask].tolist(), right_indices[mask].tolist()))
+    return joined_indices
+
+
+def nested_loop_join_indices(left_table_value: TableValue,
+                             right_table_value: TableValue,
+                             where_query: CompiledQuery,
+                             token, error) -> Iterator[Tuple[int, int]]:
+    vectorized_indices = vectorized_join_indices(left_table_value, right_table_value, where_query, where_query.root,
+                                                 cross_product_chunks(left_table_value.row_count(), right_table_value.row_count()))
+    if vectorized_indices is not None:
+        yield from vectorized_indices
+        return
+
+    left_row_variables = get_row_variables(left_table_value, "left")
+    right_row_variables = get_row_variables(right_table_value, "right")
+    for left_index, left_variables in enumerate(left_row_variables):
+        for right_index, right_variables in enumerate(right_row_variables):
+            if where_query.execute(left_variables + right_variables, token, error):
+                yield left_index, right_index
+
+
+def hash_join_indices(left_table_value: TableValue,
+                      right_table_value: TableValue,
+                      where_query: CompiledQuery,
+                      join_plan: JoinPlan,
+                      token, error) -> Iterator[Tuple[int, int]]:
+    def get_row_keys(table_value: TableValue, key_columns: List[str], table_name: str) -> List[Tuple]:
+        key_column_values = [get_column_values(table_value, get_column_index(table_value.schema.values, key_column, table_name))
+                             for key_column in key_columns]
+        return list(zip(*[[petl_to_query_key(value) for value in column_values] for column_values in key_column_values]))
+
+    left_keys = get_row_keys(left_table_value, [kc[0] for kc in join_plan.key_columns], "left")
+    right_keys = get_row_keys(right_table_value, [kc[1] for kc in join_plan.key_columns], "right")
+
+    # Build on the smaller side, always emit pairs in left-major, right-minor order like the nested loop
+    right_matches: List[List[int]] = []
+    if len(right_keys) <= len(left_keys):
+        right_buckets: Dict[Tuple, List[int]] = {}
+        for right_index, right_key in enumerate(right_keys):
+            right_buckets.setdefault(right_key, []).append(right_index)
+        right_matches = [right_buckets.get(left_key, []) for left_key in left_keys]
+    else:
+        left_buckets: Dict[Tuple, List[int]] = {}
+        for left_index, left_key in enumerate(left_keys):
+            left_buckets.setdefault(left_key, []).append(left_index)
+        right_matches = [[] for _ in left_keys]
+        for right_index, right_key in enumerate(right_keys):
+            for left_index in left_buckets.get(right_key, []):
+                right_matches[left_index].append(right_index)
+
+    if join_plan.residual:
+        candidate_left_indices = np.repeat(np.arange(len(right_matches)), [len(m) for m in right_matches])
+        candidate_right_indices = np.fromiter(chain.from_iterable(right_matches), dtype=np.intp)
+        vectorized_indices = vectorized_join_indices(left_table_value, right_table_value, where_query, join_plan.residual,
+                                                     iter([(candidate_left_indices, candidate_right_indices)]))
+        if vectorized_indices is not None:
+            yield from vectorized_indices
+            return
+
+    left_row_variables = get_row_variables(left_table_value, "left") if join_plan.residual else []
+    right_row_variables = get_row_variables(right_table_value, "right") if join_plan.residual else []
+    for left_index, matched_right_indices in enumerate(right_matches):
+        for right_index in matched_right_indices:
+            if join_plan.residual:
+                all_variables = left_row_variables[left_index] + right_row_variables[right_index]
+                if not where_query.execute_expression(join_plan.residual, all_variables, token, error):
+                    continue
+            yield left_index, right_index
+
+
+def select_row_indices(table_value: TableValue, where_query: CompiledQuery, root: QueryExpression, token, error) -> List[int]:
+    referenced_identifiers: List[str] = get_referenced_identifiers(root)
+    named_columns: Dict[str, TableColumn] = get_named_columns(table_value, referenced_identifiers)
+    mask = where_query.execute_vectorized(named_columns, table_value.row_count(), root)
+    if mask is not None:
+        return np.flatnonzero(mask).tolist()
+
+    referenced_columns: Dict[str, List[PetlValue]] = {name: column.to_values() for name, column in named_columns.items()}
+
+    selected_row_indices: List[int] = []
+    for row_index in range(table_value.row_count()):
+        variables = [(column_name, column_values[row_index]) for column_name, column_values in referenced_columns.items()]
+        if where_query.execute_expression(root, variables, token, error):
+            selected_row_indices.append(row_index)
+    return selected_row_indices
+
+
+def join_row_indices(left_table_value: TableValue,
+                     right_table_value: TableValue,
+                     where_query: CompiledQuery,
+                     token, error) -> List[Tuple[int, int]]:
+    left_column_names = [f"left.{c[0].value}" for c in left_table_value.schema.values]
+    right_column_names = [f"right.{c[0].value}" for c in right_table_value.schema.values]
+    join_plan: JoinPlan = plan_join(where_query.root, left_column_names, right_column_names)
+    if join_plan.is_hash_join():
+        return list(hash_join_indices(left_table_value, right_table_value, where_query, join_plan, token, error))
+    return list(nested_loop_join_indices(left_table_value, right_table_value, where_query, token, error))
+# end helper functions #
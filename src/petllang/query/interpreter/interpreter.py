@@ -112,7 +112,9 @@ class QueryInterpreter:
         elif operator.is_boolean():
             return self.evaluate_boolean_operator(left, right, operator)
         elif operator.is_contains() and isinstance(left, QueryIntValue) and isinstance(right, QueryRangeValue):
-            return QueryBoolValue(right.start_value <= left.value <= right.end_value)
+            return QueryBoolValue(right.contains(left.value))
+        elif operator.is_not() and isinstance(right, QueryBoolValue):
+            return QueryBoolValue(not right.value)
         else:
             raise Exception(f"Invalid types for operator \'{operator.to_string()}\'")
 
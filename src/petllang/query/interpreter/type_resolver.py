@@ -1,6 +1,19 @@
-from typing import Optional
+from typing import Dict, Optional, Set, Tuple
 
-from petllang.query.interpreter.types import QueryType, QueryUnknownType
+from petllang.query.interpreter.types import QueryType, QueryUnknownType, QueryIntType, QueryBoolType, QueryCharType, \
+    QueryStringType, QueryRangeType
+from petllang.query.parser.expression import QueryExpression, QueryLitExpression, QueryPrimitive, QueryReference, \
+    QueryRangeDefinition
+from petllang.query.parser.operator import QueryOperator
+
+QUERY_TEXT_TYPES: Tuple[type, ...] = (QueryCharType, QueryStringType)
+QUERY_COMPARISON_OPERATORS: Set[QueryOperator.QueryOperatorType] = {
+    QueryOperator.QueryOperatorType.GREATER_THAN, QueryOperator.QueryOperatorType.LESS_THAN,
+    QueryOperator.QueryOperatorType.GREATER_THAN_EQUAL_TO, QueryOperator.QueryOperatorType.LESS_THAN_EQUAL_TO}
+QUERY_EQUALITY_OPERATORS: Set[QueryOperator.QueryOperatorType] = {QueryOperator.QueryOperatorType.EQUAL,
+                                                                  QueryOperator.QueryOperatorType.NOT_EQUAL}
+QUERY_LOGICAL_OPERATORS: Set[QueryOperator.QueryOperatorType] = {QueryOperator.QueryOperatorType.AND,
+                                                                 QueryOperator.QueryOperatorType.OR}
 
 
 def _types_conform(expression_type: QueryType, expected_type: QueryType) -> QueryType:
@@ -23,3 +36,42 @@ def types_conform(expression_type: QueryType, expected_type: QueryType) -> Optio
         raise Exception(f"Type mismatch: {expression_type.to_string()} vs. {expected_type.to_string()}")
     else:
         return conformed_type
+
+
+def resolve_operator_type(left_type: QueryType, right_type: QueryType, operator: QueryOperator) -> QueryType:
+    operator_type: QueryOperator.QueryOperatorType = operator.operator_type
+    if operator.is_arithmetic() and isinstance(left_type, QueryIntType) and isinstance(right_type, QueryIntType):
+        return QueryIntType()
+    elif operator_type == QueryOperator.QueryOperatorType.PLUS and isinstance(left_type, QUERY_TEXT_TYPES) and \
+            isinstance(right_type, QUERY_TEXT_TYPES):
+        return QueryStringType()
+    elif operator_type in QUERY_COMPARISON_OPERATORS and isinstance(left_type, QueryIntType) and isinstance(right_type, QueryIntType):
+        return QueryBoolType()
+    elif operator_type in QUERY_EQUALITY_OPERATORS:
+        return QueryBoolType()
+    elif operator_type in QUERY_LOGICAL_OPERATORS and isinstance(left_type, QueryBoolType) and isinstance(right_type, QueryBoolType):
+        return QueryBoolType()
+    elif operator.is_contains() and isinstance(left_type, QueryIntType) and isinstance(right_type, QueryRangeType):
+        return QueryBoolType()
+    elif operator.is_not() and isinstance(right_type, QueryBoolType):
+        return QueryBoolType()
+    raise Exception(f"Invalid types for operator \'{operator.to_string()}\'")
+
+
+def resolve_query_type(expression: QueryExpression, variable_types: Dict[str, QueryType], expected_type: QueryType) -> QueryType:
+    # Resolves the type the query interpreter evaluates an expression to, raising the exception it would raise for any row
+    if isinstance(expression, QueryLitExpression):
+        return types_conform(expression.query_type, expected_type)
+    elif isinstance(expression, QueryPrimitive):
+        left_type: QueryType = resolve_query_type(expression.left, variable_types, QueryUnknownType())
+        right_type: QueryType = resolve_query_type(expression.right, variable_types, QueryUnknownType())
+        return types_conform(resolve_operator_type(left_type, right_type, expression.operator), expected_type)
+    elif isinstance(expression, QueryReference):
+        if expression.identifier not in variable_types:
+            raise Exception(f"Identifier \'{expression.identifier}\' does not exist in this scope")
+        return types_conform(variable_types[expression.identifier], expected_type)
+    elif isinstance(expression, QueryRangeDefinition):
+        if expression.start.value < 0 or expression.end.value < 0:
+            raise Exception(f"Range bounds cannot be negative")
+        return QueryRangeType()
+    raise Exception(f"Invalid expression found")
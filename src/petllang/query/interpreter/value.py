@@ -3,6 +3,7 @@ from pprint import pformat
 
 from petllang.query.interpreter.types import QueryType, QueryCharType, QueryBoolType, QueryIntType, QueryStringType, \
     QueryRangeType
+from petllang.utils.int_range import IntRange
 
 
 class QueryValue(ABC):
@@ -66,11 +67,14 @@ class QueryStringValue(QueryValue):
         return self.value
 
 
+# Backed by the same lazy range as Petl ranges, 'in' only holds for ranges counting up from their start
 class QueryRangeValue(QueryValue):
     def __init__(self, start_value: int, end_value: int):
         QueryValue.__init__(self, QueryRangeType())
-        self.start_value: int = start_value
-        self.end_value: int = end_value
+        self.range: IntRange = IntRange(start_value, end_value, QueryIntValue)
+
+    def contains(self, value: int) -> bool:
+        return self.range.start <= self.range.end and value in self.range
 
     def to_string(self) -> str:
-        return f"{self.start_value}~{self.end_value}"
+        return f"{self.range.start}~{self.range.end}"
@@ -0,0 +1,183 @@
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from petllang.phases.interpreter.definitions.value import TableColumn, IntValue, BoolValue, CharValue, StringValue
+from petllang.query.interpreter.type_resolver import types_conform
+from petllang.query.interpreter.types import QueryType, QueryBoolType, QueryUnknownType, QueryIntType, QueryCharType, \
+    QueryStringType, QueryRangeType
+from petllang.query.parser.expression import QueryExpression, QueryLitExpression, QueryPrimitive, QueryReference, \
+    QueryRangeDefinition, QueryIntLiteral, QueryBoolLiteral, QueryCharLiteral, QueryStringLiteral
+from petllang.query.parser.operator import QueryOperator
+
+INT64_MAX: int = np.iinfo(np.int64).max
+# Largest magnitude for which int -> float64 conversion is exact, so int(a / b) matches Python
+FLOAT64_EXACT_MAX: int = 2 ** 53
+
+
+class QueryVectorizationError(Exception):
+    pass
+
+
+class QueryVector:
+    # Either a whole column (np.ndarray) or a scalar broadcast over every row
+    def __init__(self, query_type: QueryType, data: Any):
+        self.query_type = query_type
+        self.data = data
+
+    def is_scalar(self) -> bool:
+        return not isinstance(self.data, np.ndarray)
+
+
+def column_to_vector(column: TableColumn) -> QueryVector:
+    if column.nulls is not None:
+        raise QueryVectorizationError(f"Cannot vectorize column with none values")
+    if column.value_class is IntValue and column.data.dtype == np.int64:
+        return QueryVector(QueryIntType(), column.data)
+    elif column.value_class is BoolValue:
+        return QueryVector(QueryBoolType(), column.data)
+    elif column.value_class is CharValue:
+        return QueryVector(QueryCharType(), column.data)
+    elif column.value_class is StringValue:
+        return QueryVector(QueryStringType(), column.data)
+    raise QueryVectorizationError(f"Cannot vectorize column")
+
+
+def _max_abs(vector: QueryVector) -> int:
+    if vector.is_scalar():
+        return abs(vector.data)
+    if len(vector.data) == 0:
+        return 0
+    return max(abs(int(vector.data.min())), abs(int(vector.data.max())))
+
+
+def _contains_zero(vector: QueryVector) -> bool:
+    if vector.is_scalar():
+        return vector.data == 0
+    return bool((vector.data == 0).any())
+
+
+def _is_string_like(vector: QueryVector) -> bool:
+    return isinstance(vector.query_type, QueryCharType) or isinstance(vector.query_type, QueryStringType)
+
+
+# Evaluates a query over whole columns at once, mirroring QueryInterpreter's semantics. Anything that the row
+# interpreter would report as an error (or that numpy cannot compute exactly) raises QueryVectorizationError so
+# callers can fall back to the row interpreter, which reports it at the right row.
+class QueryVectorizedInterpreter:
+    def interpret(self, root: QueryExpression, columns: Dict[str, TableColumn], row_count: int) -> Optional[np.ndarray]:
+        try:
+            result: QueryVector = self.evaluate(root, columns, QueryBoolType())
+        except Exception:
+            return None
+        if result.is_scalar():
+            return np.full(row_count, bool(result.data), dtype=bool)
+        return np.asarray(result.data, dtype=bool)
+
+    def evaluate(self, expression: QueryExpression, columns: Dict[str, TableColumn], expected_type: QueryType) -> QueryVector:
+        if isinstance(expression, QueryLitExpression):
+            evaluated_vector = self.evaluate_literal(expression)
+        elif isinstance(expression, QueryPrimitive):
+            evaluated_vector = self.evaluate_primitive(expression, columns)
+        elif isinstance(expression, QueryReference):
+            evaluated_vector = self.evaluate_reference(expression, columns)
+        elif isinstance(expression, QueryRangeDefinition):
+            evaluated_vector = self.evaluate_range_definition(expression)
+        else:
+            raise QueryVectorizationError(f"Invalid expression found")
+        types_conform(evaluated_vector.query_type, expected_type)
+        return evaluated_vector
+
+    def evaluate_literal(self, literal_expression: QueryLitExpression) -> QueryVector:
+        literal = literal_expression.literal
+        if isinstance(literal, QueryIntLiteral):
+            if abs(int(literal.value)) > INT64_MAX:
+                raise QueryVectorizationError(f"Integer literal out of range")
+            return QueryVector(QueryIntType(), int(literal.value))
+        elif isinstance(literal, QueryBoolLiteral):
+            return QueryVector(QueryBoolType(), literal.value)
+        elif isinstance(literal, QueryCharLiteral):
+            return QueryVector(QueryCharType(), literal.value)
+        elif isinstance(literal, QueryStringLiteral):
+            return QueryVector(QueryStringType(), literal.value)
+        raise QueryVectorizationError(f"Invalid expression found")
+
+    def evaluate_reference(self, reference: QueryReference, columns: Dict[str, TableColumn]) -> QueryVector:
+        if reference.identifier not in columns:
+            raise QueryVectorizationError(f"Identifier \'{reference.identifier}\' does not exist in this scope")
+        return column_to_vector(columns[reference.identifier])
+
+    def evaluate_range_definition(self, range_definition: QueryRangeDefinition) -> QueryVector:
+        if isinstance(range_definition.start, QueryIntLiteral) and isinstance(range_definition.end, QueryIntLiteral):
+            start_value: int = range_definition.start.value
+            end_value: int = range_definition.end.value
+            if start_value >= 0 and end_value >= 0:
+                return QueryVector(QueryRangeType(), (start_value, end_value))
+        raise QueryVectorizationError(f"Invalid range definition")
+
+    def evaluate_arithmetic_operator(self, left: QueryVector, right: QueryVector, operator: QueryOperator) -> QueryVector:
+        both_int: bool = isinstance(left.query_type, QueryIntType) and isinstance(right.query_type, QueryIntType)
+        if operator.operator_type == QueryOperator.QueryOperatorType.PLUS:
+            if both_int and _max_abs(left) + _max_abs(right) <= INT64_MAX:
+                return QueryVector(QueryIntType(), left.data + right.data)
+            elif _is_string_like(left) and _is_string_like(right):
+                return QueryVector(QueryStringType(), left.data + right.data)
+        elif operator.operator_type == QueryOperator.QueryOperatorType.MINUS:
+            if both_int and _max_abs(left) + _max_abs(right) <= INT64_MAX:
+                return QueryVector(QueryIntType(), left.data - right.data)
+        elif operator.operator_type == QueryOperator.QueryOperatorType.MULTIPLY:
+            if both_int and _max_abs(left) * _max_abs(right) <= INT64_MAX:
+                return QueryVector(QueryIntType(), left.data * right.data)
+        elif operator.operator_type == QueryOperator.QueryOperatorType.DIVIDE:
+            if both_int and not _contains_zero(right) and \
+                    _max_abs(left) <= FLOAT64_EXACT_MAX and _max_abs(right) <= FLOAT64_EXACT_MAX:
+                if left.is_scalar() and right.is_scalar():
+                    return QueryVector(QueryIntType(), int(left.data / right.data))
+                return QueryVector(QueryIntType(), np.trunc(np.true_divide(left.data, right.data)).astype(np.int64))
+        elif operator.operator_type == QueryOperator.QueryOperatorType.MODULUS:
+            if both_int and not _contains_zero(right):
+                return QueryVector(QueryIntType(), left.data % right.data)
+        raise QueryVectorizationError(f"Invalid types for operator \'{operator.to_string()}\'")
+
+    def evaluate_boolean_operator(self, left: QueryVector, right: QueryVector, operator: QueryOperator) -> QueryVector:
+        both_int: bool = isinstance(left.query_type, QueryIntType) and isinstance(right.query_type, QueryIntType)
+        both_bool: bool = isinstance(left.query_type, QueryBoolType) and isinstance(right.query_type, QueryBoolType)
+        if operator.operator_type == QueryOperator.QueryOperatorType.GREATER_THAN and both_int:
+            return QueryVector(QueryBoolType(), left.data > right.data)
+        elif operator.operator_type == QueryOperator.QueryOperatorType.LESS_THAN and both_int:
+            return QueryVector(QueryBoolType(), left.data < right.data)
+        elif operator.operator_type == QueryOperator.QueryOperatorType.GREATER_THAN_EQUAL_TO and both_int:
+            return QueryVector(QueryBoolType(), left.data >= right.data)
+        elif operator.operator_type == QueryOperator.QueryOperatorType.LESS_THAN_EQUAL_TO and both_int:
+            return QueryVector(QueryBoolType(), left.data <= right.data)
+        elif operator.operator_type == QueryOperator.QueryOperatorType.EQUAL:
+            return QueryVector(QueryBoolType(), self.values_equal(left, right))
+        elif operator.operator_type == QueryOperator.QueryOperatorType.NOT_EQUAL:
+            return QueryVector(QueryBoolType(), np.logical_not(self.values_equal(left, right)))
+        elif operator.operator_type == QueryOperator.QueryOperatorType.AND and both_bool:
+            return QueryVector(QueryBoolType(), np.logical_and(left.data, right.data))
+        elif operator.operator_type == QueryOperator.QueryOperatorType.OR and both_bool:
+            return QueryVector(QueryBoolType(), np.logical_or(left.data, right.data))
+        raise QueryVectorizationError(f"Invalid types for operator \'{operator.to_string()}\'")
+
+    def values_equal(self, left: QueryVector, right: QueryVector) -> Any:
+        if type(left.query_type) is not type(right.query_type) or isinstance(left.query_type, QueryRangeType):
+            return False
+        if left.is_scalar() and right.is_scalar():
+            return left.data == right.data
+        return np.asarray(left.data == right.data, dtype=bool)
+
+    def evaluate_primitive(self, primitive: QueryPrimitive, columns: Dict[str, TableColumn]) -> QueryVector:
+        left: QueryVector = self.evaluate(primitive.left, columns, QueryUnknownType())
+        right: QueryVector = self.evaluate(primitive.right, columns, QueryUnknownType())
+        operator: QueryOperator = primitive.operator
+        if operator.is_arithmetic():
+            return self.evaluate_arithmetic_operator(left, right, operator)
+        elif operator.is_boolean():
+            return self.evaluate_boolean_operator(left, right, operator)
+        elif operator.is_contains() and isinstance(left.query_type, QueryIntType) and isinstance(right.query_type, QueryRangeType):
+            start_value, end_value = right.data
+            return QueryVector(QueryBoolType(), np.logical_and(start_value <= left.data, left.data <= end_value))
+        elif operator.is_not() and isinstance(right.query_type, QueryBoolType):
+            return QueryVector(QueryBoolType(), np.logical_not(right.data))
+        raise QueryVectorizationError(f"Invalid types for operator \'{operator.to_string()}\'")
@@ -46,6 +46,9 @@ class QueryOperator:
     def is_contains(self) -> bool:
         return self.operator_type == QueryOperator.QueryOperatorType.IN
 
+    def is_not(self) -> bool:
+        return self.operator_type == QueryOperator.QueryOperatorType.NOT
+
     def get_precedence(self) -> int:
         if self.operator_type == QueryOperator.QueryOperatorType.AND or \
                 self.operator_type == QueryOperator.QueryOperatorType.OR:
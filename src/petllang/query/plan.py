@@ -0,0 +1,404 @@
+import csv
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from petllang.builtins.csv_reader import CSV_CHUNK_SIZE, CsvColumnConverter, create_column_converters, \
+    get_schema_mismatch_error, read_csv_chunks
+from petllang.phases.interpreter.definitions.types import PetlType, SchemaType, TableType
+from petllang.phases.interpreter.definitions.value import SchemaValue, TableColumn, TableValue, StringValue
+from petllang.query.executor import CompiledQuery, select_row_indices, join_row_indices
+from petllang.query.parser.expression import QueryExpression
+from petllang.query.planner import split_conjuncts, join_conjuncts, get_referenced_identifiers
+
+
+def copy_schema(schema: SchemaValue, indices: Optional[List[int]] = None) -> SchemaValue:
+    schema_values: List[Tuple[StringValue, PetlType]] = list(schema.values) if indices is None \
+        else [schema.values[index] for index in indices]
+    return SchemaValue(SchemaType(list(map(lambda sv: sv[1], schema_values))), schema_values)
+
+
+def get_binding_index(schema: SchemaValue, identifier: str, table_name: Optional[str] = None) -> int:
+    # Query variables are bound column by column, so a repeated column name refers to the last column with that name
+    binding_index = -1
+    for index, (column_name, _) in enumerate(schema.values):
+        if (f"{table_name}.{column_name.value}" if table_name else column_name.value) == identifier:
+            binding_index = index
+    return binding_index
+
+
+class PlanNode(ABC):
+    def __init__(self, schema: SchemaValue):
+        self.schema = schema
+
+    def column_count(self) -> int:
+        return len(self.schema.values)
+
+    def to_table_value(self, columns: List[TableColumn], row_count: int) -> TableValue:
+        return TableValue(TableType(self.schema.petl_type), self.schema, columns=columns, row_count=row_count)
+
+    @abstractmethod
+    def execute(self) -> TableValue:
+        pass
+
+    # Produces the result as a sequence of tables, nodes that can work on part of their input stream it through
+    def execute_chunks(self) -> Iterator[TableValue]:
+        yield self.execute()
+
+    def is_streaming(self) -> bool:
+        return False
+
+    def inputs(self) -> List['PlanNode']:
+        return []
+
+    def collect(self) -> TableValue:
+        return optimize_plan(self).execute()
+
+    def stream(self) -> Iterator[TableValue]:
+        return optimize_plan(self).execute_chunks()
+
+    # Plan nodes only change by caching their result or counting the plans built on them, which holds for every copy
+    # of a lazy table, so the copies can share them
+    def __deepcopy__(self, memo) -> 'PlanNode':
+        return self
+
+
+class ScanNode(PlanNode):
+    def __init__(self, schema: SchemaValue, columns: List[TableColumn], row_count: int):
+        PlanNode.__init__(self, schema)
+        self.columns = columns
+        self.row_count = row_count
+
+    def execute(self) -> TableValue:
+        return self.to_table_value(list(self.columns), self.row_count)
+
+
+class CsvScanNode(PlanNode):
+    def __init__(self, schema: SchemaValue, path: Path, header: bool, token, error, chunk_size: int = CSV_CHUNK_SIZE):
+        PlanNode.__init__(self, schema)
+        self.path = path
+        self.header = header
+        self.chunk_size = chunk_size
+        self.token = token
+        self.error = error
+
+    def execute(self) -> TableValue:
+        chunks: List[TableValue] = list(self.execute_chunks())
+        if not chunks:
+            return self.to_table_value([TableColumn.from_values(column_type, []) for _, column_type in self.schema.values], 0)
+        elif len(chunks) == 1:
+            return chunks[0]
+        columns: List[TableColumn] = [TableColumn.concat_all([chunk.columns[index] for chunk in chunks])
+                                      for index in range(self.column_count())]
+        return self.to_table_value(columns, sum(chunk.row_count() for chunk in chunks))
+
+    def execute_chunks(self) -> Iterator[TableValue]:
+        converters: List[CsvColumnConverter] = create_column_converters(self.schema, self.token, self.error)
+        try:
+            csv_file = open(self.path, mode='r')
+        except OSError as read_csv_exception:
+            self.error(f"Failed to read CSV: {self.path}: {read_csv_exception}", self.token)
+            return
+        with csv_file:
+            csv_rows: Iterator[List[str]] = csv.reader(csv_file)
+            if self.header:
+                next(csv_rows, None)
+            row_number: int = 2 if self.header else 1
+            for chunk in read_csv_chunks(csv_rows, self.chunk_size):
+                for row_index, row in enumerate(chunk):
+                    if len(row) != self.column_count():
+                        self.error(f"CSV row {row_number + row_index} has {len(row)} value(s), "
+                                   f"schema expects {self.column_count()}", self.token)
+                columns: List[TableColumn] = [converter.convert_cells([row[index] for row in chunk], row_number)
+                                              for index, converter in enumerate(converters)]
+                schema_mismatch_error: Optional[str] = get_schema_mismatch_error(converters)
+                if schema_mismatch_error:
+                    self.error(schema_mismatch_error, self.token)
+                yield self.to_table_value(columns, len(chunk))
+                row_number += len(chunk)
+
+    def is_streaming(self) -> bool:
+        return True
+
+
+class FilterNode(PlanNode):
+    def __init__(self, child: PlanNode, query: CompiledQuery, root: QueryExpression, token, error):
+        PlanNode.__init__(self, child.schema)
+        self.child = child
+        self.query = query
+        self.root = root
+        self.token = token
+        self.error = error
+
+    def with_child(self, child: PlanNode, root: Optional[QueryExpression] = None) -> 'FilterNode':
+        return FilterNode(child, self.query, root if root is not None else self.root, self.token, self.error)
+
+    def execute(self) -> TableValue:
+        return self.filter(self.child.execute())
+
+    def execute_chunks(self) -> Iterator[TableValue]:
+        for chunk in self.child.execute_chunks():
+            yield self.filter(chunk)
+
+    def is_streaming(self) -> bool:
+        return self.child.is_streaming()
+
+    def inputs(self) -> List[PlanNode]:
+        return [self.child]
+
+    def filter(self, table_value: TableValue) -> TableValue:
+        selected_row_indices: List[int] = select_row_indices(table_value, self.query, self.root, self.token, self.error)
+        if len(selected_row_indices) == table_value.row_count():
+            return table_value
+        return self.to_table_value([column.take(selected_row_indices) for column in table_value.columns],
+                                   len(selected_row_indices))
+
+
+class ProjectNode(PlanNode):
+    def __init__(self, child: PlanNode, indices: List[int], schema: Optional[SchemaValue] = None):
+        PlanNode.__init__(self, schema if schema is not None else copy_schema(child.schema, indices))
+        self.child = child
+        self.indices = indices
+
+    def execute(self) -> TableValue:
+        return self.project(self.child.execute())
+
+    def execute_chunks(self) -> Iterator[TableValue]:
+        for chunk in self.child.execute_chunks():
+            yield self.project(chunk)
+
+    def is_streaming(self) -> bool:
+        return self.child.is_streaming()
+
+    def inputs(self) -> List[PlanNode]:
+        return [self.child]
+
+    def project(self, table_value: TableValue) -> TableValue:
+        return self.to_table_value([table_value.columns[index] for index in self.indices], table_value.row_count())
+
+
+class JoinNode(PlanNode):
+    def __init__(self, left: PlanNode, right: PlanNode, query: CompiledQuery, left_indices: List[int],
+                 right_indices: List[int], schema: SchemaValue, token, error):
+        PlanNode.__init__(self, schema)
+        self.left = left
+        self.right = right
+        self.query = query
+        self.left_indices = left_indices
+        self.right_indices = right_indices
+        self.token = token
+        self.error = error
+
+    def with_inputs(self, left: PlanNode, right: PlanNode, left_indices: List[int], right_indices: List[int],
+                    schema: SchemaValue) -> 'JoinNode':
+        return JoinNode(left, right, self.query, left_indices, right_indices, schema, self.token, self.error)
+
+    def get_source(self, index: int) -> Tuple[PlanNode, int]:
+        if index < len(self.left_indices):
+            return self.left, self.left_indices[index]
+        return self.right, self.right_indices[index - len(self.left_indices)]
+
+    def execute(self) -> TableValue:
+        left_table_value: TableValue = self.left.execute()
+        right_table_value: TableValue = self.right.execute()
+        joined_indices = join_row_indices(left_table_value, right_table_value, self.query, self.token, self.error)
+        left_rows = [joined_index[0] for joined_index in joined_indices]
+        right_rows = [joined_index[1] for joined_index in joined_indices]
+        columns = [left_table_value.columns[index].take(left_rows) for index in self.left_indices] + \
+                  [right_table_value.columns[index].take(right_rows) for index in self.right_indices]
+        return self.to_table_value(columns, len(joined_indices))
+
+    def is_streaming(self) -> bool:
+        return self.left.is_streaming() or self.right.is_streaming()
+
+    def inputs(self) -> List[PlanNode]:
+        return [self.left, self.right]
+
+
+class AppendNode(PlanNode):
+    def __init__(self, child: PlanNode, columns: List[TableColumn], row_count: int):
+        PlanNode.__init__(self, child.schema)
+        self.child = child
+        self.columns = columns
+        self.row_count = row_count
+
+    def execute(self) -> TableValue:
+        table_value: TableValue = self.child.execute()
+        columns = [column.concat(appended) for column, appended in zip(table_value.columns, self.columns)]
+        return self.to_table_value(columns, table_value.row_count() + self.row_count)
+
+    def execute_chunks(self) -> Iterator[TableValue]:
+        yield from self.child.execute_chunks()
+        yield self.to_table_value(self.columns, self.row_count)
+
+    def is_streaming(self) -> bool:
+        return self.child.is_streaming()
+
+    def inputs(self) -> List[PlanNode]:
+        return [self.child]
+
+
+class SharedNode(PlanNode):
+    # The plan of a lazy table, which the plans of the tables built from it read. Those plans are counted as they are
+    # built, while only one reads it the optimizer sees through it, once it is shared it is optimized on its own and
+    # executed only once
+    def __init__(self, child: PlanNode):
+        PlanNode.__init__(self, child.schema)
+        self.child = child
+        self.consumers = 0
+        self.result: Optional[TableValue] = None
+
+    def is_shared(self) -> bool:
+        return self.consumers > 1 or self.result is not None
+
+    def execute(self) -> TableValue:
+        if self.result is None:
+            self.result = self.child.collect()
+        return self.result
+
+    def is_streaming(self) -> bool:
+        return not self.is_shared() and self.child.is_streaming()
+
+    def inputs(self) -> List[PlanNode]:
+        return [self.child]
+
+
+def table_plan(table_value: TableValue) -> Optional[PlanNode]:
+    if table_value.is_lazy():
+        return table_value.plan
+    columns: Optional[List[TableColumn]] = table_value.get_columns()
+    if columns is None:
+        return None
+    return ScanNode(copy_schema(table_value.schema), list(columns), table_value.row_count())
+
+
+def count_consumers(plan: PlanNode):
+    # A new plan reads the plans of the lazy tables it was built from
+    for input_plan in plan.inputs():
+        if isinstance(input_plan, SharedNode):
+            input_plan.consumers += 1
+        else:
+            count_consumers(input_plan)
+
+
+def lazy_table_value(plan: PlanNode) -> TableValue:
+    schema: SchemaValue = copy_schema(plan.schema)
+    count_consumers(plan)
+    shared_plan: PlanNode = plan if isinstance(plan, (ScanNode, CsvScanNode)) else SharedNode(plan)
+    return TableValue(TableType(schema.petl_type), schema, plan=shared_plan)
+
+
+# Optimizer #
+def optimize_plan(plan: PlanNode) -> PlanNode:
+    plan = push_down_filters(plan)
+    optimized_plan, _ = prune_columns(plan, set(range(plan.column_count())))
+    return optimized_plan
+
+
+def push_down_filters(plan: PlanNode) -> PlanNode:
+    if isinstance(plan, FilterNode):
+        return push_filter(push_down_filters(plan.child), plan, plan.root)
+    elif isinstance(plan, ProjectNode):
+        return ProjectNode(push_down_filters(plan.child), plan.indices, plan.schema)
+    elif isinstance(plan, JoinNode):
+        return plan.with_inputs(push_down_filters(plan.left), push_down_filters(plan.right),
+                                plan.left_indices, plan.right_indices, plan.schema)
+    elif isinstance(plan, AppendNode):
+        return AppendNode(push_down_filters(plan.child), plan.columns, plan.row_count)
+    elif isinstance(plan, SharedNode) and not plan.is_shared():
+        return push_down_filters(plan.child)
+    return plan
+
+
+def get_pushed_down_source(plan: PlanNode, identifiers: List[str]) -> Optional[PlanNode]:
+    # A predicate can move to the input of a projection or join if all of its columns come from that one input
+    # and bind to the same columns there
+    sources: List[Tuple[PlanNode, int]] = []
+    for identifier in identifiers:
+        binding_index = get_binding_index(plan.schema, identifier)
+        if binding_index == -1:
+            return None
+        if isinstance(plan, ProjectNode):
+            sources.append((plan.child, plan.indices[binding_index]))
+        elif isinstance(plan, JoinNode):
+            sources.append(plan.get_source(binding_index))
+    if not sources or any(source is not sources[0][0] for source, _ in sources):
+        return None
+    source: PlanNode = sources[0][0]
+    if all(get_binding_index(source.schema, identifier) == index for identifier, (_, index) in zip(identifiers, sources)):
+        return source
+    return None
+
+
+def push_filter(plan: PlanNode, filter_node: FilterNode, root: QueryExpression) -> PlanNode:
+    if isinstance(plan, ProjectNode):
+        if get_pushed_down_source(plan, get_referenced_identifiers(root)) is plan.child:
+            return ProjectNode(push_filter(plan.child, filter_node, root), plan.indices, plan.schema)
+    elif isinstance(plan, JoinNode):
+        left_conjuncts: List[QueryExpression] = []
+        right_conjuncts: List[QueryExpression] = []
+        remaining_conjuncts: List[QueryExpression] = []
+        for conjunct in split_conjuncts(root):
+            source: Optional[PlanNode] = get_pushed_down_source(plan, get_referenced_identifiers(conjunct))
+            if source is plan.left:
+                left_conjuncts.append(conjunct)
+            elif source is plan.right:
+                right_conjuncts.append(conjunct)
+            else:
+                remaining_conjuncts.append(conjunct)
+        if left_conjuncts or right_conjuncts:
+            left: PlanNode = push_filter(plan.left, filter_node, join_conjuncts(left_conjuncts)) if left_conjuncts else plan.left
+            right: PlanNode = push_filter(plan.right, filter_node, join_conjuncts(right_conjuncts)) if right_conjuncts else plan.right
+            joined: PlanNode = plan.with_inputs(left, right, plan.left_indices, plan.right_indices, plan.schema)
+            if remaining_conjuncts:
+                return filter_node.with_child(joined, join_conjuncts(remaining_conjuncts))
+            return joined
+    return filter_node.with_child(plan, root)
+
+
+def prune_columns(plan: PlanNode, required: Set[int]) -> Tuple[PlanNode, Dict[int, int]]:
+    # Returns a plan producing at least the required columns, and where each kept column moved to
+    if isinstance(plan, ScanNode):
+        if len(required) == plan.column_count():
+            return plan, {index: index for index in range(plan.column_count())}
+        kept: List[int] = sorted(required)
+        return ProjectNode(plan, kept), {index: position for position, index in enumerate(kept)}
+    elif isinstance(plan, ProjectNode):
+        kept: List[int] = sorted(required)
+        child, child_mapping = prune_columns(plan.child, {plan.indices[index] for index in kept})
+        indices: List[int] = [child_mapping[plan.indices[index]] for index in kept]
+        if isinstance(child, ProjectNode):
+            child, indices = child.child, [child.indices[index] for index in indices]
+        schema: SchemaValue = plan.schema if len(kept) == plan.column_count() else copy_schema(plan.schema, kept)
+        mapping: Dict[int, int] = {index: position for position, index in enumerate(kept)}
+        if indices == list(range(child.column_count())):
+            return child, mapping
+        return ProjectNode(child, indices, schema), mapping
+    elif isinstance(plan, FilterNode):
+        referenced: Set[int] = {get_binding_index(plan.schema, identifier) for identifier in get_referenced_identifiers(plan.root)}
+        child, child_mapping = prune_columns(plan.child, required | (referenced - {-1}))
+        return plan.with_child(child), child_mapping
+    elif isinstance(plan, JoinNode):
+        identifiers: List[str] = get_referenced_identifiers(plan.query.root)
+        kept_left: List[int] = [index for index in sorted(required) if index < len(plan.left_indices)]
+        kept_right: List[int] = [index - len(plan.left_indices) for index in sorted(required) if index >= len(plan.left_indices)]
+
+        def prune_join_input(source: PlanNode, source_indices: List[int], kept_indices: List[int],
+                             table_name: str) -> Tuple[PlanNode, List[int]]:
+            referenced_indices = {get_binding_index(source.schema, identifier, table_name) for identifier in identifiers}
+            source_required = {source_indices[index] for index in kept_indices} | (referenced_indices - {-1})
+            pruned_source, source_mapping = prune_columns(source, source_required)
+            return pruned_source, [source_mapping[source_indices[index]] for index in kept_indices]
+
+        left, left_indices = prune_join_input(plan.left, plan.left_indices, kept_left, "left")
+        right, right_indices = prune_join_input(plan.right, plan.right_indices, kept_right, "right")
+        kept: List[int] = sorted(required)
+        schema: SchemaValue = plan.schema if len(kept) == plan.column_count() else copy_schema(plan.schema, kept)
+        return plan.with_inputs(left, right, left_indices, right_indices, schema), \
+            {index: position for position, index in enumerate(kept)}
+    elif isinstance(plan, AppendNode):
+        child, child_mapping = prune_columns(plan.child, required)
+        kept_columns: List[TableColumn] = [plan.columns[index] for index, _ in sorted(child_mapping.items(), key=lambda m: m[1])]
+        return AppendNode(child, kept_columns, plan.row_count), child_mapping
+    return plan, {index: index for index in range(plan.column_count())}
+# end optimizer #
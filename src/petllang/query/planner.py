@@ -0,0 +1,65 @@
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from petllang.query.interpreter.types import QueryBoolType
+from petllang.query.parser.expression import QueryExpression, QueryPrimitive, QueryReference
+from petllang.query.parser.operator import QueryOperator
+
+
+@dataclass
+class JoinPlan:
+    key_columns: List[Tuple[str, str]] = field(default_factory=list)
+    residual: Optional[QueryExpression] = None
+
+    def is_hash_join(self) -> bool:
+        return len(self.key_columns) > 0
+
+
+def split_conjuncts(expression: QueryExpression) -> List[QueryExpression]:
+    if isinstance(expression, QueryPrimitive) and expression.operator.operator_type == QueryOperator.QueryOperatorType.AND:
+        return split_conjuncts(expression.left) + split_conjuncts(expression.right)
+    return [expression]
+
+
+def join_conjuncts(conjuncts: List[QueryExpression]) -> Optional[QueryExpression]:
+    if not conjuncts:
+        return None
+    joined: QueryExpression = conjuncts[0]
+    for conjunct in conjuncts[1:]:
+        joined = QueryPrimitive(QueryBoolType(), QueryOperator(QueryOperator.QueryOperatorType.AND), joined, conjunct)
+    return joined
+
+
+def get_equi_join_columns(conjunct: QueryExpression,
+                          left_columns: List[str],
+                          right_columns: List[str]) -> Optional[Tuple[str, str]]:
+    if isinstance(conjunct, QueryPrimitive) and conjunct.operator.operator_type == QueryOperator.QueryOperatorType.EQUAL and \
+            isinstance(conjunct.left, QueryReference) and isinstance(conjunct.right, QueryReference):
+        left_identifier: str = conjunct.left.identifier
+        right_identifier: str = conjunct.right.identifier
+        if left_identifier in left_columns and right_identifier in right_columns:
+            return left_identifier, right_identifier
+        elif right_identifier in left_columns and left_identifier in right_columns:
+            return right_identifier, left_identifier
+    return None
+
+
+def plan_join(root: QueryExpression, left_columns: List[str], right_columns: List[str]) -> JoinPlan:
+    plan: JoinPlan = JoinPlan()
+    residual_conjuncts: List[QueryExpression] = []
+    for conjunct in split_conjuncts(root):
+        key_columns: Optional[Tuple[str, str]] = get_equi_join_columns(conjunct, left_columns, right_columns)
+        if key_columns:
+            plan.key_columns.append(key_columns)
+        else:
+            residual_conjuncts.append(conjunct)
+    plan.residual = join_conjuncts(residual_conjuncts)
+    return plan
+
+
+def get_referenced_identifiers(expression: QueryExpression) -> List[str]:
+    if isinstance(expression, QueryReference):
+        return [expression.identifier]
+    elif isinstance(expression, QueryPrimitive):
+        return get_referenced_identifiers(expression.left) + get_referenced_identifiers(expression.right)
+    return []
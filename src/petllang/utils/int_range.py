@@ -0,0 +1,31 @@
+from typing import Any, Callable, Iterator
+
+
+# Inclusive run of integers from start to end, counting down when end is the smaller bound. Length, indexing and
+# membership are computed from the bounds, elements are only made when they are read.
+class IntRange:
+    __slots__ = ("start", "end", "range", "value_factory")
+
+    def __init__(self, start: int, end: int, value_factory: Callable[[int], Any] = int):
+        self.start: int = start
+        self.end: int = end
+        self.range: range = range(start, end + 1) if start <= end else range(start, end - 1, -1)
+        self.value_factory: Callable[[int], Any] = value_factory
+
+    def __len__(self) -> int:
+        return len(self.range)
+
+    def __iter__(self) -> Iterator[Any]:
+        return map(self.value_factory, self.range)
+
+    def __reversed__(self) -> Iterator[Any]:
+        return map(self.value_factory, reversed(self.range))
+
+    def __getitem__(self, index: int) -> Any:
+        return self.value_factory(self.range[index])
+
+    def __contains__(self, value: int) -> bool:
+        return value in self.range
+
+    def position(self, value: int) -> int:
+        return self.range.index(value) if value in self.range else -1
@@ -3,11 +3,11 @@ from enum import Enum, EnumMeta
 
 class PetlMetaEnum(EnumMeta):
     def __contains__(cls, item):
+        # Checked for every character the lexer reads, so values are looked up without constructing a member
         try:
-            cls(item)
-        except ValueError:
+            return item in cls._value2member_map_
+        except TypeError:
             return False
-        return True
 
 
 class PetlBaseEnum(Enum, metaclass=PetlMetaEnum):
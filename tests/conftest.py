@@ -0,0 +1,10 @@
+import pytest
+
+from petllang.builtins import csv_cache
+
+
+@pytest.fixture(autouse=True)
+def csv_cache_directory(tmp_path, monkeypatch):
+    # Tables read by tests are cached in the test's temporary directory instead of the user's cache
+    monkeypatch.setattr(csv_cache, "csv_cache_directory", tmp_path / "csv_cache")
+    return tmp_path / "csv_cache"
@@ -41,6 +41,10 @@ def test_read_csv(mocker, capsys):
     assert "Bob" in read_csv_result and "45" in read_csv_result and "$100000" in read_csv_result
 
 
+def test_scan_csv(mocker, capsys):
+    assert get_petl_program_stdout(f"{directory_prefix}/scanCsv.petl", mocker, capsys) == "2"
+
+
 def test_write_csv(mocker, capsys):
     assert get_petl_program_stdout(f"{directory_prefix}/writeCsv.petl", mocker, capsys) == "Created successfully"
     csv_path = Path("resources/examples/csvs/test_write.csv")
@@ -4,6 +4,10 @@ from tests.tests.programs.test_petl_program import get_petl_program_stdout
 directory_prefix = "resources/examples/programs/sanity/for"
 
 
+def test_for_loop_body_scope(mocker, capsys):
+    assert get_petl_program_stdout(f"{directory_prefix}/for_loop_body_scope.petl", mocker, capsys) == """1\n3\n2\n3\n3\n3\n1\n2"""
+
+
 def test_for_loop_over_list_def_single_reference(mocker, capsys):
     assert get_petl_program_stdout(f"{directory_prefix}/for_loop_over_list_def_single_reference.petl", mocker, capsys) == """0\n1\n2\n3\n4\n5"""
 
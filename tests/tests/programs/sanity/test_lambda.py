@@ -8,6 +8,10 @@ def test_lambda_closure(mocker, capsys):
     assert get_petl_program_stdout(f"{directory_prefix}/lambda_closure.petl", mocker, capsys) == """7"""
 
 
+def test_lambda_closure_shadowed(mocker, capsys):
+    assert get_petl_program_stdout(f"{directory_prefix}/lambda_closure_shadowed.petl", mocker, capsys) == """1\n3\n3"""
+
+
 def test_mutually_recursive(mocker, capsys):
     assert not get_petl_program_stdout(f"{directory_prefix}/mutually_recursive.petl", mocker, capsys) == """"""
 
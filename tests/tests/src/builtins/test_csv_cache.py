@@ -0,0 +1,75 @@
+import os
+from pathlib import Path
+
+from backend.utils.config import Config
+from petllang.builtins import csv_cache
+from petllang.builtins.csv_cache import get_cache_path, load_cached_table, store_cached_table
+from petllang.phases.interpreter.definitions.types import IntType, StringType, BoolType, UnionType, NoneType, SchemaType, \
+    TableType
+from petllang.phases.interpreter.definitions.value import SchemaValue, StringValue, IntValue, BoolValue, NoneValue, \
+    TableValue, TableColumn
+
+
+def _table():
+    column_types = [StringType(), IntType(), UnionType([BoolType(), NoneType()])]
+    schema = SchemaValue(SchemaType(column_types), [(StringValue("name"), column_types[0]),
+                                                    (StringValue("age"), column_types[1]),
+                                                    (StringValue("active"), column_types[2])])
+    columns = [TableColumn.from_values(column_types[0], [StringValue("Alice"), StringValue("")]),
+               TableColumn.from_values(column_types[1], [IntValue(27), IntValue(-3)]),
+               TableColumn.from_values(column_types[2], [BoolValue(True), NoneValue()])]
+    return TableValue(TableType(schema.petl_type), schema, columns=columns)
+
+
+def test_cached_table_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_cache, "csv_cache_enabled", True)
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text("name,age,active\nAlice,27,true\n,-3,\n")
+    table_value = _table()
+
+    cache_path = get_cache_path(csv_path, table_value.schema, True)
+    assert load_cached_table(cache_path, table_value.schema) is None
+    store_cached_table(table_value, cache_path)
+    cached_table_value = load_cached_table(cache_path, table_value.schema)
+    assert [row.to_string() for row in cached_table_value.rows] == ["(Alice, 27, true)", "(, -3, none)"]
+
+    assert get_cache_path(csv_path, table_value.schema, False) != cache_path
+    os.utime(csv_path, ns=(0, 0))
+    assert get_cache_path(csv_path, table_value.schema, True) != cache_path
+
+
+def test_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_cache, "csv_cache_enabled", True)
+    table_value = _table()
+    cache_paths = []
+    for index in range(3):
+        csv_path = tmp_path / f"rows{index}.csv"
+        csv_path.write_text("name,age,active\n")
+        cache_paths.append(get_cache_path(csv_path, table_value.schema, True))
+        store_cached_table(table_value, cache_paths[-1])
+        os.utime(cache_paths[-1], (index, index))
+    monkeypatch.setattr(csv_cache, "csv_cache_size", 2 * os.path.getsize(cache_paths[0]))
+    csv_cache.evict_cached_tables()
+    assert [cache_path.exists() for cache_path in cache_paths] == [False, True, True]
+
+
+def test_cache_outside_working_directory(csv_cache_directory):
+    assert csv_cache.csv_cache_directory == csv_cache_directory
+    assert Config.CSV.CACHE.DIRECTORY.is_absolute() and Path.cwd() not in Config.CSV.CACHE.DIRECTORY.parents
+
+
+def test_cached_text_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_cache, "csv_cache_enabled", True)
+    csv_path = tmp_path / "text.csv"
+    csv_path.write_text("text\n")
+    texts = ["Zoë", "trailing\0", "", "x" * 10000]
+    schema = SchemaValue(SchemaType([StringType()]), [(StringValue("text"), StringType())])
+    table_value = TableValue(TableType(schema.petl_type), schema,
+                             columns=[TableColumn.from_values(StringType(), [StringValue(text) for text in texts])])
+
+    cache_path = get_cache_path(csv_path, schema, True)
+    store_cached_table(table_value, cache_path)
+    assert os.path.getsize(cache_path) < 2 * 10000
+    column = load_cached_table(cache_path, schema).columns[0]
+    assert column.load_data is not None and len(column) == len(texts)
+    assert column.data.tolist() == texts and column.load_data is None
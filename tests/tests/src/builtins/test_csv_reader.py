@@ -0,0 +1,82 @@
+from petllang.builtins import csv_reader
+from petllang.builtins.csv_reader import create_column_converters, csv_rows_to_table_value, get_schema_mismatch_error, \
+    read_csv_table_value
+from petllang.phases.interpreter.definitions.types import IntType, StringType, BoolType, UnionType, NoneType, SchemaType
+from petllang.phases.interpreter.definitions.value import SchemaValue, StringValue
+
+
+def _error(text, token):
+    raise Exception(text)
+
+
+def _schema():
+    column_types = [StringType(), IntType(), UnionType([BoolType(), NoneType()])]
+    return SchemaValue(SchemaType(column_types), [(StringValue("name"), column_types[0]),
+                                                  (StringValue("age"), column_types[1]),
+                                                  (StringValue("active"), column_types[2])])
+
+
+def test_typed_columns():
+    schema = _schema()
+    converters = create_column_converters(schema, None, _error)
+    table_value = csv_rows_to_table_value(schema, converters, [["Alice", "27", "true"], ["42", "-3", ""]], 2)
+    assert get_schema_mismatch_error(converters) is None
+    assert table_value.is_columnar()
+    assert [row.to_string() for row in table_value.rows] == ["(Alice, 27, true)", "(42, -3, none)"]
+
+
+def test_mismatch_reported_once_per_column():
+    schema = _schema()
+    converters = create_column_converters(schema, None, _error)
+    csv_rows_to_table_value(schema, converters, [["Alice", "x", "yes"], ["Bob", "", "true"], ["Carl", "y", "no"]], 2)
+    assert get_schema_mismatch_error(converters) == \
+           "CSV values do not match schema: " \
+           "column 'age' expects int, found 3 invalid value(s) (first on row 3: ''), " \
+           "column 'active' expects union[bool, none], found 2 invalid value(s) (first on row 2: 'yes')"
+
+
+def test_int_cells_parsed_strictly():
+    schema = _schema()
+    converters = create_column_converters(schema, None, _error)
+    rows = [["Alice", cell, "true"] for cell in ["-12", "007", "1_000", " 5 ", "+5", "\u0663", "-"]]
+    table_value = csv_rows_to_table_value(schema, converters, rows, 2)
+    assert [row.to_string() for row in table_value.rows][:2] == ["(Alice, -12, true)", "(Alice, 7, true)"]
+    assert get_schema_mismatch_error(converters) == \
+           "CSV values do not match schema: " \
+           "column 'age' expects int, found 5 invalid value(s) (first on row 4: '1_000')"
+
+
+def test_ragged_rows():
+    schema = _schema()
+    converters = create_column_converters(schema, None, _error)
+    table_value = csv_rows_to_table_value(schema, converters, [["Alice", "27"], ["Bob", "3", "false", "extra"]], 1)
+    assert get_schema_mismatch_error(converters) is None
+    assert not table_value.is_columnar()
+    assert len(table_value.rows) == 2
+
+
+def test_parallel_read_matches_serial(tmp_path, monkeypatch):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text("name,age,active\n" +
+                        "".join(f"\"n,{i}\n\"\"x\"\"\",{i},{'true' if i % 3 else ''}\n" for i in range(50)))
+    monkeypatch.setattr(csv_reader, "CSV_PARALLEL_MIN_SIZE", 0)
+    monkeypatch.setattr(csv_reader, "CSV_CHUNK_SIZE", 8)
+
+    def read(workers):
+        monkeypatch.setattr(csv_reader, "csv_workers", workers)
+        schema = _schema()
+        converters = create_column_converters(schema, None, _error)
+        table_value = read_csv_table_value(schema, converters, csv_path, True, None, _error)
+        return [[value.to_string() for value in row.values] for row in table_value.rows]
+
+    serial_rows = read(1)
+    assert len(serial_rows) == 50 and serial_rows[1] == ["n,1\n\"x\"", "1", "true"]
+    assert read(3) == serial_rows
+
+
+def test_record_starts_follow_quotes(tmp_path):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_bytes(b"a,\"b\nc\"\r\n\"\"\"d\"\"\",e\n\"\",f\n")
+    assert csv_reader.get_record_starts(csv_path, *csv_reader.scan_csv_lines(csv_path)).tolist() == [0, 9, 19]
+    csv_path.write_bytes(b"a,b\"\nc,d\"\n")
+    assert csv_reader.get_record_starts(csv_path, *csv_reader.scan_csv_lines(csv_path)) is None
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+import pytest
+
+from petllang.execution.execute import execute_petl_script
+from petllang.utils.log import Log
+
+programs_directory = Path("resources/examples/programs")
+# Non-deterministic, interactive or slow
+skipped_programs = {"rand.petl", "readln.petl", "stress.petl"}
+programs = sorted(str(path) for directory in ["sanity", "features", "builtins"]
+                  for path in (programs_directory / directory).rglob("*.petl") if path.name not in skipped_programs)
+
+
+@pytest.fixture(autouse=True)
+def written_csvs():
+    # Example programs like writeCsv.petl write next to the CSVs they read, the files they add are removed afterwards
+    csvs_directory = Path("resources/examples/csvs")
+    existing_paths = set(csvs_directory.iterdir())
+    yield
+    for path in set(csvs_directory.iterdir()) - existing_paths:
+        path.unlink()
+
+
+def pytest_generate_tests(metafunc):
+    # A test taking a program runs once for every example program
+    if "program" in metafunc.fixturenames:
+        metafunc.parametrize("program", programs)
+
+
+@pytest.fixture
+def run_petl(capsys):
+    # Runs a script with the given engine and execute_petl_script options, returning what it printed
+    def run(petl_raw_str: str, engine: str, **options) -> str:
+        execute_petl_script(petl_raw_str, False, Log(), engine=engine, **options)
+        return capsys.readouterr().out
+    return run
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from petllang.phases.interpreter.closure_interpreter import ClosureInterpreter
+from petllang.phases.interpreter.definitions.types import AnyType
+from petllang.phases.interpreter.definitions.value import IntValue
+from petllang.phases.interpreter.environment import InterpreterEnvironment
+from petllang.phases.lexer.lexer import Lexer
+from petllang.phases.parser.parser import Parser
+
+
+def test_closure_engine_matches_tree_walker(program, run_petl):
+    petl_raw_str = Path(program).read_text()
+    assert run_petl(petl_raw_str, "closure") == run_petl(petl_raw_str, "tree")
+
+
+def test_closure_engine_compiles_once():
+    tokens = Lexer().scan("let a = 2; let f = |x: int| -> int { x * a }; f(3) + f(4)")
+    root = Parser().parse(tokens)
+    interpreter = ClosureInterpreter()
+
+    result = interpreter.interpret(root, InterpreterEnvironment())
+    assert isinstance(result, IntValue) and result.value == 14
+    compiled_count = len(interpreter.compiled_expressions)
+    assert interpreter.compile(root) is interpreter.compile(root)
+    interpreter.evaluate(root, InterpreterEnvironment(), AnyType())
+    assert len(interpreter.compiled_expressions) == compiled_count
+    assert interpreter.descent_counter == 0
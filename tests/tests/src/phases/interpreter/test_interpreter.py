@@ -0,0 +1,97 @@
+import pytest
+
+from petllang.builtins.builtin_definitions import Builtin
+from petllang.builtins.int_petl_builtins import Sum
+from petllang.execution.execute import INTERPRETER_ENGINES
+from petllang.phases.interpreter.definitions.types import UnknownType, IntType, ListType
+from petllang.phases.interpreter.definitions.value import int_value, ListValue
+from petllang.phases.interpreter.environment import InterpreterEnvironment
+from petllang.phases.interpreter.interpreter import TreeWalkInterpreter
+from petllang.phases.lexer.lexer import Lexer
+from petllang.phases.parser.defintions.expression import Application
+from petllang.phases.parser.parser import Parser
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "vm"])
+def test_long_script_runs_in_constant_depth(engine, run_petl):
+    statement_count = 10000
+    petl_raw_str = "let a = 0;\n" + "let a = a + 1;\nprintln(\"\");\n" * statement_count + "println(a)"
+    output: str = run_petl(petl_raw_str, engine)
+    assert output.endswith(f"{statement_count}\n")
+    assert "Maximum expression depth exceeded" not in output
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "vm"])
+def test_empty_loop_skips_rest_of_block(engine, run_petl):
+    petl_raw_str = "println(1); for c in \"\" { println(2) }; println(3); for i in 0~1 { println(i) }; println(4)"
+    assert run_petl(petl_raw_str, engine) == "1\n"
+    petl_raw_str = "println(1); for i in 0~1 { println(i) }; println(3)"
+    assert run_petl(petl_raw_str, engine) == "1\n0\n1\n3\n"
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "vm"])
+def test_closures_capture_referenced_bindings(engine, run_petl):
+    petl_raw_str = "let a = 10;\nlet b = 20;\nlet add = |x: int| -> int { x + a };\nlet a = 100;\nprintln(add(1));\n" \
+                   "let make = |n: int| -> (int) -> int { |y: int| -> int { y + n + b } };\nprintln(make(5)(1));\n" \
+                   "println(map([1, 2], |v: int| -> int { let w = v * a; w + make(0)(0) }))"
+    assert run_petl(petl_raw_str, engine) == "11\n26\n[120, 220]\n"
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "vm"])
+def test_missing_else_branch_reported(engine, run_petl):
+    output: str = run_petl("println(if true { 1 });\nlet x = if false { 1 };\nprintln(x)", engine)
+    assert output.startswith("1\n") and "Invalid expression found\nLine: 2, column: 12" in output
+    assert "Unhandled exception" not in output
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "vm"])
+def test_iterables_read_lazily(engine, run_petl):
+    petl_raw_str = "let d = ['a': 1, 'b': 2];\nfor entry in d { println(entry) };\nprintln(isEmpty(\"\"));\nprintln(len(\"abc\"));\n" \
+                   "println(foldr(1~3, 0, |a: int, b: int| -> int { a * 10 + b }));\nprintln(joinStr(1~3, \"-\"));\nprintln(zip(\"ab\", 3~4))"
+    assert run_petl(petl_raw_str, engine) == "(a, 1)\n(b, 2)\ntrue\n3\n321\n1-2-3\n[(a, 3), (b, 4)]\n"
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "vm"])
+def test_lazy_result_errors_reported(engine, run_petl):
+    petl_raw_str = "let t = createTable(${name: string, age: int}, [(\"Alice\", 27), (\"Bob\", 0)]);\nprintln(\"before\");\n" \
+                   "select(t, [\"name\"], \"10 / age > 0\")"
+    output: str = run_petl(petl_raw_str, engine)
+    assert output.startswith("before\n") and "division by zero\nLine: 3, column: 1" in output
+
+
+def test_closures_share_typed_body():
+    root = Parser().parse(Lexer().scan("|x: int| -> int { x + a }"))
+    interpreter = TreeWalkInterpreter()
+    environment = InterpreterEnvironment()
+    environment.add("a", int_value(1))
+    environment.add("b", int_value(2))
+    first = interpreter.evaluate(root, environment, UnknownType())
+    second = interpreter.evaluate(root, environment, UnknownType())
+    assert root.free_identifiers == frozenset({"a"})
+    assert first.body is second.body and first.body is not root.body
+    assert first.environment.lookup("a") == int_value(1) and first.environment.lookup("b") is None
+
+
+class Scale(Builtin):
+    def __init__(self):
+        Builtin.__init__(self, "scale", [("factor", IntType()), ("value", IntType())], IntType())
+
+    def evaluate(self, application, environment, interpreter, error):
+        factor = environment.get("factor", application.token, error)
+        offset = environment.get("offset", application.token, error)
+        return int_value(factor.value * environment.get("value", application.token, error).value + offset.value)
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "vm"])
+def test_builtins_defining_evaluate_read_calling_environment(engine):
+    root = Parser().parse(Lexer().scan("let offset = 1; scale(2, 3) + scale(10, 1)"))
+    environment = InterpreterEnvironment()
+    environment.add("scale", Scale().to_value())
+    assert not Scale().positional and Sum().positional
+    assert INTERPRETER_ENGINES[engine]().interpret(root, environment) == int_value(18)
+
+
+def test_positional_builtins_keep_evaluate():
+    environment = InterpreterEnvironment()
+    environment.add("list", ListValue(ListType(IntType()), [int_value(2), int_value(5)]))
+    assert Sum().evaluate(Application(), environment, TreeWalkInterpreter(), None) == int_value(7)
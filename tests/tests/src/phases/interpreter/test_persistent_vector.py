@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from petllang.execution.execute import execute_petl_script
+from petllang.phases.interpreter.definitions.persistent_vector import PersistentVector, CHUNK_SIZE
+from petllang.utils.log import Log
+
+
+def test_persistent_vector_matches_list():
+    random.seed(0)
+    expected = list(range(3 * CHUNK_SIZE))
+    vector = PersistentVector(expected)
+    for step in range(2000):
+        operation = random.randrange(4)
+        if operation == 0:
+            index = random.randint(-len(expected) - 2, len(expected) + 2)
+            expected.insert(index, step)
+            vector = vector.insert(index, step)
+        elif operation == 1 and expected:
+            index = random.randrange(-len(expected), len(expected))
+            expected.pop(index)
+            vector = vector.remove(index)
+        elif operation == 2 and expected:
+            index = random.randrange(-len(expected), len(expected))
+            expected[index] = -step
+            vector = vector.replace(index, -step)
+        else:
+            other = list(range(random.randrange(2 * CHUNK_SIZE)))
+            expected = expected + other
+            vector = vector.concat(PersistentVector(other))
+    assert vector.to_list() == expected
+    assert len(vector) == len(expected)
+    assert [vector[i] for i in range(-len(expected), len(expected))] == expected + expected
+    assert vector.slice(5, -5).to_list() == expected[5:-5]
+    assert vector.reverse().to_list() == expected[::-1]
+
+
+def test_persistent_vector_updates_share_original():
+    original = PersistentVector(range(1000))
+    updated = original.insert(500, -1).remove(0).replace(10, -2)
+    assert original.to_list() == list(range(1000))
+    assert updated[499] == -1 and updated[10] == -2 and updated[0] == 1
+    with pytest.raises(IndexError):
+        original.remove(1000)
+
+
+def test_list_builtins_keep_original_list(capsys):
+    petl_raw_str = "let l = [1, 2, 3];\nlet m = insert(replace(remove(l, 0), 0, 7), 9, 1);\nprintln(l);\nprintln(m);\nprintln(l ++ m);\nprintln(reverse(l))"
+    execute_petl_script(petl_raw_str, False, Log())
+    assert capsys.readouterr().out == "[1, 2, 3]\n[7, 9, 3]\n[1, 2, 3, 7, 9, 3]\n[3, 2, 1]\n"
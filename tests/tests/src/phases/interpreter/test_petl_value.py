@@ -1,9 +1,10 @@
 import petllang.builtins.io_petl_builtins
-from petllang.phases.interpreter.definitions.types import IntType, BoolType, StringType, ListType, TupleType, DictType, \
-    SchemaType, TableType, FuncType
+from petllang.phases.interpreter.definitions.types import IntType, BoolType, CharType, StringType, ListType, TupleType, DictType, \
+    SchemaType, TableType, FuncType, UnionType, NoneType
 from petllang.phases.interpreter.definitions.value import values_equal, IntValue, BoolValue, CharValue, StringValue, \
     NoneValue, \
-    ListValue, TupleValue, DictValue, SchemaValue, TableValue, FuncValue
+    ListValue, TupleValue, DictValue, SchemaValue, TableValue, FuncValue, TableColumn, create_table_value, int_value, \
+    bool_value, char_value, none_value, SMALL_INT_MAX, RangeValue
 from petllang.phases.parser.defintions.expression import IntLiteral, LitExpression
 
 
@@ -15,11 +16,50 @@ def test_values_equal():
     assert values_equal(NoneValue(), NoneValue())
 
 
+def test_value_factories_share_instances():
+    assert int_value(5) is int_value(5) and int_value(5).value == 5
+    assert int_value(SMALL_INT_MAX + 1) is not int_value(SMALL_INT_MAX + 1)
+    assert values_equal(int_value(SMALL_INT_MAX + 1), IntValue(SMALL_INT_MAX + 1))
+    assert bool_value(1 < 2) is bool_value(True) and not bool_value(False).value
+    assert char_value("a") is char_value("a") and char_value("\u20ac").value == "\u20ac"
+    assert none_value() is none_value()
+    assert int_value(1).petl_type is int_value(2000).petl_type
+    assert not hasattr(int_value(1), "__dict__") and not hasattr(StringValue("a"), "__dict__")
+
+
+def test_hash_keys_match_values_equal():
+    values = [IntValue(1), BoolValue(True), CharValue("a"), StringValue("a"), NoneValue(),
+              ListValue(ListType(IntType()), [IntValue(1)]), ListValue(ListType(IntType()), [IntValue(1), IntValue(2)]),
+              TupleValue(TupleType([IntType()]), [IntValue(1)])]
+    for value1 in values:
+        for value2 in values:
+            assert (value1.hash_key() == value2.hash_key()) == values_equal(value1, value2)
+    assert ListValue(ListType(IntType()), [IntValue(1)]).hash_key() == ListValue(ListType(IntType()), [int_value(1)]).hash_key()
+
+
+def test_dict_lookup():
+    dict_value = DictValue(DictType(key_type=StringType(), value_type=IntType()),
+                           [(StringValue("a"), IntValue(1)), (StringValue("b"), IntValue(2)), (StringValue("a"), IntValue(3))])
+    assert dict_value.lookup(StringValue("a")).value == 1
+    assert dict_value.lookup(StringValue("b")).value == 2
+    assert dict_value.lookup(StringValue("c")) is None
+    assert dict_value.to_string() == "[a: 1, b: 2, a: 3]"
+
+
+def test_list_find_uses_membership_index():
+    list_value = ListValue(ListType(IntType()), [IntValue(3), IntValue(1), IntValue(3)])
+    assert list_value.find(IntValue(3)) == 0
+    assert list_value.find(int_value(1)) == 1
+    assert list_value.find(BoolValue(True)) == -1
+    assert list_value.membership_index() is list_value.membership_index()
+
+
 def test_values_equal_invalid():
     assert not values_equal(IntValue(5), IntValue(4))
     assert not values_equal(BoolValue(True), BoolValue(False))
     assert not values_equal(CharValue("a"), CharValue("b"))
     assert not values_equal(StringValue("test"), StringValue("test2"))
+    assert not values_equal(ListValue(ListType(IntType()), [IntValue(1), IntValue(2)]), ListValue(ListType(IntType()), [IntValue(1)]))
 
 
 def test_values_equal_collection():
@@ -105,6 +145,54 @@ def test_table_value_to_string():
     assert table_value.to_string() == """\x1b[4m                        \n\x1b[1m| int | bool  | string |\n| a   | b     | c      |\n\x1b[0m\x1b[4m| 5   | true  | test   |\n\x1b[0m\x1b[4m| 4   | false | test2  |\n\x1b[0m"""
 
 
+def test_columnar_table_value_to_string():
+    st = SchemaType([IntType(), BoolType(), StringType()])
+    schema_value = SchemaValue(st, [(StringValue("a"), IntType()), (StringValue("b"), BoolType()), (StringValue("c"), StringType())])
+    row_type = TupleType(st.column_types)
+    row1 = TupleValue(row_type, [IntValue(5), BoolValue(True), StringValue("test")])
+    row2 = TupleValue(row_type, [IntValue(4), BoolValue(False), StringValue("test2")])
+    table_value = create_table_value(TableType(st), schema_value, [row1, row2])
+    assert table_value.is_columnar()
+    assert table_value.row_count() == 2
+    assert table_value.to_string() == TableValue(TableType(st), schema_value, [row1, row2]).to_string()
+
+
+def test_table_column_nulls():
+    column = TableColumn.from_values(UnionType([IntType(), NoneType()]), [IntValue(1), NoneValue(), IntValue(3)])
+    assert column.value_class is IntValue
+    assert list(map(lambda v: v.to_string(), column.to_values())) == ["1", "none", "3"]
+    assert column.value_at(1).to_string() == "none"
+    assert list(map(lambda v: v.to_string(), column.take([2, 0]).to_values())) == ["3", "1"]
+
+
+def test_range_value_is_lazy():
+    range_value = RangeValue(1, 1000000)
+    assert range_value.length() == 1000000 and range_value.elements()[999999].value == 1000000
+    assert range_value.find(int_value(42)) == 41 and range_value.find(int_value(0)) == -1 and range_value.find(bool_value(True)) == -1
+    assert range_value._values is None
+    descending = RangeValue(3, 1)
+    assert values_equal(descending, ListValue(ListType(IntType()), [int_value(3), int_value(2), int_value(1)]))
+    assert descending.find(int_value(1)) == 2 and [v.value for v in descending.values] == [3, 2, 1]
+
+
+def test_iterable_values_iterate_lazily():
+    assert StringValue("abc").length() == 3 and [v.value for v in StringValue("abc").iterate()] == ["a", "b", "c"]
+    assert StringValue("").is_empty() and not int_value(1).is_iterable() and int_value(1).is_empty()
+    dict_value = DictValue(DictType(CharType(), IntType()), [(char_value("a"), int_value(1))])
+    entry = next(dict_value.iterate())
+    assert isinstance(entry, TupleValue) and entry.petl_type == TupleType([CharType(), IntType()])
+    range_value = RangeValue(1, 1000000)
+    assert next(range_value.iterate()).value == 1 and not range_value.is_empty()
+    assert [v.value for v in reversed(range_value.elements())][:2] == [1000000, 999999] and range_value._values is None
+
+
+def test_table_column_generic():
+    list_value = ListValue(ListType(IntType()), [IntValue(5)])
+    column = TableColumn.from_values(ListType(IntType()), [list_value])
+    assert column.value_class is None
+    assert column.value_at(0) is list_value
+
+
 def test_func_value_to_string_not_builtin():
     ft = FuncType()
     ft.parameter_types = [IntType(), BoolType()]
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+from petllang.phases.interpreter.definitions.types import AnyType
+from petllang.phases.interpreter.definitions.value import IntValue
+from petllang.phases.interpreter.environment import InterpreterEnvironment
+from petllang.phases.interpreter.vm_interpreter import VirtualMachine
+from petllang.phases.lexer.lexer import Lexer
+from petllang.phases.parser.parser import Parser
+
+
+def _self_call(count: int, tail: bool) -> str:
+    # Lambdas cannot reference their own binding, so they are passed to themselves
+    call: str = "self(self, n - 1, acc + 1)" if tail else "self(self, n - 1, acc) + 1"
+    return f"let f = |self: () -> int, n: int, acc: int| -> int {{ if n == 0 {{ acc }} else {{ {call} }} }};\nprintln(f(f, {count}, 0))"
+
+
+def _call_chain(length: int, nesting: int) -> str:
+    functions: str = "".join(f"let f{i} = |n: int| -> int {{ {'(' * nesting}f{i - 1}(n){' + 1)' * nesting} }};\n" for i in range(1, length))
+    return f"let f0 = |n: int| -> int {{ n }};\n{functions}println(f{length - 1}(0))"
+
+
+def test_vm_engine_matches_tree_walker(program, run_petl):
+    petl_raw_str = Path(program).read_text()
+    assert run_petl(petl_raw_str, "vm") == run_petl(petl_raw_str, "tree")
+
+
+def test_vm_engine_compiles_once():
+    tokens = Lexer().scan("let a = 2; let f = |x: int| -> int { x * a }; f(3) + f(4)")
+    root = Parser().parse(tokens)
+    interpreter = VirtualMachine()
+
+    result = interpreter.interpret(root, InterpreterEnvironment())
+    assert isinstance(result, IntValue) and result.value == 14
+    compiled_count = len(interpreter.compiled_expressions)
+    assert interpreter.load_code_unit(root) is interpreter.load_code_unit(root)
+    interpreter.evaluate(root, InterpreterEnvironment(), AnyType())
+    assert len(interpreter.compiled_expressions) == compiled_count
+    assert interpreter.descent_counter == 0
+
+
+def test_vm_engine_calls_lambdas_without_python_recursion(run_petl):
+    assert run_petl(_call_chain(150, 1), "vm").strip() == "149"
+
+
+def test_vm_engine_reports_maximum_depth(run_petl):
+    output: str = run_petl(_call_chain(200, 6), "vm")
+    assert "Maximum expression depth exceeded, possible infinite recursion" in output
+    assert "println(f199(0))" in output
+
+
+def test_vm_engine_runs_tail_calls_in_constant_depth(run_petl):
+    assert run_petl(_self_call(5000, tail=True), "vm").strip() == "5000"
+
+
+def test_vm_engine_maximum_depth_is_configurable(run_petl):
+    output: str = run_petl(_self_call(2000, tail=False), "vm")
+    assert "Maximum expression depth exceeded, possible infinite recursion" in output
+    assert "more calls" in output
+    assert run_petl(_self_call(2000, tail=False), "vm", maximum_depth=20000).strip() == "2000"
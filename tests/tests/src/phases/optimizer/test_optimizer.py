@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pytest
+
+from petllang.phases.lexer.lexer import Lexer
+from petllang.phases.optimizer.optimizer import Optimizer
+from petllang.phases.parser.defintions.expression import Block, LitExpression, IntLiteral, StringLiteral, Primitive
+from petllang.phases.parser.parser import Parser
+from petllang.phases.type_checker.type_checker import TypeChecker
+
+
+def _optimize(petl_raw_str: str):
+    return Optimizer().optimize(Parser().parse(Lexer().scan(petl_raw_str)))
+
+
+def _check_and_optimize(petl_raw_str: str):
+    root = Parser().parse(Lexer().scan(petl_raw_str))
+    assert TypeChecker().check(root)
+    return Optimizer().optimize(root)
+
+
+def test_fold_constant_primitives():
+    root = _optimize("let a = 2 * 60 * 60; a + -1; \"ab\" + 'c'")
+    assert isinstance(root, Block)
+    folded = root.statements[0].let_expression
+    assert isinstance(folded, LitExpression) and folded.literal == IntLiteral(7200)
+    assert folded.token.token_value == "2" and folded.token.file_position.column == 8
+    assert isinstance(root.statements[1], Primitive) and root.statements[1].right.literal == IntLiteral(-1)
+    assert root.result.literal == StringLiteral("abc")
+
+
+def test_prune_constant_branches_and_matches():
+    root = _optimize("println(if 1 < 2 { \"yes\" } else { \"no\" }); match 3 { case 1 => \"one\", case 2 | 3 => \"two or three\", case _ => \"other\" }")
+    assert root.statements[0].arguments[0].literal == StringLiteral("yes")
+    assert root.result.literal == StringLiteral("two or three")
+
+
+def test_keep_expressions_that_fail():
+    root = _optimize("let f = || -> string { 1 + 2 }; 10 / (5 - 5)")
+    assert isinstance(root.statements[0].let_expression.body, Primitive)
+    assert isinstance(root.result, Primitive) and root.result.right.literal == IntLiteral(0)
+
+
+def test_fuse_pipeline_stages():
+    root = _check_and_optimize("let xs = [1, 2, 3];\nxs |> map(|x: int| -> int { let y = x * 2; y }) |> filter(|x: int| -> bool { x % 2 == 0 }) |> map(|x: int| -> int { 10 / x })")
+    assert not root.result.fused and root.result.arguments[0].fused and root.result.arguments[0].arguments[0].fused
+    root = _check_and_optimize("let xs = [1, 2, 3];\nzip(xs |> map(|x: int| -> int { 10 / x }), xs) |> map(|t: tuple[int, int]| -> int { 1 })")
+    zipped = root.result.arguments[0]
+    assert zipped.fused and not zipped.arguments[0].fused
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "vm"])
+def test_fused_pipelines_match_unfused(engine, run_petl):
+    petl_raw_str = "let xs = 1~6;\nlet factor = 3;\n" \
+                   "println(xs |> map(|x: int| -> int { x * factor }) |> filter(|x: int| -> bool { x % 2 == 0 }) |> map(|x: int| -> int { x + 1 }));\n" \
+                   "println(xs |> filter(|x: int| -> bool { x > 10 }) |> map(|x: int| -> int { x }));\n" \
+                   "println(zip(xs |> filter(|x: int| -> bool { x > 3 }), \"abc\"));\n" \
+                   "println(xs |> map(|x: int| -> int { x * 2 }) |> map(|x: int| -> int { println(x); x }) |> len());\n" \
+                   "println(xs |> map(|x: int| -> int { x - 3 }) |> map(|x: int| -> int { 6 / x }))"
+    optimized_output: str = run_petl(petl_raw_str, engine, optimize=True)
+    assert optimized_output == run_petl(petl_raw_str, engine, optimize=False)
+    assert optimized_output.startswith("[7, 13, 19]\nnone\n[(4, a), (5, b), (6, c)]\n2\n4\n6\n8\n10\n12\n6\n\x1b[1;31mDivision by zero\nLine: 7")
+
+
+@pytest.mark.parametrize("engine", ["tree", "vm"])
+def test_errors_keep_their_position(engine, run_petl):
+    petl_raw_str = "let f = || -> string { 1 + 2 };\nprintln(f());\nprintln(10 / (5 - 5))"
+    optimized_output: str = run_petl(petl_raw_str, engine, optimize=True)
+    assert optimized_output == run_petl(petl_raw_str, engine, optimize=False)
+    assert "Line: 1" in optimized_output
+    optimized_output = run_petl("println(3 * 3);\nprintln(10 / (5 - 5))", engine, optimize=True)
+    assert optimized_output.startswith("9\n\x1b[1;31mDivision by zero\nLine: 2, column: 9")
+
+
+def test_optimized_programs_match_unoptimized(program, run_petl):
+    petl_raw_str = Path(program).read_text()
+    assert run_petl(petl_raw_str, "tree", optimize=True) == run_petl(petl_raw_str, "tree", optimize=False)
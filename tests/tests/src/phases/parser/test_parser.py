@@ -0,0 +1,42 @@
+from petllang.phases.lexer.lexer import Lexer
+from petllang.phases.parser.defintions.expression import Block, Let, Alias, For, Application, Reference, UnknownExpression
+from petllang.phases.parser.parser import Parser
+
+
+def _parse(petl_raw_str: str):
+    parser = Parser()
+    root = parser.parse(Lexer().scan(petl_raw_str))
+    return root, parser.logger.errors_occurred()
+
+
+def test_parse_statements_as_flat_block():
+    root, errors = _parse("alias n = int; let a: n = 1; println(a); for i in 0~2 { println(i) }; a")
+    assert not errors
+    assert isinstance(root, Block)
+    assert [type(statement) for statement in root.statements] == [Alias, Let, Application, For]
+    assert all(statement.petl_type is not None for statement in root.statements)
+    assert root.statements[1].after_let_expression is None
+    assert isinstance(root.result, Reference)
+    assert root.token == root.statements[0].token
+
+
+def test_parse_single_expression_without_block():
+    root, errors = _parse("println(1)")
+    assert not errors
+    assert isinstance(root, Application)
+
+
+def test_parse_trailing_statement_end():
+    root, errors = _parse("println(1);")
+    assert not errors
+    assert isinstance(root.result, UnknownExpression)
+
+    _, errors = _parse("let a = 1;")
+    assert errors
+
+
+def test_parse_long_script():
+    statement_count = 10000
+    root, errors = _parse("let a = 0;\n" + "let a = a + 1;\n" * statement_count + "a")
+    assert not errors
+    assert len(root.statements) == statement_count + 1
@@ -0,0 +1,79 @@
+from pathlib import Path
+
+import pytest
+
+from petllang.phases.interpreter.definitions.types import IntType, BoolType
+from petllang.phases.interpreter.environment import InterpreterEnvironment
+from petllang.phases.interpreter.interpreter import load_builtins
+from petllang.phases.lexer.lexer import Lexer
+from petllang.phases.parser.parser import Parser
+from petllang.phases.type_checker.type_checker import TypeChecker
+
+
+@pytest.mark.parametrize("engine", ["tree", "vm"])
+def test_trusted_interpreter_matches_checked_interpreter(program, engine, run_petl):
+    petl_raw_str = Path(program).read_text()
+    trusted_output: str = run_petl(petl_raw_str, engine, type_check=True)
+    checked_output: str = run_petl(petl_raw_str, engine, type_check=False)
+    if trusted_output != checked_output:
+        # Errors found before interpreting have no stack trace
+        assert "\n\tin\n" in checked_output
+        assert trusted_output.splitlines()[:3] == checked_output.splitlines()[:3]
+
+
+def test_type_checker_reports_errors_before_interpreting(run_petl):
+    output: str = run_petl("println(\"before\");\nlet x: int = \"text\";\nx", "tree", type_check=True)
+    assert "Type mismatch: string vs. int" in output
+    assert "Line: 2" in output
+    assert "before" not in output
+
+
+def test_type_checker_annotates_resolved_types():
+    root = Parser().parse(Lexer().scan("let a = 1; let f = |x: int| -> bool { x > a }; f(a + 2)"))
+    assert TypeChecker().check(root, InterpreterEnvironment())
+
+    lambda_body = root.statements[1].let_expression.body
+    assert lambda_body.checked_type == BoolType()
+    assert lambda_body.left.checked_type == IntType()
+    application = root.result
+    assert application.checked_type == BoolType()
+    assert application.arguments[0].checked_type == IntType()
+
+
+def test_type_checker_leaves_conditional_bindings_unresolved():
+    root = Parser().parse(Lexer().scan("let a = 1; if true { let a = \"text\"; none } else { none }; a"))
+    assert TypeChecker().check(root, InterpreterEnvironment())
+    reference = root.result
+    assert reference.checked_type is None
+
+
+@pytest.mark.parametrize("petl_raw_str, expected_output", [
+    ("if false { let a: int = \"s\"; none } else { println(\"ok\") }", "ok\n"),
+    ("let s: string = if true { \"a\" } else { 1 }; println(s)", "a\n"),
+    ("println(1); for c in \"\" { none }; let y: int = \"s\"; println(y)", "1\n"),
+    ("let b: int = match 5 { case _ => 1, case 2 => \"s\" }; println(b)", "1\n"),
+])
+@pytest.mark.parametrize("engine", ["tree", "closure", "vm"])
+def test_type_checker_ignores_mismatches_that_are_never_evaluated(petl_raw_str, expected_output, engine, run_petl):
+    assert run_petl(petl_raw_str, engine, type_check=True) == run_petl(petl_raw_str, engine, type_check=False) == expected_output
+
+
+@pytest.mark.parametrize("petl_raw_str, line", [
+    ("for i in 1~2 { print(i) };\nprintln(\"side effect ran\");\nlet y: int = \"oops\"", 3),
+    ("println(\"side effect ran\");\nlet f = |x: int| -> string { x + 1 };\nnone", 2),
+    ("println(\"side effect ran\");\nlet c = len(\"a\") > 0;\nif c { none } else { let a: int = \"s\"; none }", 3),
+    ("println(\"side effect ran\");\nlet a = len(\"a\");\nlet b: int = match a {\ncase 2 => \"s\",\ncase _ => 1\n}", 4),
+    ("if true { let a: int = \"s\"; none } else { none };\nprintln(\"side effect ran\")", 1),
+])
+def test_type_checker_reports_mismatches_that_may_be_evaluated(petl_raw_str, line, run_petl):
+    output: str = run_petl(petl_raw_str, "tree", type_check=True)
+    assert "Type mismatch" in output and f"Line: {line}" in output
+    assert "side effect ran" not in output and "12" not in output
+
+
+def test_type_checker_resolves_application_return_types():
+    parser: Parser = Parser()
+    root = parser.parse(Lexer().scan("let f = |x: int| -> int { x }; let a = f(1); let b = len(\"ab\"); let c = sum([1]); a + b"))
+    assert TypeChecker().check(root, load_builtins(parser.builtins, InterpreterEnvironment()))
+    assert [statement.let_expression.checked_type for statement in root.statements[1:]] == [IntType(), IntType(), None]
+    assert root.result.checked_type == IntType()
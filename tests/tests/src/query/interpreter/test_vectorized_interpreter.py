@@ -0,0 +1,33 @@
+from petllang.phases.interpreter.definitions.types import IntType, StringType, UnionType, NoneType
+from petllang.phases.interpreter.definitions.value import TableColumn, IntValue, StringValue, NoneValue
+from petllang.query.executor import compile_query
+
+
+def _columns():
+    return {
+        "age": TableColumn.from_values(IntType(), [IntValue(20), IntValue(30), IntValue(-45)]),
+        "name": TableColumn.from_values(StringType(), [StringValue("Alice"), StringValue("Bob"), StringValue("Bob")])
+    }
+
+
+def test_vectorized_comparison_and_range():
+    query = compile_query("age in 25~45 and name == \"Bob\"")
+    assert query.execute_vectorized(_columns(), 3).tolist() == [False, True, False]
+
+
+def test_vectorized_arithmetic_matches_row_interpreter():
+    columns = _columns()
+    for query_text in ["age / 7 == -6", "age % 7 == 4", "not (age * 2 - 10 > 0)", "name + \"!\" == \"Bob!\""]:
+        query = compile_query(query_text)
+        rows = [query.execute([(name, column.value_at(index)) for name, column in columns.items()], None, None)
+                for index in range(3)]
+        assert query.execute_vectorized(columns, 3).tolist() == rows
+
+
+def test_vectorized_fallback():
+    columns = _columns()
+    columns["score"] = TableColumn.from_values(UnionType([IntType(), NoneType()]), [IntValue(1), NoneValue(), IntValue(3)])
+    assert compile_query("score > 1").execute_vectorized(columns, 3) is None
+    assert compile_query("age / 0 > 1").execute_vectorized(columns, 3) is None
+    assert compile_query("missing > 1").execute_vectorized(columns, 3) is None
+    assert compile_query("age + name == 1").execute_vectorized(columns, 3) is None
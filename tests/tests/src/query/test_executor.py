@@ -0,0 +1,40 @@
+from petllang.phases.interpreter.definitions.types import IntType, StringType
+from petllang.phases.interpreter.definitions.value import IntValue, StringValue
+from petllang.query.executor import compile_query, execute_query, check_query
+
+
+def _error(text, token):
+    raise Exception(text)
+
+
+def test_compile_query_cached():
+    assert compile_query("age > 25") is compile_query("age > 25")
+
+
+def test_compiled_query_execute():
+    query = compile_query("age in 25~45 and name == \"Bob\"")
+    assert query.execute([("age", IntValue(30)), ("name", StringValue("Bob"))], None, _error)
+    assert not query.execute([("age", IntValue(50)), ("name", StringValue("Bob"))], None, _error)
+    assert not query.execute([("age", IntValue(30)), ("name", StringValue("Alice"))], None, _error)
+
+
+def test_compiled_query_range_bounds():
+    assert compile_query("age in 25~45").execute([("age", IntValue(45))], None, _error)
+    assert not compile_query("age in 25~45").execute([("age", IntValue(46))], None, _error)
+    assert not compile_query("age in 45~25").execute([("age", IntValue(30))], None, _error)
+
+
+def test_execute_query():
+    assert execute_query("left.id == right.id", [("left.id", IntValue(1)), ("right.id", IntValue(1))], None, _error)
+
+
+def test_check_query_resolves_columns():
+    errors = []
+    column_types = {"age": IntType(), "name": StringType()}
+    assert check_query(compile_query("age > 25 and name == \"Bob\""), column_types, None, lambda text, token: errors.append(text))
+    assert not check_query(compile_query("height > 25"), column_types, None, lambda text, token: errors.append(text))
+    assert not check_query(compile_query("name > 25"), column_types, None, lambda text, token: errors.append(text))
+    assert not check_query(compile_query("age + 1"), column_types, None, lambda text, token: errors.append(text))
+    assert errors == ["Unhandled exception while interpreting: Identifier 'height' does not exist in this scope",
+                      "Unhandled exception while interpreting: Invalid types for operator '>'",
+                      "Unhandled exception while interpreting: Type mismatch: int vs. bool"]
@@ -0,0 +1,93 @@
+from petllang.phases.interpreter.definitions.types import IntType, SchemaType, TableType
+from petllang.phases.interpreter.definitions.value import IntValue, StringValue, SchemaValue, TableValue, TableColumn
+from petllang.query.executor import compile_query
+from petllang.query.plan import JoinNode, FilterNode, ProjectNode, ScanNode, AppendNode, CsvScanNode, table_plan, \
+    lazy_table_value, copy_schema, optimize_plan
+
+
+def _error(text, token):
+    raise Exception(text)
+
+
+def _table(names, columns):
+    schema_type = SchemaType([IntType() for _ in names])
+    schema = SchemaValue(schema_type, [(StringValue(name), IntType()) for name in names])
+    return TableValue(TableType(schema_type), schema,
+                      columns=[TableColumn.from_values(IntType(), [IntValue(v) for v in column]) for column in columns])
+
+
+def _join():
+    left = _table(["id", "x", "unused"], [[1, 2, 3], [10, 20, 30], [0, 0, 0]])
+    right = _table(["rid", "y"], [[1, 2, 3], [5, 6, 7]])
+    schema = copy_schema(SchemaValue(SchemaType([IntType(), IntType()]), [(StringValue("x"), IntType()), (StringValue("y"), IntType())]))
+    return JoinNode(table_plan(left), table_plan(right), compile_query("left.id == right.rid"), [1], [1], schema, None, _error)
+
+
+def test_filter_pushed_below_join():
+    query = compile_query("x > 15 and y < 7 and x + y > 0")
+    plan = optimize_plan(FilterNode(_join(), query, query.root, None, _error))
+    assert isinstance(plan, FilterNode) and isinstance(plan.child, JoinNode)
+    assert isinstance(plan.child.left, FilterNode) and isinstance(plan.child.right, FilterNode)
+    assert [row.to_string() for row in plan.execute().rows] == ["(20, 6)"]
+
+
+def test_unused_columns_pruned():
+    query = compile_query("x > 15")
+    plan = optimize_plan(FilterNode(_join(), query, query.root, None, _error))
+    left_input = plan.left.child
+    assert isinstance(left_input, ProjectNode) and isinstance(left_input.child, ScanNode)
+    assert left_input.indices == [0, 1]
+
+
+def test_lazy_table_materialized_once():
+    table_value = lazy_table_value(_join())
+    assert table_value.is_lazy()
+    table_value.plan = AppendNode(table_value.plan, [TableColumn.from_values(IntType(), [IntValue(1)]),
+                                                     TableColumn.from_values(IntType(), [IntValue(2)])], 1)
+    assert table_value.row_count() == 4
+    assert not table_value.is_lazy()
+    assert [row.to_string() for row in table_value.rows] == ["(10, 5)", "(20, 6)", "(30, 7)", "(1, 2)"]
+
+
+def test_csv_scan_streamed_in_chunks(tmp_path):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text("id,x\n" + "".join(f"{i},{i * 10}\n" for i in range(7)))
+    schema = copy_schema(SchemaValue(SchemaType([IntType(), IntType()]), [(StringValue("id"), IntType()), (StringValue("x"), IntType())]))
+    query = compile_query("id % 2 == 0")
+    table_value = lazy_table_value(ProjectNode(FilterNode(CsvScanNode(schema, csv_path, True, None, _error, chunk_size=3),
+                                                          query, query.root, None, _error), [1]))
+    assert table_value.is_streaming()
+    assert [chunk.row_count() for chunk in table_value.iter_chunks()] == [2, 1, 1]
+    assert table_value.is_lazy()
+    assert [row.to_string() for row in table_value.rows] == ["(0)", "(20)", "(40)", "(60)"]
+
+
+def test_shared_plan_executed_once():
+    executions = []
+
+    class CountedScanNode(ScanNode):
+        def execute(self):
+            executions.append(self)
+            return ScanNode.execute(self)
+
+    join = _join()
+    left = CountedScanNode(join.left.schema, join.left.columns, join.left.row_count)
+    table_value = lazy_table_value(join.with_inputs(left, join.right, join.left_indices, join.right_indices, join.schema))
+    query = compile_query("x > 15")
+    first = lazy_table_value(FilterNode(table_plan(table_value), query, query.root, None, _error))
+    second = lazy_table_value(ProjectNode(table_plan(table_value), [1]))
+    assert [row.to_string() for row in first.rows] == ["(20, 6)", "(30, 7)"]
+    assert [row.to_string() for row in second.rows] == ["(5)", "(6)", "(7)"]
+    assert [row.to_string() for row in table_value.rows] == ["(10, 5)", "(20, 6)", "(30, 7)"]
+    assert len(executions) == 1
+
+
+def test_consumers_counted_when_plans_built():
+    table_value = lazy_table_value(_join())
+    table_plan(table_value)
+    assert table_value.plan.consumers == 0
+    lazy_table_value(ProjectNode(table_plan(table_value), [1]))
+    assert table_value.plan.consumers == 1 and not table_value.plan.is_shared()
+    lazy_table_value(JoinNode(table_plan(table_value), table_plan(table_value), compile_query("left.x == right.y"), [0], [1],
+                              copy_schema(table_value.schema), None, _error))
+    assert table_value.plan.consumers == 3 and table_value.plan.is_shared()
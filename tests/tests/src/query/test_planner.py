@@ -0,0 +1,42 @@
+from petllang.query.executor import compile_query
+from petllang.query.parser.expression import QueryPrimitive
+from petllang.query.parser.operator import QueryOperator
+from petllang.query.planner import plan_join, split_conjuncts
+
+left_columns = ["left.name", "left.age"]
+right_columns = ["right.name", "right.state"]
+
+
+def test_split_conjuncts():
+    root = compile_query("left.name == right.name and left.age > 25 and right.state == \"Idaho\"").root
+    assert len(split_conjuncts(root)) == 3
+
+
+def test_split_conjuncts_or():
+    root = compile_query("left.name == right.name or left.age > 25").root
+    assert len(split_conjuncts(root)) == 1
+
+
+def test_plan_join_equality():
+    plan = plan_join(compile_query("left.name == right.name").root, left_columns, right_columns)
+    assert plan.is_hash_join()
+    assert plan.key_columns == [("left.name", "right.name")]
+    assert plan.residual is None
+
+
+def test_plan_join_reversed_equality():
+    plan = plan_join(compile_query("right.name == left.name").root, left_columns, right_columns)
+    assert plan.key_columns == [("left.name", "right.name")]
+
+
+def test_plan_join_residual():
+    plan = plan_join(compile_query("left.name == right.name and left.age in 25~45").root, left_columns, right_columns)
+    assert plan.key_columns == [("left.name", "right.name")]
+    assert isinstance(plan.residual, QueryPrimitive)
+    assert plan.residual.operator.operator_type == QueryOperator.QueryOperatorType.IN
+
+
+def test_plan_join_no_equality():
+    plan = plan_join(compile_query("left.age > 25").root, left_columns, right_columns)
+    assert not plan.is_hash_join()
+    assert plan.residual is not None